@@ -1,23 +1,23 @@
 // Central index for all story configurations
-// This makes it easy to import all story configs from one place
+// Generated by story-manager from the issues in src/components - do not edit by hand.
+// Regenerate with: python3 story-manager/story_cli.py index
 
 import { simpleStoryIssue1 } from '../components/issue1/simpleStoryConfig';
-// import { storyIssue2 } from '../components/issue2/storyConfig';
-// import { storyIssue3 } from '../components/issue3/storyConfig';
-// import { storyTeam1 } from '../components/team1/storyConfig';
-// ... add more issues as they are created
 
-// Export all story issues as an object with string keys
+// Export all eagerly loaded story issues as an object with string keys
 export const storyIssues: { [key: string]: any } = {
   "issue1": simpleStoryIssue1,
-  // "issue2": storyIssue2,
-  // "issue3": storyIssue3,
-  // "team1": storyTeam1,
-  // ... add more issues here
 };
 
+// Load any issue by id; lazy issues are fetched as separate chunks
+export const storyIssueLoaders: { [key: string]: () => Promise<any> } = {
+  "issue1": () => Promise.resolve(simpleStoryIssue1),
+};
+
+export function loadStoryIssue(issueId: string): Promise<any> {
+  const load = storyIssueLoaders[issueId];
+  return load ? load() : Promise.resolve(undefined);
+}
+
 // Export individual issues for direct access
 export { simpleStoryIssue1 };
-// export { storyIssue2 };
-// export { storyIssue3 };
-// export { storyTeam1 };
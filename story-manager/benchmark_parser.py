@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Parse benchmark for storyConfig.ts files
+Times the story parser on synthetic issues of increasing size so that
+super-linear regressions show up as a growing per-page cost, and compares a
+spliced single-page edit against regenerating the whole file.
+
+The edit column times what the editor does per request: copy the cached
+document and splice one page into the copy. The copy and the span tree
+update are path-copies (O(chapters + pages in the edited chapter)); the
+text is still rebuilt as one string, an O(file) copy that the "text ms"
+column shows on its own.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from story_document import StoryDocument
+from story_parser import parse_story_config
+
+PAGES_PER_CHAPTER = 10
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+
+def build_synthetic_issue(page_count: int) -> str:
+    """Build a storyConfig.ts source with roughly page_count realistic pages"""
+    parts = [
+        "import type { StoryIssue } from '../../types/storyTypes';\n\n",
+        "export const storyBenchmark: StoryIssue = {\n",
+        '  id: "benchmark",\n',
+        "  chapters: [\n",
+    ]
+
+    chapter_count = max(1, (page_count + PAGES_PER_CHAPTER - 1) // PAGES_PER_CHAPTER)
+    page_number = 0
+    for chapter in range(1, chapter_count + 1):
+        parts.append(f'    {{\n      id: "chapter-{chapter}",\n      title: "Chapter {chapter}",\n      pages: [\n')
+        for page in range(1, PAGES_PER_CHAPTER + 1):
+            if page_number == page_count:
+                break
+            page_number += 1
+            # Every third page uses a nested template to exercise ${...} scanning
+            body = (
+                f'${{`<h2 class="text-2xl font-bold text-cyan-600 mb-4">Page {page}</h2>`}}'
+                if page % 3 == 0 else
+                f'<h2 class="text-2xl font-bold text-cyan-600 mb-4 text-center font-gagalin">Page {page}</h2>'
+            )
+            parts.append(
+                f'        {{\n          id: "page-{chapter}-{page}",\n          htmlContent: `\n'
+                f'            <div class="p-6 rounded-2xl text-left">\n'
+                f'              {body}\n'
+                f'              <div class="text-lg leading-relaxed p-2 space-y-4">\n'
+                f'                <p>You see, in our magical world called <span class="text-yellow-600 font-bold text-xl font-gagalin">LEXICON</span>, there are special creatures named <span class="text-pink-600 font-bold text-xl font-gagalin">Kowai</span>.</p>\n'
+                f'                <p>Each Kowai has amazing powers that will take your breath away.</p>\n'
+                f'              </div>\n'
+                f'            </div>\n'
+                f'          `\n        }},\n'
+            )
+        parts.append("      ]\n    },\n")
+
+    parts.append("  ]\n};\n")
+    return ''.join(parts)
+
+
+def time_parse(content: str, repeat: int) -> float:
+    """Return the best wall-clock parse time in seconds over repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_story_config(content, 'benchmark')
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_edit(content: str, repeat: int):
+    """Return the best (copy and spliced edit, text rebuild alone, full regeneration) times in seconds"""
+    document = StoryDocument(content, 'benchmark')
+    middle = len(document.issue['chapters']) // 2
+    best_splice = best_text = best_render = float('inf')
+    for run in range(repeat):
+        start = time.perf_counter()
+        edited = document.copy()
+        edited.set_page_field(middle, 0, 'htmlContent', f'<p>Edited {run}</p>')
+        best_splice = min(best_splice, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        ''.join((edited.text[:len(content) // 2], edited.text[len(content) // 2:]))
+        best_text = min(best_text, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        edited.render()
+        best_render = min(best_render, time.perf_counter() - start)
+    return best_splice, best_text, best_render
+
+
+def main():
+    """Run the parse benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the storyConfig.ts parser")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Page counts to benchmark")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per size (best time is reported)")
+    parser.add_argument('--max-us-per-page', type=float, default=None,
+                        help="Fail if any size exceeds this per-page cost")
+    args = parser.parse_args()
+
+    print(f"{'pages':>8} {'size KB':>10} {'parse ms':>10} {'us/page':>10} {'MB/s':>8} {'edit ms':>9}"
+          f" {'text ms':>9} {'regen ms':>9}")
+    print("-" * 80)
+
+    failed = False
+    for size in args.sizes:
+        content = build_synthetic_issue(size)
+        repeat = args.repeat if size <= 1000 else max(1, args.repeat // 2)
+        elapsed = time_parse(content, repeat)
+        per_page = elapsed * 1e6 / size
+        throughput = len(content) / elapsed / 1e6 if elapsed else float('inf')
+        splice, text, render = time_edit(content, repeat)
+        print(f"{size:>8} {len(content) / 1024:>10.1f} {elapsed * 1000:>10.2f} {per_page:>10.1f} {throughput:>8.1f}"
+              f" {splice * 1000:>9.2f} {text * 1000:>9.2f} {render * 1000:>9.2f}")
+
+        if args.max_us_per_page is not None and per_page > args.max_us_per_page:
+            failed = True
+
+    if failed:
+        print(f"❌ Per-page parse cost exceeded {args.max_us_per_page} us")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
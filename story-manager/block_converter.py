@@ -0,0 +1,418 @@
+"""
+Block Converter for Lexicon Quest Story Manager
+Migrates HTML storyConfig.ts issues to simpleStoryConfig.ts content blocks.
+"""
+
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from html import unescape
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from block_renderer import HEADING_CLASSES, QUEST_BUTTON_CLASSES, render_blocks
+from content_optimizer import VOID_TAGS, minify_html
+from file_manager import CONFIG_FILE, FileManager
+from search_index import html_text, tokenize
+from story_document import StoryDocument, render_story_config
+from story_parser import cook_template
+from structured_document import SIMPLE_CONFIG_FILE, StructuredStoryDocument, text_block, validate_block
+from story_transfer import STRUCTURED_HEADER
+from write_pipeline import write_pipeline
+
+_TOKEN = re.compile(r'<!--.*?-->|<[a-zA-Z/][^<>]*>|[^<]+|<', re.DOTALL)
+_TAG_NAME = re.compile(r'</?([a-zA-Z][\w-]*)')
+_ATTRIBUTE = re.compile(r'([^\s"\'=<>/]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+)))?')
+_BACKGROUND = re.compile(r'background-image:\s*url\(\s*([\'"]?)(.*?)\1\s*\)')
+_HEADING = re.compile(r'h[1-6]')
+
+# Classes the reader's block components already apply, so converted blocks don't repeat them
+TEXT_CLASSES = frozenset({'p-6', 'rounded-2xl', 'text-left'})
+INFO_BOX_CLASSES = frozenset({'p-6', 'rounded-2xl', 'bg-blue-100'})
+IMAGE_CLASSES = frozenset({'max-w-full', 'h-auto', 'rounded-lg', 'shadow-lg', 'mx-auto'})
+HEADING_CLASS_SET = frozenset(HEADING_CLASSES.split())
+QUEST_BUTTON_CLASS_SET = frozenset(QUEST_BUTTON_CLASSES.split())
+COLUMN_KEYS = {2: ['left', 'right'], 3: ['left', 'center', 'right']}
+
+
+class _Text(str):
+    """A text node, remembering where it starts in the source"""
+    start = 0
+
+
+class _Element:
+    """An element of a page's HTML with offsets into its source"""
+    __slots__ = ('tag', 'attrs', 'start', 'end', 'inner_start', 'inner_end', 'children')
+
+    def __init__(self, tag: str, attrs: Dict[str, str], start: int, inner_start: int):
+        self.tag = tag
+        self.attrs = attrs
+        self.start = start
+        self.inner_start = inner_start
+        self.inner_end = inner_start
+        self.end = inner_start
+        self.children: List[Union['_Element', _Text]] = []
+
+    @property
+    def classes(self) -> List[str]:
+        return self.attrs.get('class', '').split()
+
+    @property
+    def elements(self) -> List['_Element']:
+        return [child for child in self.children if isinstance(child, _Element)]
+
+    @property
+    def has_text(self) -> bool:
+        """Whether the element has text of its own, outside child elements"""
+        return any(isinstance(child, str) and child.strip() for child in self.children)
+
+
+def parse_fragment(source: str) -> _Element:
+    """Parse an HTML fragment into a tree of elements under a root pseudo-element.
+
+    Unclosed elements end where their parent does, and stray end tags are
+    ignored, as browsers do for the markup stories use.
+    """
+    root = _Element('', {}, 0, 0)
+    stack = [root]
+    position = 0
+    for match in _TOKEN.finditer(source):
+        token, position = match.group(), match.end()
+        if token.startswith('<!--'):
+            continue
+        name = _TAG_NAME.match(token)
+        if not name:
+            text = _Text(token)
+            text.start = match.start()
+            stack[-1].children.append(text)
+            continue
+        tag = name.group(1).lower()
+        if token.startswith('</'):
+            for index in range(len(stack) - 1, 0, -1):
+                if stack[index].tag == tag:
+                    for element in stack[index:]:
+                        element.inner_end, element.end = match.start(), match.start()
+                    stack[index].end = match.end()
+                    del stack[index:]
+                    break
+            continue
+        attrs = {}
+        for attr in _ATTRIBUTE.finditer(token[name.end():].rstrip('/>')):
+            attrs[attr.group(1).lower()] = next((value for value in attr.groups()[1:] if value is not None), '')
+        element = _Element(tag, attrs, match.start(), match.end())
+        stack[-1].children.append(element)
+        if tag not in VOID_TAGS and not token.endswith('/>'):
+            stack.append(element)
+        else:
+            element.inner_end = element.end = match.end()
+    for element in stack[1:]:
+        element.inner_end = element.end = position
+    root.inner_end = root.end = len(source)
+    return root
+
+
+def _plain(raw: str) -> str:
+    """Template source of an attribute or text node as the string the reader shows"""
+    return ' '.join(unescape(cook_template(raw)).split())
+
+
+def _leftover(classes: List[str], defaults: frozenset) -> str:
+    return ' '.join(name for name in classes if name not in defaults)
+
+
+def _with(data: Dict[str, Any], **optional: Any) -> Dict[str, Any]:
+    """data plus the optional fields that have a value"""
+    data.update((key, value) for key, value in optional.items() if value)
+    return data
+
+
+class _Page:
+    """Converts the top-level elements of one page to content blocks"""
+
+    def __init__(self, source: str):
+        self.source = source
+
+    def inner(self, element: _Element, start: Optional[int] = None, end: Optional[int] = None) -> str:
+        return self.source[element.inner_start if start is None else start:
+                           element.inner_end if end is None else end].strip()
+
+    def text(self, element: _Element) -> Optional[str]:
+        """The plain text of an element without child elements"""
+        return None if element.elements else _plain(self.inner(element))
+
+    def convert(self, element: _Element) -> Optional[List[Dict[str, Any]]]:
+        """Blocks for one top-level element, or None if no pattern matches"""
+        for pattern in (self.chapter_header, self.columns, self.quest_button, self.image, self.info_box, self.text_box):
+            blocks = pattern(element)
+            if blocks is not None:
+                return blocks if isinstance(blocks, list) else [blocks]
+        return None
+
+    # Patterns
+
+    def chapter_header(self, element: _Element):
+        background = _BACKGROUND.search(element.attrs.get('style', ''))
+        headings = element.elements
+        if not background or element.has_text or not 1 <= len(headings) <= 2 \
+                or any(heading.tag != 'h2' or heading.elements for heading in headings):
+            return None
+        color = next((name for name in element.classes
+                      if re.fullmatch(r'text-(?:white|black|[a-z]+-\d{2,3})', name)), None)
+        titles = [self.text(heading) for heading in headings]
+        return {'type': 'chapter-header', 'data': _with({'backgroundImage': _plain(background.group(2)),
+                                                         'title': titles[0]},
+                                                        subtitle=titles[1] if len(titles) > 1 else None,
+                                                        textColor=color)}
+
+    def columns(self, element: _Element):
+        grid = element
+        if 'grid' not in element.classes:
+            if element.has_text or len(element.elements) != 1:
+                return None
+            grid = element.elements[0]
+        count = 3 if 'md:grid-cols-3' in grid.classes else 2 if 'md:grid-cols-2' in grid.classes else 0
+        cells = grid.elements
+        if not count or grid.has_text or len(cells) != count:
+            return None
+        data = {}
+        for key, cell in zip(COLUMN_KEYS[count], cells):
+            image = self._image_element(cell)
+            if image is not None:
+                data[key] = _with({'type': 'image', 'content': _plain(image.attrs.get('src', ''))},
+                                  alt=_plain(image.attrs.get('alt', '')),
+                                  className=_leftover(image.classes, IMAGE_CLASSES))
+            else:
+                data[key] = {'type': 'text', **self._text_data(cell, cell.inner_end, frozenset())}
+        return {'type': 'two-column' if count == 2 else 'three-column', 'data': data}
+
+    def quest_button(self, element: _Element):
+        button = element
+        if element.tag != 'button':
+            if element.has_text or len(element.elements) != 1:
+                return None
+            button = element.elements[0]
+        quest_id = button.attrs.get('data-quest-id', '')
+        label = self.text(button) if button.tag == 'button' else None
+        if not quest_id.isdigit() or not label:
+            return None
+        return {'type': 'quest-button', 'data': _with({'buttonText': label, 'questId': int(quest_id)},
+                                                      className=_leftover(button.classes, QUEST_BUTTON_CLASS_SET))}
+
+    def image(self, element: _Element):
+        image = self._image_element(element)
+        caption = None
+        if image is None:
+            children = element.elements
+            if element.has_text or len(children) != 2 or children[1].tag != 'p':
+                return None
+            image, caption = self._image_element(children[0]), self.text(children[1])
+            if image is None or not caption:
+                return None
+        return {'type': 'image', 'data': _with({'src': _plain(image.attrs.get('src', '')),
+                                                'alt': _plain(image.attrs.get('alt', ''))},
+                                               className=_leftover(image.classes, IMAGE_CLASSES), caption=caption)}
+
+    def info_box(self, element: _Element):
+        if element.tag != 'div' or 'bg-blue-100' not in element.classes:
+            return None
+        end, button = self._trailing_button(element)
+        start, title, _ = self._heading(element, ('h2', 'h3'))
+        box = {'type': 'info-box', 'data': _with({}, title=title)}
+        box['data']['content'] = self.inner(element, start, end)
+        _with(box['data'], className=_leftover(element.classes, INFO_BOX_CLASSES))
+        return [box, button] if button else box
+
+    def text_box(self, element: _Element):
+        if element.tag not in ('div', 'section', 'article'):
+            return None
+        end, button = self._trailing_button(element)
+        block = {'type': 'text', 'data': self._text_data(element, end, TEXT_CLASSES)}
+        return [block, button] if button else block
+
+    # Helpers
+
+    def _image_element(self, element: _Element) -> Optional[_Element]:
+        """The <img> an element is or only contains"""
+        while element.tag != 'img':
+            if element.has_text or len(element.elements) != 1:
+                return None
+            element = element.elements[0]
+        return element if element.attrs.get('src') else None
+
+    def _heading(self, element: _Element, tags=None) -> Tuple[Optional[int], Optional[str], Optional[_Element]]:
+        """(content start, heading text, heading) for a leading plain-text heading"""
+        children = element.elements
+        if not children or self.source[element.inner_start:children[0].start].strip():
+            return None, None, None
+        heading = children[0]
+        title = self.text(heading) if (heading.tag in tags if tags else _HEADING.fullmatch(heading.tag)) else None
+        if not title:
+            return None, None, None
+        return heading.end, title, heading
+
+    def _text_data(self, element: _Element, end: int, defaults: frozenset) -> Dict[str, Any]:
+        start, title, heading = self._heading(element)
+        data = _with({}, heading=title)
+        if heading is not None:
+            data['level'] = int(heading.tag[1])
+            _with(data, headingClassName=_leftover(heading.classes, HEADING_CLASS_SET))
+        data['content'] = self.inner(element, start, end)
+        return _with(data, className=_leftover(element.classes, defaults))
+
+    def _trailing_button(self, element: _Element) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Split a quest button (or a wrapper holding only one) off the end of an element"""
+        children = element.elements
+        if len(children) < 2 or self.source[children[-1].end:element.inner_end].strip():
+            return element.inner_end, None
+        button = self.quest_button(children[-1])
+        return (children[-1].start, button) if button else (element.inner_end, None)
+
+
+def _words(html: str) -> List[str]:
+    try:
+        return tokenize(html_text(cook_template(html)))
+    except ValueError:
+        return []
+
+
+def convert_html(source: str) -> Tuple[List[Dict[str, Any]], int]:
+    """Convert a page's htmlContent to content blocks.
+
+    Each top-level element that matches a block pattern, and whose blocks
+    still show the same words in the same order, becomes those blocks; the
+    rest is kept as raw HTML in text blocks. Returns the blocks and the
+    number of source bytes kept as raw HTML.
+    """
+    if '${' in source:
+        # Template expressions only work as written
+        return [text_block(source)], len(source.encode('utf-8'))
+    source = minify_html(source)
+    page = _Page(source)
+    blocks: List[Dict[str, Any]] = []
+    raw: List[Tuple[int, int]] = []
+    kept = 0
+
+    def keep_raw() -> None:
+        nonlocal kept
+        html = source[raw[0][0]:raw[-1][1]].strip() if raw else ''
+        if html:
+            blocks.append(text_block(html))
+            kept += len(html.encode('utf-8'))
+        raw.clear()
+
+    for child in parse_fragment(source).children:
+        if isinstance(child, _Text):
+            if child.strip():
+                raw.append((child.start, child.start + len(child)))
+            continue
+        converted = page.convert(child)
+        if converted and _words(source[child.start:child.end]) == _words(render_blocks(converted)):
+            keep_raw()
+            blocks.extend(validate_block(block) for block in converted)
+        else:
+            raw.append((child.start, child.end))
+    keep_raw()
+    return blocks, kept
+
+
+def convert_issue(issue_name: str, config_path: str) -> Tuple[str, Dict[str, Any]]:
+    """Convert one HTML issue to a simpleStoryConfig.ts source; runs in a worker process"""
+    start = time.perf_counter()
+    text = Path(config_path).read_text(encoding='utf-8')
+    document = StoryDocument(text, issue_name)
+    counts: Dict[str, int] = {}
+    pages = raw_pages = html_bytes = raw_bytes = 0
+
+    chapters = []
+    for chapter in document.issue['chapters']:
+        converted = []
+        for page in chapter.get('pages', []):
+            html = page.get('htmlContent', '')
+            blocks, kept = convert_html(html)
+            converted.append({('content' if key == 'htmlContent' else key): (blocks if key == 'htmlContent' else value)
+                              for key, value in page.items()})
+            for block in blocks:
+                counts[block['type']] = counts.get(block['type'], 0) + 1
+            pages += 1
+            raw_pages += kept > 0
+            html_bytes += len(html.encode('utf-8'))
+            raw_bytes += kept
+        chapters.append({**chapter, 'pages': converted})
+
+    export_name = f"simple{document.export_name[:1].upper()}{document.export_name[1:]}"
+    structured = render_story_config({**document.issue, 'chapters': chapters}, export_name, 'SimpleStoryIssue',
+                                     STRUCTURED_HEADER)
+    # The written file must load back as the same model
+    StructuredStoryDocument(structured, issue_name)
+    return structured, {
+        'issue': issue_name,
+        'pages': pages,
+        'blocks': counts,
+        'rawPages': raw_pages,
+        'rawBytes': raw_bytes,
+        'coverage': 1 - raw_bytes / html_bytes if html_bytes else 1.0,
+        'bytes': len(text.encode('utf-8')),
+        'structuredBytes': len(structured.encode('utf-8')),
+        'ms': (time.perf_counter() - start) * 1000,
+    }
+
+
+class BlockConverter:
+    """Bulk migration of storyConfig.ts issues to content blocks.
+
+    Every issue with an HTML storyConfig.ts is converted in a worker
+    process (see convert_html for the patterns), and the result is
+    written to simpleStoryConfig.ts next to it. storyIndex.ts is then
+    pointed at the new file; the HTML config is left in place. Issues
+    that already have a simpleStoryConfig.ts are only reported unless
+    forced.
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None, workers: Optional[int] = None):
+        self.file_manager = file_manager or FileManager()
+        self.workers = workers
+
+    def html_issues(self) -> List[str]:
+        """Issues with an HTML storyConfig.ts"""
+        if not self.file_manager.components_path.exists():
+            return []
+        return sorted(path.parent.name for path in self.file_manager.components_path.glob(f'*/{CONFIG_FILE}'))
+
+    def convert(self, issue_names: Optional[List[str]] = None, dry_run: bool = False, force: bool = False,
+                switch: bool = True) -> List[Dict[str, Any]]:
+        """Convert the given issues (default: all HTML issues); returns one report per issue"""
+        available = self.html_issues()
+        names = issue_names or available
+        for issue_name in names:
+            if issue_name not in available:
+                raise FileNotFoundError(f"Issue '{issue_name}' has no {CONFIG_FILE} to convert")
+
+        jobs = {name: str(self.file_manager.components_path / name / CONFIG_FILE) for name in names}
+        if len(jobs) <= 1 or self.workers == 1:
+            results = {name: convert_issue(name, path) for name, path in jobs.items()}
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {name: pool.submit(convert_issue, name, path) for name, path in jobs.items()}
+                results = {name: future.result() for name, future in futures.items()}
+
+        reports, writes = [], []
+        for issue_name, (text, report) in results.items():
+            path = self.file_manager.components_path / issue_name / SIMPLE_CONFIG_FILE
+            report['written'] = not dry_run and (force or not path.exists())
+            reports.append(report)
+            if not report['written']:
+                continue
+            if self.file_manager.get_config_path(issue_name) == path:
+                writes.append((path, self.file_manager.write_document(issue_name,
+                                                                      StructuredStoryDocument(text, issue_name),
+                                                                      {'op': 'convert'})))
+            else:
+                writes.append((path, write_pipeline.write(path, text)))
+
+        write_pipeline.flush(path for path, _ in writes)
+        for _, future in writes:
+            future.result()
+        if writes and switch:
+            self.file_manager.update_story_index(configs={report['issue']: SIMPLE_CONFIG_FILE
+                                                          for report in reports if report['written']})
+        return reports
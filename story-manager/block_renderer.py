@@ -0,0 +1,113 @@
+"""
+Block Renderer for Lexicon Quest Story Manager
+Renders structured content blocks to the HTML that JSONStoryRenderer.tsx produces.
+"""
+
+from html import escape
+from typing import Any, Dict, List
+
+from story_parser import cook_template
+
+HEADING_CLASSES = 'text-2xl font-bold text-yellow-600 mb-4 font-gagalin'
+QUEST_BUTTON_CLASSES = ('bg-gradient-to-r from-purple-600 via-blue-600 to-indigo-600 hover:from-purple-500 '
+                        'hover:via-blue-500 hover:to-indigo-500 font-black text-white text-lg rounded-2xl shadow-xl '
+                        'hover:shadow-purple-500/30 hover:scale-105 transition-all duration-300 border-0 px-8 py-3')
+
+
+def _text(value: Any) -> str:
+    """Escape a plain-text field; the result is also safe inside a template literal"""
+    return escape(str(value)).replace('`', '&#96;').replace('${', '&#36;{')
+
+
+def _classes(*names: Any) -> str:
+    return _text(' '.join(str(name) for name in names if name))
+
+
+def _heading(heading: str, level: Any, class_name: str = '') -> str:
+    tag = f'h{level}' if level in (1, 2, 3, 4, 5, 6) else 'h3'
+    return f'<{tag} class="{_classes(HEADING_CLASSES, class_name)}">{_text(heading)}</{tag}>'
+
+
+def _render_text(data: Dict[str, Any]) -> str:
+    heading = _heading(data['heading'], data.get('level', 3), data.get('headingClassName')) if data.get('heading') else ''
+    return (f'<div class="{_classes("p-6 rounded-2xl text-left", data.get("className"))}">'
+            f'<div class="text-slate-800 text-lg leading-relaxed space-y-6">{heading}'
+            f'<div class="space-y-6">{data.get("content", "")}</div></div></div>')
+
+
+def _render_image(data: Dict[str, Any]) -> str:
+    caption = f'<p class="text-slate-600 text-sm mt-2">{_text(data["caption"])}</p>' if data.get('caption') else ''
+    return (f'<div class="p-6 rounded-2xl text-center">'
+            f'<img src="{_text(data.get("src") or data.get("content", ""))}" alt="{_text(data.get("alt", ""))}"'
+            f' class="{_classes("max-w-full h-auto rounded-lg shadow-lg mx-auto", data.get("className"))}">'
+            f'{caption}</div>')
+
+
+def _render_column(item: Dict[str, Any]) -> str:
+    return _render_image(item) if item.get('type') == 'image' else _render_text(item)
+
+
+def _render_columns(data: Dict[str, Any], keys: List[str], grid: str, cell: str) -> str:
+    cells = ''.join(f'<div class="{cell}">{_render_column(data[key])}</div>'
+                    for key in keys if isinstance(data.get(key), dict))
+    return f'<div class="p-6 rounded-2xl text-left"><div class="{grid}">{cells}</div></div>'
+
+
+def _render_chapter_header(data: Dict[str, Any]) -> str:
+    style = (f"background-image: url('{data.get('backgroundImage', '')}'); background-size: cover;"
+             f" background-position: center; background-repeat: no-repeat")
+    titles = ''.join(f'<h2 class="text-3xl font-bold mb-4 text-center drop-shadow-xl font-gagalin">{_text(title)}</h2>'
+                     for title in (data.get('title', ''), data.get('subtitle')) if title)
+    classes = _classes('p-6 rounded-2xl text-center relative min-h-[70vh] flex flex-col justify-center items-center',
+                       data.get('textColor') or 'text-white')
+    return f'<div class="{classes}" style="{_text(style)}">{titles}</div>'
+
+
+def _render_quest_button(data: Dict[str, Any]) -> str:
+    # data-quest-id is what HTMLStoryRenderer.tsx listens for
+    return (f'<div class="mt-4 text-center"><button class="{_classes(QUEST_BUTTON_CLASSES, data.get("className"))}"'
+            f' data-quest-id="{_text(data.get("questId", ""))}">{_text(data.get("buttonText", ""))}</button></div>')
+
+
+def _render_info_box(data: Dict[str, Any]) -> str:
+    title = (f'<h3 class="text-2xl font-bold text-yellow-600 mb-4 text-center font-gagalin">{_text(data["title"])}</h3>'
+             if data.get('title') else '')
+    return (f'<div class="{_classes("p-6 rounded-2xl bg-blue-100", data.get("className"))}">{title}'
+            f'<div class="text-slate-800 text-lg leading-relaxed"><div class="space-y-6">{data.get("content", "")}'
+            f'</div></div></div>')
+
+
+_RENDERERS = {
+    'chapter-header': _render_chapter_header,
+    'text': _render_text,
+    'two-column': lambda data: _render_columns(data, ['left', 'right'], 'grid grid-cols-1 md:grid-cols-2',
+                                               'flex justify-center items-center'),
+    'three-column': lambda data: _render_columns(data, ['left', 'center', 'right'],
+                                                 'grid grid-cols-1 md:grid-cols-3 gap-6',
+                                                 'flex flex-col items-start space-y-4'),
+    'quest-button': _render_quest_button,
+    'info-box': _render_info_box,
+    'image': _render_image,
+}
+
+
+def render_block(block: Dict[str, Any]) -> str:
+    """HTML for one content block ('' for unknown types, which the reader skips too)"""
+    renderer = _RENDERERS.get(block.get('type'))
+    data = block.get('data')
+    return renderer(data) if renderer and isinstance(data, dict) else ''
+
+
+def render_blocks(blocks: List[Dict[str, Any]]) -> str:
+    """HTML for a structured page's content blocks"""
+    return '\n'.join(html for html in (render_block(block) for block in blocks) if html)
+
+
+def page_html(page: Dict[str, Any]) -> str:
+    """The HTML a page shows: its htmlContent, or its content blocks rendered as the reader does"""
+    source = page['htmlContent'] if 'htmlContent' in page else render_blocks(page.get('content', []))
+    try:
+        return cook_template(source)
+    except ValueError:
+        # Pages built from ${...} expressions can only be shown as written
+        return source
@@ -0,0 +1,234 @@
+"""
+Bundle Builder for Lexicon Quest Story Manager
+Compiles each issue into content-hashed per-chapter JSON files plus a small
+manifest, so the reader can fetch chapters on demand.
+"""
+
+import hashlib
+import json
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from content_optimizer import minify_html
+from file_manager import FileManager
+from story_document import is_template_value
+from story_parser import cook_template
+from write_pipeline import atomic_write_text, write_if_changed
+
+# Bump when the bundle format changes so every chapter is recompiled
+BUNDLE_VERSION = 2
+HASH_LENGTH = 10
+
+_UNSAFE_FILENAME = re.compile(r'[^\w-]+')
+
+
+def content_hash(data: bytes) -> str:
+    """Short hex digest used in bundle file names"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def cook_value(value: Any, key: Optional[str] = None) -> Any:
+    """Turn template-literal source in the model into the (minified) strings the site renders"""
+    if is_template_value(key, value):
+        source = minify_html(value)
+        try:
+            return cook_template(source)
+        except ValueError:
+            # Expressions other than string literals can only be shipped as written (as page_html does)
+            return source
+    if isinstance(value, dict):
+        return {k: cook_value(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [cook_value(item) for item in value]
+    return value
+
+
+def chapter_bundle(chapter: Dict[str, Any]) -> bytes:
+    """Serialize one chapter as compact JSON"""
+    return json.dumps(cook_value(chapter), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _build_issue_in_worker(output_path: str, issue_name: str, previous: Optional[Dict[str, Any]], force: bool):
+    """Compile one issue in a worker process"""
+    return BundleBuilder(output_path=Path(output_path)).build_issue(issue_name, previous, force)
+
+
+class BundleBuilder:
+    """Incremental compiler from story configs to public/issues/<issue>/ bundles.
+
+    Build state (config stamps and per-chapter source hashes) is kept next to
+    storyIndex.ts. An issue whose config file is unchanged is skipped without
+    parsing; otherwise only chapters whose source text changed are
+    recompiled, and bundle files that are no longer referenced are removed.
+    When several issues need compiling they are spread over a process pool.
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None, output_path: Optional[Path] = None,
+                 workers: Optional[int] = None):
+        self.file_manager = file_manager or FileManager()
+        self.workers = workers
+        self.output_path = output_path or self.file_manager.project_root / "public" / "issues"
+        self.manifest_path = self.output_path / "manifest.json"
+        self.state_path = self.file_manager.data_path / "storyBundles.meta.json"
+
+    def build(self, issue_names: Optional[List[str]] = None, force: bool = False,
+              styles_url: Optional[str] = None) -> Dict[str, Any]:
+        """Build bundles for the given issues (default: all) and update the manifest.
+
+        ``styles_url`` is the content stylesheet (see ContentStyles) the
+        manifest points at; without it the manifest keeps its current one.
+        Returns a report with per-issue compiled/reused chapter counts and timings.
+        """
+        state, stale = self._load_state()
+        manifest, current_styles = self._load_manifest()
+        all_issues = [issue['name'] for issue in self.file_manager.list_issues()]
+        names = issue_names or all_issues
+        if stale:
+            # The old manifest was discarded with the old state, so every issue must be rebuilt
+            names = sorted(set(names) | set(all_issues))
+        for issue_name in names:
+            if issue_name not in all_issues:
+                raise FileNotFoundError(f"Issue '{issue_name}' not found")
+
+        report: Dict[str, Any] = {'issues': {}, 'removed': []}
+        pending = []
+        for issue_name in names:
+            previous = state.get(issue_name)
+            if not force and self._is_current(issue_name, previous):
+                manifest[issue_name] = previous['manifest']
+                report['issues'][issue_name] = {'compiled': 0, 'reused': len(previous['chapters']),
+                                                'skipped': True, 'ms': 0.0}
+            else:
+                pending.append(issue_name)
+
+        for issue_name, (entry, issue_state, issue_report) in self._compile(pending, state, force).items():
+            manifest[issue_name] = entry
+            state[issue_name] = issue_state
+            report['issues'][issue_name] = issue_report
+
+        if issue_names is None:
+            # Drop bundles of issues that no longer exist
+            for issue_name in set(state) - set(all_issues):
+                report['removed'] += self._remove_files(issue_name, state.pop(issue_name), [])
+                manifest.pop(issue_name, None)
+
+        # Bundles from an older format are never reused; delete those the rebuild didn't reproduce
+        for issue_name, previous in stale.items():
+            kept = state.get(issue_name, {}).get('chapters', [])
+            report['removed'] += self._remove_files(issue_name, previous, kept)
+
+        manifest_content = json.dumps({'version': BUNDLE_VERSION, 'issues': manifest,
+                                       'styles': styles_url or current_styles},
+                                      ensure_ascii=False, indent=2, sort_keys=True)
+        report['manifest_changed'] = write_if_changed(self.manifest_path, manifest_content + '\n')
+        self._save_state(state)
+        return report
+
+    def build_issue(self, issue_name: str, previous: Optional[Dict[str, Any]] = None, force: bool = False):
+        """Compile one issue; returns (manifest entry, build state, report)"""
+        start = time.perf_counter()
+        if not force and self._is_current(issue_name, previous):
+            return previous['manifest'], previous, {'compiled': 0, 'reused': len(previous['chapters']),
+                                                    'skipped': True, 'ms': 0.0}
+
+        config_path = self.file_manager.get_config_path(issue_name)
+        issue_dir = self.output_path / issue_name
+        stamp = list(self.file_manager.issue_stamp(issue_name))
+        previous = previous or {}
+        document = self.file_manager.read_document(issue_name)
+        reusable = {} if force else {chapter['source']: chapter['file'] for chapter in previous.get('chapters', [])}
+
+        chapters_state = []
+        chapters_manifest = []
+        compiled = 0
+        for chapter_index, chapter in enumerate(document.issue['chapters']):
+            source = content_hash(document.chapter_source(chapter_index).encode('utf-8'))
+            file_name = reusable.get(source)
+            if file_name is None or not (issue_dir / file_name).exists():
+                data = chapter_bundle(chapter)
+                stem = _UNSAFE_FILENAME.sub('-', str(chapter.get('id') or f'chapter-{chapter_index + 1}'))
+                file_name = f"{stem}.{content_hash(data)}.json"
+                issue_dir.mkdir(parents=True, exist_ok=True)
+                if not (issue_dir / file_name).exists():
+                    atomic_write_text(issue_dir / file_name, data.decode('utf-8'), fsync=False)
+                compiled += 1
+
+            chapters_state.append({'source': source, 'file': file_name})
+            chapters_manifest.append({
+                'id': chapter.get('id'),
+                'title': chapter.get('title'),
+                'pageCount': len(chapter.get('pages', [])),
+                'url': f"/{self.output_path.name}/{issue_name}/{file_name}",
+            })
+
+        fields = {key: cook_value(value, key) for key, value in document.issue.items() if key != 'chapters'}
+        entry = {**fields, 'format': document.format, 'chapters': chapters_manifest}
+        issue_state = {'path': str(config_path), 'stamp': stamp, 'chapters': chapters_state, 'manifest': entry}
+        removed = self._remove_files(issue_name, previous, chapters_state)
+        return entry, issue_state, {'compiled': compiled, 'reused': len(chapters_state) - compiled,
+                                    'removed': len(removed), 'skipped': False,
+                                    'ms': (time.perf_counter() - start) * 1000}
+
+    def _is_current(self, issue_name: str, previous: Optional[Dict[str, Any]]) -> bool:
+        """Whether an issue's bundles were built from its current config file"""
+        if not previous:
+            return False
+        issue_dir = self.output_path / issue_name
+        return (previous.get('path') == str(self.file_manager.get_config_path(issue_name))
+                and previous.get('stamp') == list(self.file_manager.issue_stamp(issue_name))
+                and all((issue_dir / chapter['file']).exists() for chapter in previous.get('chapters', [])))
+
+    def _compile(self, issue_names: List[str], state: Dict[str, Any], force: bool) -> Dict[str, tuple]:
+        """Build issues in worker processes (inline when there is only one)"""
+        if len(issue_names) <= 1 or self.workers == 1:
+            return {name: self.build_issue(name, state.get(name), force) for name in issue_names}
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {name: pool.submit(_build_issue_in_worker, str(self.output_path), name, state.get(name), force)
+                       for name in issue_names}
+            return {name: future.result() for name, future in futures.items()}
+
+    def _remove_files(self, issue_name: str, previous: Dict[str, Any], keep: List[Dict[str, Any]]) -> List[str]:
+        """Delete bundle files recorded in previous state that are not kept"""
+        kept = {chapter['file'] for chapter in keep}
+        removed = []
+        for chapter in (previous or {}).get('chapters', []):
+            if chapter['file'] in kept:
+                continue
+            path = self.output_path / issue_name / chapter['file']
+            try:
+                path.unlink()
+                removed.append(str(path))
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def _load_manifest(self) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Return the manifest's issue entries and stylesheet URL"""
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return {}, None
+        if data.get('version') != BUNDLE_VERSION:
+            return {}, None
+        return data.get('issues', {}), data.get('styles')
+
+    def _load_state(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return the build state, and the state of an older bundle version whose files need pruning"""
+        try:
+            data = json.loads(self.state_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return {}, {}
+        if data.get('version') == BUNDLE_VERSION:
+            return data.get('issues', {}), {}
+        return {}, data.get('issues', {})
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        content = json.dumps({'version': BUNDLE_VERSION, 'issues': state}, indent=2, sort_keys=True)
+        try:
+            write_if_changed(self.state_path, content)
+        except OSError:
+            # The state only makes rebuilds incremental; the bundles are still correct
+            pass
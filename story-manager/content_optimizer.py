@@ -0,0 +1,266 @@
+"""
+Content Optimizer for Lexicon Quest Story Manager
+Writes minified copies of story configs with repeated markup hoisted into shared constants.
+"""
+
+import hashlib
+import json
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from file_manager import FileManager
+from search_index import html_text
+from story_document import StoryDocument, is_template_value, render_story_config
+from write_pipeline import write_if_changed
+
+# storyConfig.ts -> storyConfig.optimized.ts, next to the source so its relative imports still resolve
+OPTIMIZED_SUFFIX = '.optimized'
+# Shortest fragment worth a constant, and an upper bound on constants per issue
+MIN_FRAGMENT = 24
+MAX_FRAGMENTS = 200
+# The optimized copy names the SHA-256 of its source; the Vite build uses it only while they match
+SOURCE_HASH_PREFIX = 'Source sha256: '
+
+# Elements whose surrounding whitespace never renders (unless a class makes them inline)
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'details', 'dialog', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hgroup', 'hr', 'li',
+    'main', 'nav', 'ol', 'p', 'section', 'summary', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+})
+VOID_TAGS = frozenset({'area', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'})
+_INLINE_CLASSES = frozenset({'inline', 'inline-block', 'inline-flex', 'inline-grid', 'contents'})
+
+_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+_TOKEN = re.compile(r'<[a-zA-Z/][^<>]*>|[^<]+|<')
+_TAG_NAME = re.compile(r'</?([a-zA-Z][\w-]*)')
+_HTML_SPACE = re.compile(r'[ \t\r\n\f]+')
+_TAG_SPACE = re.compile(r'("[^"]*"|\'[^\']*\')|[ \t\r\n\f]+')
+_CLASS_VALUE = re.compile(r'(\bclass=")([^"]*)(")')
+# Content whose whitespace is significant or that we can't reason about: leave it as written
+_PRESERVE = re.compile(r'<(?:pre|textarea|script|style)\b|white-?space|\\[ \t\r\n]|\$\{', re.IGNORECASE)
+
+_START_TAG = re.compile(r'<[a-zA-Z][^<>]*>')
+_CLASS_ATTRIBUTE = re.compile(r'\bclass="([^"]+)"')
+_UNSAFE_FRAGMENT = re.compile(r'[\\`${}]')
+
+
+def _is_block(tag: str) -> Tuple[str, bool]:
+    """(name, renders as a block) for a start or end tag"""
+    name = _TAG_NAME.match(tag).group(1).lower()
+    if name not in BLOCK_TAGS:
+        return name, False
+    classes = _CLASS_VALUE.search(tag)
+    inline = classes and _INLINE_CLASSES.intersection(classes.group(2).split())
+    return name, not inline and 'style=' not in tag.replace(' ', '').lower() or name == 'br'
+
+
+def _minify_tag(tag: str) -> str:
+    tag = _TAG_SPACE.sub(lambda match: match.group(1) or ' ', tag)
+    tag = tag.replace(' >', '>').replace(' />', '/>')
+    return _CLASS_VALUE.sub(lambda match: match.group(1) + ' '.join(match.group(2).split()) + match.group(3), tag)
+
+
+def minify_html(source: str) -> str:
+    """Minify template source of an HTML fragment so it renders exactly the same.
+
+    Comments are dropped, whitespace next to block elements (where the
+    browser never renders it) is removed, other runs of whitespace become
+    one space, and whitespace inside tags and class lists is collapsed.
+    Content with <pre>, scripts, white-space styles, ${...} expressions or
+    line continuations is returned unchanged.
+    """
+    if _PRESERVE.search(source):
+        return source
+    tokens = _TOKEN.findall(_COMMENT.sub('', source))
+
+    # Whether each tag is a block boundary; end tags take the answer of their start tag
+    boundaries: List[Optional[bool]] = []
+    open_tags: List[Tuple[str, bool]] = []
+    for token in tokens:
+        if not token.startswith('<') or token == '<':
+            boundaries.append(None)
+            continue
+        name, block = _is_block(token)
+        if token.startswith('</'):
+            for index in range(len(open_tags) - 1, -1, -1):
+                if open_tags[index][0] == name:
+                    block = open_tags[index][1]
+                    del open_tags[index:]
+                    break
+        elif name not in VOID_TAGS and not token.endswith('/>'):
+            open_tags.append((name, block))
+        boundaries.append(block)
+
+    output = []
+    for index, token in enumerate(tokens):
+        if boundaries[index] is not None:
+            output.append(_minify_tag(token))
+            continue
+        text = _HTML_SPACE.sub(' ', token)
+        # The start and end of the fragment count as block edges
+        if index == 0 or boundaries[index - 1]:
+            text = text.lstrip(' ')
+        if index == len(tokens) - 1 or boundaries[index + 1]:
+            text = text.rstrip(' ')
+        output.append(text)
+    minified = ''.join(output)
+
+    # Safety net against tokenizing mistakes: the visible text must not change
+    if html_text(minified) != html_text(source):
+        return source
+    return minified
+
+
+def _template_values(value: Any):
+    """Yield (container, key) for every template-literal string in a model value"""
+    if isinstance(value, dict):
+        for item_key, item in value.items():
+            if is_template_value(item_key, item):
+                yield value, item_key
+            else:
+                yield from _template_values(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _template_values(item)
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _fragment_name(index: int) -> str:
+    return f'f{index}'
+
+
+def hoist_fragments(texts: List[str], reserved: str = '') -> Tuple[List[str], List[Tuple[str, str, int]]]:
+    """Replace markup repeated across texts with ${name} references.
+
+    Candidates are start tags and class lists; each is hoisted only if its
+    occurrences save more than the constant costs, largest saving first.
+    Returns the new texts and (name, fragment, occurrences) per constant.
+    """
+    candidates = set()
+    for text in texts:
+        candidates.update(tag for tag in _START_TAG.findall(text) if len(tag) >= MIN_FRAGMENT)
+        candidates.update(value for value in _CLASS_ATTRIBUTE.findall(text) if len(value) >= MIN_FRAGMENT)
+    candidates = {fragment for fragment in candidates if not _UNSAFE_FRAGMENT.search(fragment)}
+
+    def saving(fragment: str, name: str) -> Tuple[int, int]:
+        count = sum(text.count(fragment) for text in texts)
+        declaration = len(f'const {name} = {json.dumps(fragment, ensure_ascii=False)};\n'.encode('utf-8'))
+        return count * (len(fragment.encode('utf-8')) - len(f'${{{name}}}')) - declaration, count
+
+    fragments = []
+    index = 1
+    # Greedy, re-counting after each hoist since a longer fragment may absorb shorter ones
+    while candidates and len(fragments) < MAX_FRAGMENTS:
+        name = _fragment_name(index)
+        if re.search(rf'\b{name}\b', reserved):
+            index += 1
+            continue
+        scored = sorted(((saving(fragment, name), fragment) for fragment in candidates), reverse=True)
+        (best, count), fragment = scored[0]
+        if best <= 0 or count < 2:
+            break
+        candidates.discard(fragment)
+        texts = [text.replace(fragment, f'${{{name}}}') for text in texts]
+        fragments.append((name, fragment, count))
+        index += 1
+    return texts, fragments
+
+
+def source_hash_line(source: str) -> str:
+    """Header line recording the source an optimized copy was made from (read by vite.config.ts)"""
+    return f"{SOURCE_HASH_PREFIX}{hashlib.sha256(source.encode('utf-8')).hexdigest()}"
+
+
+def _gzip_size(text: str) -> int:
+    return len(zlib.compress(text.encode('utf-8'), 9))
+
+
+class ContentOptimizer:
+    """Build step that writes a minified copy of each story config.
+
+    ``<config>.optimized.ts`` sits next to the source config and exports
+    the same object: template-literal content is minified with
+    ``minify_html`` and markup repeated across pages becomes shared
+    ``const`` strings referenced as ``${f1}``. Production builds import it
+    instead of the source (see vite.config.ts) only while the source hash
+    in its header matches the config, so an edit made after the last
+    ``optimize`` is never hidden; the source config stays as authored and
+    is what the story manager edits.
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None):
+        self.file_manager = file_manager or FileManager()
+
+    def optimized_path(self, issue_name: str):
+        config_path = self.file_manager.get_config_path(issue_name)
+        return config_path.with_name(f"{config_path.stem}{OPTIMIZED_SUFFIX}{config_path.suffix}")
+
+    def optimize(self, issue_names: Optional[List[str]] = None, write: bool = True) -> List[Dict[str, Any]]:
+        """Optimize the given issues (default: all); returns one report per issue"""
+        names = issue_names or [entry.issue for entry in self.file_manager.story_index_entries()]
+        return [self.optimize_issue(issue_name, write) for issue_name in names]
+
+    def optimize_issue(self, issue_name: str, write: bool = True) -> Dict[str, Any]:
+        """Write one issue's optimized config; the report gives bytes before and after each pass"""
+        document = self.file_manager.read_document(issue_name)
+        config_path = self.file_manager.get_config_path(issue_name)
+        minified_text, optimized_text, stats = self.render(document, config_path.name)
+
+        path = self.optimized_path(issue_name)
+        changed = False
+        if write:
+            changed = write_if_changed(path, optimized_text)
+
+        source = document.text
+        return {
+            'issue': issue_name,
+            'path': str(path),
+            'changed': changed,
+            'bytes': len(source.encode('utf-8')),
+            'minifiedBytes': len(minified_text.encode('utf-8')),
+            'optimizedBytes': len(optimized_text.encode('utf-8')),
+            'gzipBytes': _gzip_size(source),
+            'optimizedGzipBytes': _gzip_size(optimized_text),
+            **stats,
+        }
+
+    @staticmethod
+    def render(document: StoryDocument, source_name: str) -> Tuple[str, str, Dict[str, Any]]:
+        """(minified config, minified config with hoisted fragments, counts) for a document"""
+        issue = _copy(document.issue)
+        slots = list(_template_values(issue))
+        minified = 0
+        for container, key in slots:
+            value = minify_html(container[key])
+            minified += value != container[key]
+            container[key] = value
+
+        header = (f"// Optimized copy of {source_name}, generated by story-manager - do not edit by hand.\n"
+                  f"// Regenerate with: python3 story-manager/story_cli.py optimize\n"
+                  f"// {source_hash_line(document.text)}\n")
+        minified_text = render_story_config(issue, document.export_name, document.type_name,
+                                            header + document.header, document.trailer)
+
+        texts, fragments = hoist_fragments([container[key] for container, key in slots],
+                                           document.header + document.export_name)
+        for (container, key), text in zip(slots, texts):
+            container[key] = text
+        constants = ''.join(f'const {name} = {json.dumps(fragment, ensure_ascii=False)};\n'
+                            for name, fragment, _ in fragments)
+        optimized_text = render_story_config(issue, document.export_name, document.type_name,
+                                             header + document.header + constants + ('\n' if constants else ''),
+                                             document.trailer)
+        stats = {
+            'values': len(slots),
+            'minified': minified,
+            'fragments': [{'name': name, 'fragment': fragment, 'count': count} for name, fragment, count in fragments],
+        }
+        return minified_text, optimized_text, stats
@@ -0,0 +1,343 @@
+"""
+Content Styles for Lexicon Quest Story Manager
+Indexes the Tailwind classes story pages use and builds a content-hashed CSS subset for them.
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from block_renderer import page_html
+from file_manager import FileManager
+from issue_cache import file_stamp, issue_cache
+from story_events import story_events
+from write_pipeline import atomic_write_text, write_if_changed
+
+# Bump when class extraction or the generated CSS changes so everything is rebuilt
+STYLES_VERSION = 2
+STYLESHEET_PREFIX = 'content'
+HASH_LENGTH = 10
+# Pages of the story manager itself that use the stylesheet
+EXTRA_SOURCES = (Path(__file__).parent / 'preview.html',)
+# Compiles the stylesheet with the site's PostCSS plugins (needs npm install)
+TAILWIND_SCRIPT = Path(__file__).parent / 'tailwind_styles.mjs'
+TAILWIND_TIMEOUT = 120
+
+_CLASS_ATTRIBUTE = re.compile(r'\bclass(?:Name)?\s*=\s*(["\'])(.*?)\1', re.DOTALL)
+_STYLESHEET = re.compile(rf'{STYLESHEET_PREFIX}\.[0-9a-f]+\.css')
+_TAILWIND_IMPORT = re.compile(r"""@import\s+(["'])tailwindcss\1[^;]*;""")
+_TAILWIND_SUBSET_IMPORT = '@import "tailwindcss" source(none);'
+
+
+def extract_classes(html: str) -> Set[str]:
+    """Class names used in the class attributes of an HTML fragment"""
+    classes: Set[str] = set()
+    for match in _CLASS_ATTRIBUTE.finditer(html):
+        # Skip template placeholders such as {{ name }}
+        classes.update(name for name in match.group(2).split() if '{' not in name and '}' not in name)
+    return classes
+
+
+def page_classes(page: Dict[str, Any]) -> List[str]:
+    """Classes a page renders with (htmlContent, or the markup of its content blocks)"""
+    return sorted(extract_classes(page_html(page)))
+
+
+def _page_digest(page: Dict[str, Any]) -> str:
+    fields = {key: value for key, value in page.items() if key in ('htmlContent', 'content')}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+# Generation
+
+def tailwind_input(site_css: str, classes: Iterable[str]) -> str:
+    """The site stylesheet with Tailwind limited to the given classes.
+
+    Automatic source detection is switched off and the classes are listed
+    with ``@source inline()``, so Tailwind generates utilities for exactly
+    these classes, with the site's theme and custom CSS.
+    """
+    inline = ' '.join(sorted(set(classes))).replace('\\', '\\\\').replace('"', '\\"')
+    css, found = _TAILWIND_IMPORT.subn(_TAILWIND_SUBSET_IMPORT, site_css, count=1)
+    if not found:
+        css = f"{_TAILWIND_SUBSET_IMPORT}\n{site_css}"
+    return f'{css}\n@source inline("{inline}");\n'
+
+
+def build_css(classes: Iterable[str], site_stylesheet: Path) -> str:
+    """Compile the stylesheet for a set of classes with the site's Tailwind.
+
+    Runs tailwind_styles.mjs, which applies the PostCSS plugins of
+    postcss.config.js as the Vite build does. Raises RuntimeError when Node
+    or the npm packages are missing, or Tailwind fails.
+    """
+    try:
+        site_css = site_stylesheet.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        site_css = ''
+    try:
+        result = subprocess.run(['node', str(TAILWIND_SCRIPT), str(site_stylesheet)],
+                                input=tailwind_input(site_css, classes), capture_output=True, text=True,
+                                encoding='utf-8', cwd=TAILWIND_SCRIPT.parent.parent,
+                                env={**os.environ, 'NODE_ENV': 'production'}, timeout=TAILWIND_TIMEOUT)
+    except FileNotFoundError:
+        raise RuntimeError("Node.js is required to build the content stylesheet")
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"Tailwind did not finish within {TAILWIND_TIMEOUT} s")
+    if result.returncode != 0:
+        lines = [line.strip() for line in result.stderr.splitlines() if line.strip()]
+        message = next((line for line in lines if 'Error' in line), lines[-1] if lines else 'no output')
+        hint = ' (run npm install)' if 'ERR_MODULE_NOT_FOUND' in result.stderr else ''
+        raise RuntimeError(f"Tailwind failed{hint}: {message}")
+    return result.stdout
+
+
+class ContentStyles:
+    """Index of the classes every page uses, and the CSS subset built from it.
+
+    The index is kept next to storyIndex.ts with, per issue, the config
+    stamp and the classes of each page keyed by a hash of its content.
+    ``refresh`` stats each issue's config (or uses the in-memory stamp of
+    unsaved edits) and rescans only the pages of changed issues whose
+    content hash is new. ``build`` compiles ``content.<hash>.css`` next to
+    the bundles with the site's Tailwind only when the union of classes (or
+    src/index.css) changed. Older stylesheets are kept until ``story_cli.py build``
+    prunes them, since the manifest of the last build may still point at
+    one. When Tailwind can't run, the previous stylesheet stays current and
+    the report carries the error.
+
+    A build can take as long as a Tailwind compile, so the web GUI never
+    runs one while answering a request: ``schedule_build`` runs it in a
+    background thread and ``url`` returns the last built stylesheet.
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None, output_path: Optional[Path] = None,
+                 extra_sources: Iterable[Path] = EXTRA_SOURCES):
+        self.file_manager = file_manager or FileManager()
+        self.output_path = output_path or self.file_manager.project_root / "public" / "issues"
+        self.state_path = self.file_manager.data_path / "storyStyles.meta.json"
+        self.site_stylesheet = self.file_manager.project_root / "src" / "index.css"
+        self.extra_sources = list(extra_sources)
+        self._state: Optional[Dict[str, Any]] = None
+        # (digest, error) of the last failed compile, so it isn't retried until something changes
+        self._failure: Optional[Tuple[str, str]] = None
+        self._source_stamps: Dict[Path, Any] = {}
+        self._lock = threading.Lock()
+        self._url: Optional[str] = None
+        self._url_known = False
+        self._build_requested = False
+        self._builder: Optional[threading.Thread] = None
+        self._schedule_lock = threading.Lock()
+        # Printed once per distinct error, not on every background build
+        self._reported_error: Optional[str] = None
+
+    def url(self) -> Optional[str]:
+        """URL of the last built stylesheet (None if there is none); never scans or compiles"""
+        # Read the saved state once, unless a build holds it (that build sets the URL)
+        if not self._url_known and self._lock.acquire(blocking=False):
+            try:
+                if not self._url_known:
+                    self._set_url(self._load().get('file'))
+            finally:
+                self._lock.release()
+        return self._url
+
+    def schedule_build(self) -> None:
+        """Build in a background thread; calls made while a build runs are coalesced into one more build.
+
+        When the stylesheet URL changes, a ``styles`` event tells open
+        previews to pick it up.
+        """
+        with self._schedule_lock:
+            self._build_requested = True
+            if self._builder is None:
+                self._builder = threading.Thread(target=self._build_in_background, name='content-styles',
+                                                 daemon=True)
+                self._builder.start()
+
+    def _build_in_background(self) -> None:
+        while True:
+            with self._schedule_lock:
+                if not self._build_requested:
+                    self._builder = None
+                    return
+                self._build_requested = False
+            previous = self.url()
+            try:
+                report = self.build()
+            except Exception as e:
+                print(f"⚠️  Content stylesheet build failed: {e}")
+                continue
+            if report['error'] and report['error'] != self._reported_error:
+                print(f"⚠️  Content stylesheet not built: {report['error']}")
+            self._reported_error = report['error']
+            if report['url'] != previous:
+                story_events.publish({'type': 'styles', 'url': report['url']})
+
+    def refresh(self) -> Dict[str, int]:
+        """Rescan changed pages; returns counts"""
+        with self._lock:
+            return self._refresh()
+
+    def build(self, force: bool = False, prune: bool = False) -> Dict[str, Any]:
+        """Refresh the index and compile the stylesheet if the class set changed; returns a report
+
+        With prune, stylesheets other than the current one are deleted.
+        """
+        with self._lock:
+            counts = self._refresh()
+            state = self._state
+            classes = self._classes()
+            try:
+                site_css = self.site_stylesheet.read_bytes()
+            except FileNotFoundError:
+                site_css = b''
+            digest = hashlib.sha1(f"{STYLES_VERSION}\n{' '.join(classes)}\n".encode('utf-8') + site_css).hexdigest()
+            current = state.get('file')
+            stale = force or digest != state.get('digest') or not current or \
+                not (self.output_path / current).exists()
+            changed = False
+            if stale and (force or not self._failure or self._failure[0] != digest):
+                try:
+                    css = build_css(classes, self.site_stylesheet)
+                except RuntimeError as e:
+                    self._failure = (digest, str(e))
+                else:
+                    self._failure = None
+                    file_name = f"{STYLESHEET_PREFIX}.{hashlib.sha256(css.encode('utf-8')).hexdigest()[:HASH_LENGTH]}.css"
+                    self.output_path.mkdir(parents=True, exist_ok=True)
+                    write_if_changed(self.output_path / file_name, css)
+                    state.update({'digest': digest, 'file': file_name, 'bytes': len(css.encode('utf-8'))})
+                    counts['dirty'] = changed = True
+            if counts.pop('dirty', False):
+                self._save()
+            current = state.get('file')
+            self._set_url(current)
+            removed = self._prune(current) if prune and current else []
+            return {
+                'url': self._url,
+                'file': current,
+                'changed': changed,
+                'classes': len(classes),
+                'bytes': state.get('bytes', 0),
+                'error': self._failure[1] if stale and self._failure else None,
+                'pruned': removed,
+                **counts,
+            }
+
+    def _set_url(self, file_name: Optional[str]) -> None:
+        self._url = f"/{self.output_path.name}/{file_name}" if file_name else None
+        self._url_known = True
+
+    def stylesheet(self, file_name: str) -> Optional[Path]:
+        """Path of a generated stylesheet by file name (None for anything else)"""
+        if not _STYLESHEET.fullmatch(file_name):
+            return None
+        path = self.output_path / file_name
+        return path if path.is_file() else None
+
+    def _prune(self, keep: str) -> List[str]:
+        removed = []
+        for path in self.output_path.glob(f'{STYLESHEET_PREFIX}.*.css'):
+            if path.name != keep and _STYLESHEET.fullmatch(path.name):
+                try:
+                    path.unlink()
+                    removed.append(str(path))
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    # Index
+
+    def _refresh(self) -> Dict[str, Any]:
+        state = self._load()
+        issues = state['issues']
+        seen = set()
+        scanned = 0
+        dirty = False
+        for issue_name in self._issue_names():
+            config_path = self.file_manager.get_config_path(issue_name)
+            try:
+                stamp = list(issue_cache.stamp(config_path))
+            except FileNotFoundError:
+                continue
+            seen.add(issue_name)
+            entry = issues.get(issue_name)
+            if entry and entry['path'] == str(config_path) and entry['stamp'] == stamp:
+                continue
+            try:
+                document = self.file_manager.read_document(issue_name)
+            except (OSError, ValueError):
+                continue
+            known = entry['pages'] if entry else {}
+            pages = {}
+            for chapter in document.issue['chapters']:
+                for page in chapter.get('pages', []):
+                    digest = _page_digest(page)
+                    if digest in pages:
+                        continue
+                    if digest in known:
+                        pages[digest] = known[digest]
+                    else:
+                        pages[digest] = page_classes(page)
+                        scanned += 1
+            issues[issue_name] = {'path': str(config_path), 'stamp': stamp, 'pages': pages}
+            dirty = True
+
+        removed = set(issues) - seen
+        for issue_name in removed:
+            del issues[issue_name]
+
+        sources = state.setdefault('sources', {})
+        for path in self.extra_sources:
+            try:
+                stamp = file_stamp(path)
+                if self._source_stamps.get(path) != stamp:
+                    classes = sorted(extract_classes(path.read_text(encoding='utf-8')))
+                    self._source_stamps[path] = stamp
+                    if classes != sources.get(path.name):
+                        sources[path.name] = classes
+                        dirty = True
+            except OSError:
+                continue
+        return {'issues': len(issues), 'scanned': scanned, 'removed': len(removed), 'dirty': dirty or bool(removed)}
+
+    def _classes(self) -> List[str]:
+        classes: Set[str] = set()
+        for entry in self._state['issues'].values():
+            for names in entry['pages'].values():
+                classes.update(names)
+        for names in self._state.get('sources', {}).values():
+            classes.update(names)
+        return sorted(classes)
+
+    def _issue_names(self) -> List[str]:
+        try:
+            with os.scandir(self.file_manager.components_path) as entries:
+                return [entry.name for entry in entries if entry.is_dir() and not entry.name.startswith('.')]
+        except FileNotFoundError:
+            return []
+
+    def _load(self) -> Dict[str, Any]:
+        if self._state is None:
+            try:
+                data = json.loads(self.state_path.read_text(encoding='utf-8'))
+            except (FileNotFoundError, ValueError):
+                data = {}
+            self._state = data if data.get('version') == STYLES_VERSION else {}
+            self._state.setdefault('version', STYLES_VERSION)
+            self._state.setdefault('issues', {})
+        return self._state
+
+    def _save(self) -> None:
+        try:
+            atomic_write_text(self.state_path, json.dumps(self._state, ensure_ascii=False, sort_keys=True),
+                              fsync=False)
+        except OSError:
+            # The index is rebuilt from the issues on the next run
+            pass
@@ -0,0 +1,344 @@
+"""
+Edit Journal for Lexicon Quest Story Manager
+Append-only history of every edit to a story config, with undo, redo and restore.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from write_pipeline import atomic_write_text
+
+JOURNAL_PATH = Path(__file__).parent.parent / "src" / "data" / "storyJournal"
+# A full copy of the file every this many edits, so restoring replays at most that many deltas
+CHECKPOINT_INTERVAL = 64
+# Records kept per config; older history is dropped once a journal holds twice as many
+MAX_RECORDS = 1000
+# Operation arguments longer than this are left out of the journal (the delta has the content)
+MAX_ARGUMENT_LENGTH = 200
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def text_delta(old: str, new: str) -> Tuple[int, int, str]:
+    """(position, characters deleted, text inserted) turning old into new.
+
+    Edits splice one region of the file, so the common prefix and suffix
+    are found by binary search on slice comparisons instead of char by char.
+    """
+    limit = min(len(old), len(new))
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[:middle] == new[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = low
+    low, high = 0, limit - prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[len(old) - middle:] == new[len(new) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    suffix = low
+    return prefix, len(old) - prefix - suffix, new[prefix:len(new) - suffix]
+
+
+def apply_delta(text: str, position: int, deleted: int, inserted: str) -> str:
+    return text[:position] + inserted + text[position + deleted:]
+
+
+class _Journal:
+    """In-memory state of one journal file: the current text plus an index of its records"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.size = 0
+        self.text: Optional[str] = None
+        self.digest: Optional[str] = None
+        # Record metadata (no content) in order, with the file offset of each line
+        self.records: List[Dict[str, Any]] = []
+        self.seqs: List[int] = []
+        self.since_checkpoint = 0
+        self.delta_bytes = 0
+        # Seqs whose text undo/redo go back/forward to; head is the seq the current text equals
+        self.head: Optional[int] = None
+        self.undo: List[int] = []
+        self.redo: List[int] = []
+
+    @property
+    def last_seq(self) -> int:
+        return self.seqs[-1] if self.seqs else 0
+
+    def advance(self, record: Dict[str, Any]) -> None:
+        """Move the undo/redo stacks past one record"""
+        op = record['op']
+        if self.head is None:
+            self.head = record['seq']
+        elif op == 'write-failed':
+            # The head version never reached the file; this record (the file as it is) replaces it
+            # and the version before it, which it normally equals
+            if self.undo and self._digest(self.undo[-1]) == record['digest']:
+                self.undo.pop()
+            self.head = record['seq']
+        elif op in ('undo', 'redo') and record.get('to', 0) >= self.seqs[0]:
+            # The record names the version it went back (or forward) to
+            back, forward = (self.undo, self.redo) if op == 'undo' else (self.redo, self.undo)
+            forward.append(self.head)
+            if back and back[-1] == record['to']:
+                back.pop()
+            self.head = record['to']
+        else:
+            # A new version, as is an undo or redo to a version that compaction dropped
+            self.undo.append(self.head)
+            self.head = record['seq']
+            self.redo.clear()
+
+    def _digest(self, seq: int) -> Optional[str]:
+        position = bisect_right(self.seqs, seq) - 1
+        return self.records[position]['digest'] if position >= 0 and self.seqs[position] == seq else None
+
+
+class EditJournal:
+    """Per-config NDJSON journals of edits under src/data/storyJournal/<issue>/.
+
+    Each write appends one record naming the operation and holding the
+    text delta from the previous version (one spliced region, as
+    StoryDocument edits produce), or every CHECKPOINT_INTERVAL records a
+    full copy of the file. Any version can be rebuilt from the nearest
+    checkpoint before it, so undo, redo and restore cost at most
+    CHECKPOINT_INTERVAL deltas. Undo, redo and restore are themselves
+    appended as records, so the file is never rewritten except by
+    compaction, which keeps the newest MAX_RECORDS records.
+    """
+
+    def __init__(self, root: Path = JOURNAL_PATH):
+        self.root = root
+        self._journals: Dict[Path, _Journal] = {}
+        self._lock = threading.RLock()
+
+    def journal_path(self, config_path: Path) -> Path:
+        return self.root / config_path.parent.name / f"{config_path.stem}.ndjson"
+
+    # Recording
+
+    def record(self, config_path: Path, text: str, operation: Optional[Dict[str, Any]] = None,
+               on_disk: bool = False) -> Optional[int]:
+        """Append the new text of a config; returns the record's seq (None if nothing changed).
+
+        With on_disk, the file on disk is known to hold the previous
+        version; if it differs from the journal (edited outside the story
+        manager) a checkpoint of it is recorded first.
+        """
+        operation = operation or {'op': 'write'}
+        with self._lock:
+            journal = self._journal(config_path)
+            if on_disk:
+                self._record_external(config_path, journal)
+            if text == journal.text and operation['op'] not in ('undo', 'redo'):
+                # Undo and redo are recorded regardless, to keep their stacks in step
+                return None
+            return self._append(journal, operation, text)
+
+    def record_external(self, config_path: Path) -> Optional[int]:
+        """Checkpoint the file on disk if it was edited outside the story manager; returns the seq"""
+        with self._lock:
+            return self._record_external(config_path, self._journal(config_path))
+
+    def record_failed_write(self, config_path: Path) -> Optional[int]:
+        """Record that the newest recorded text never reached the file; returns the seq.
+
+        The file's text is appended as a ``write-failed`` record that takes
+        the place of the lost version, so the journal again ends with what
+        is on disk and undo doesn't step through the lost version.
+        """
+        with self._lock:
+            return self._record_external(config_path, self._journal(config_path), 'write-failed')
+
+    def _record_external(self, config_path: Path, journal: _Journal, op: str = 'external') -> Optional[int]:
+        try:
+            current = config_path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+        if text_digest(current) == journal.digest:
+            return None
+        return self._append(journal, {'op': op if journal.records else 'base'}, current)
+
+    def _append(self, journal: _Journal, operation: Dict[str, Any], text: str) -> int:
+        record: Dict[str, Any] = {'seq': journal.last_seq + 1, 'time': round(time.time(), 3), 'op': operation['op']}
+        record.update((key, value) for key, value in operation.items()
+                      if key != 'op' and (isinstance(value, (bool, int, float))
+                                          or isinstance(value, str) and len(value) <= MAX_ARGUMENT_LENGTH))
+        checkpoint = (journal.text is None or journal.since_checkpoint >= CHECKPOINT_INTERVAL
+                      or journal.delta_bytes >= len(text))
+        if checkpoint:
+            record['text'] = text
+        else:
+            record['at'], record['delete'], record['insert'] = text_delta(journal.text, text)
+        record['digest'] = text_digest(text)
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+        journal.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(journal.path, 'ab') as handle:
+            handle.write(line)
+        self._index(journal, record, journal.size, len(line))
+        journal.size += len(line)
+        journal.text, journal.digest = text, record['digest']
+
+        if len(journal.records) > 2 * MAX_RECORDS:
+            self._compact(journal, MAX_RECORDS)
+        return record['seq']
+
+    def _index(self, journal: _Journal, record: Dict[str, Any], offset: int, length: int) -> None:
+        checkpoint = 'text' in record
+        if checkpoint:
+            journal.since_checkpoint, journal.delta_bytes = 0, 0
+        else:
+            journal.since_checkpoint += 1
+            journal.delta_bytes += len(record['insert']) + 64
+        meta = {key: value for key, value in record.items() if key not in ('text', 'at', 'delete', 'insert')}
+        meta.update(checkpoint=checkpoint, bytes=length, offset=offset)
+        journal.records.append(meta)
+        journal.seqs.append(record['seq'])
+        journal.advance(record)
+
+    # Reading
+
+    def _journal(self, config_path: Path) -> _Journal:
+        """The loaded journal of a config, replaying its file on first use"""
+        path = self.journal_path(config_path)
+        journal = self._journals.get(path)
+        if journal is None:
+            journal = self._journals[path] = self._load(path)
+        return journal
+
+    def _load(self, path: Path) -> _Journal:
+        journal = _Journal(path)
+        try:
+            handle = open(path, 'rb')
+        except FileNotFoundError:
+            return journal
+        with handle:
+            offset = 0
+            for line in handle:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line)
+                    if 'text' in record:
+                        text = record['text']
+                    elif journal.text is not None:
+                        text = apply_delta(journal.text, record['at'], record['delete'], record['insert'])
+                    else:
+                        raise ValueError("delta without a checkpoint")
+                except (ValueError, KeyError, TypeError):
+                    # A write cut short by a crash: drop it and everything after
+                    break
+                journal.text = text
+                self._index(journal, record, offset, len(line))
+                offset += len(line)
+        if journal.records and text_digest(journal.text) != journal.records[-1]['digest']:
+            # Replay doesn't match what was recorded; keep the file for inspection and start over
+            os.replace(path, path.with_suffix('.corrupt'))
+            return _Journal(path)
+        if offset != path.stat().st_size:
+            with open(path, 'r+b') as handle:
+                handle.truncate(offset)
+        journal.size = offset
+        journal.digest = journal.records[-1]['digest'] if journal.records else None
+        return journal
+
+    def _text_at(self, journal: _Journal, seq: int) -> str:
+        """Rebuild the text after record seq from the nearest checkpoint before it"""
+        position = bisect_right(journal.seqs, seq) - 1
+        if position < 0 or journal.seqs[position] != seq:
+            raise ValueError(f"Version {seq} is not in the journal")
+        start = position
+        while not journal.records[start]['checkpoint']:
+            start -= 1
+        text = None
+        with open(journal.path, 'rb') as handle:
+            handle.seek(journal.records[start]['offset'])
+            for _ in range(position - start + 1):
+                record = json.loads(handle.readline())
+                text = record['text'] if 'text' in record else \
+                    apply_delta(text, record['at'], record['delete'], record['insert'])
+        if text_digest(text) != journal.records[position]['digest']:
+            raise ValueError(f"Version {seq} could not be rebuilt; the journal is damaged")
+        return text
+
+    def text_at(self, config_path: Path, seq: int) -> str:
+        """The config text as it was after record seq"""
+        with self._lock:
+            return self._text_at(self._journal(config_path), seq)
+
+    def undo_target(self, config_path: Path) -> int:
+        """The seq an undo goes back to; raises ValueError when there is nothing to undo"""
+        with self._lock:
+            journal = self._journal(config_path)
+            if not journal.undo:
+                raise ValueError("Nothing to undo")
+            return journal.undo[-1]
+
+    def redo_target(self, config_path: Path) -> int:
+        """The seq a redo goes forward to; raises ValueError when there is nothing to redo"""
+        with self._lock:
+            journal = self._journal(config_path)
+            if not journal.redo:
+                raise ValueError("Nothing to redo")
+            return journal.redo[-1]
+
+    def history(self, config_path: Path, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Recorded operations, newest first, with the undo/redo position"""
+        with self._lock:
+            journal = self._journal(config_path)
+            records = journal.records[::-1][:limit] if limit else journal.records[::-1]
+            return {
+                'head': journal.head,
+                'undo': journal.undo[-1] if journal.undo else None,
+                'redo': journal.redo[-1] if journal.redo else None,
+                'records': [{key: value for key, value in record.items() if key != 'offset'} for record in records],
+                'count': len(journal.records),
+                'bytes': journal.size,
+            }
+
+    # Compaction
+
+    def compact(self, config_path: Path, keep: int = MAX_RECORDS) -> int:
+        """Drop all but the newest keep records; returns the bytes freed"""
+        with self._lock:
+            return self._compact(self._journal(config_path), keep)
+
+    def _compact(self, journal: _Journal, keep: int) -> int:
+        """Rewrite a journal from a checkpoint of its first kept record.
+
+        The undo history starts over at that record; kept undo and redo
+        records that went to a dropped version count as new versions.
+        """
+        keep = max(keep, 1)
+        if len(journal.records) <= keep:
+            return 0
+        first = journal.records[-keep]
+        record = {key: value for key, value in first.items() if key not in ('checkpoint', 'bytes', 'offset')}
+        record['text'] = self._text_at(journal, first['seq'])
+        record['digest'] = first['digest']
+        with open(journal.path, 'rb') as handle:
+            handle.seek(first['offset'] + first['bytes'])
+            rest = handle.read()
+        before = journal.size
+        atomic_write_text(journal.path, json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                          + rest.decode('utf-8'), fsync=False)
+        journal.__dict__.update(self._load(journal.path).__dict__)
+        return before - journal.size
+
+
+edit_journal = EditJournal()
@@ -5,11 +5,27 @@ Handles file operations and project structure management.
 
 import os
 import json
-import re
+import threading
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any, Tuple
+from edit_journal import edit_journal
+from issue_cache import FileStamp, file_stamp, issue_cache
+from issue_index import IssueIndex
+from request_metrics import metrics
+from story_document import StoryDocument
+from story_events import story_events
+from story_index import IndexEntry, indexed_modules, lazy_issues, natural_key, render_story_index
+from story_parser import find_export_name
+from structured_document import SIMPLE_CONFIG_FILE, StructuredStoryDocument
+from write_pipeline import write_if_changed, write_pipeline
+
+CONFIG_FILE = "storyConfig.ts"
 
 class FileManager:
+    # storyIndex.ts is shared by every issue, so its read-modify-write is serialized
+    _story_index_lock = threading.Lock()
+    
     def __init__(self):
         # Get the project root (assuming this script is in website/story-manager/)
         self.project_root = Path(__file__).parent.parent
@@ -17,6 +33,11 @@ class FileManager:
         self.components_path = self.website_path / "src" / "components"
         self.data_path = self.website_path / "src" / "data"
         self.story_index_path = self.data_path / "storyIndex.ts"
+        self.issue_index_path = self.data_path / "storyIndex.meta.json"
+        self.issue_index = IssueIndex(self.components_path, self.issue_index_path, self.load_issue,
+                                      self.get_config_path)
+        self._indexed_configs: Dict[str, str] = {}
+        self._indexed_configs_stamp: Optional[FileStamp] = None
     
     def issue_exists(self, issue_name: str) -> bool:
         """Check if an issue already exists"""
@@ -31,132 +52,218 @@ class FileManager:
     
     def list_issues(self) -> List[Dict[str, Any]]:
         """List all existing issues"""
-        issues = []
-        
-        if not self.components_path.exists():
-            return issues
+        return self._with_unsaved_edits(self.issue_index.refresh())
+    
+    def list_issues_page(self, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """List one page of issues together with the total issue count"""
+        entries, total = self.issue_index.page(offset, limit)
+        return self._with_unsaved_edits(entries), total
+    
+    def _with_unsaved_edits(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace index entries of issues whose edits are still in memory"""
+        if not issue_cache.stats()['dirty']:
+            return entries
+        return [
+            self.load_issue(entry['name']) if issue_cache.is_dirty(self.get_config_path(entry['name'])) else entry
+            for entry in entries
+        ]
+    
+    def get_config_path(self, issue_name: str) -> Path:
+        """Get the config file the site uses for an issue.
         
-        for item in self.components_path.iterdir():
-            if item.is_dir() and not item.name.startswith('.'):
-                # Check if it has a storyConfig.ts file
-                config_file = item / "storyConfig.ts"
-                if config_file.exists():
-                    try:
-                        issue_data = self.load_issue(item.name)
-                        issues.append(issue_data)
-                    except Exception:
-                        # If we can't load the issue, skip it
-                        continue
+        This is the file storyIndex.ts imports for the issue; otherwise
+        storyConfig.ts, or simpleStoryConfig.ts if that is the only one
+        (on disk or waiting to be written).
+        """
+        issue_path = self.components_path / issue_name
+        file_name = self._indexed_config_files().get(issue_name)
+        if file_name is None:
+            simple_path = issue_path / SIMPLE_CONFIG_FILE
+            simple_exists = simple_path.exists() or issue_cache.is_dirty(simple_path)
+            if simple_exists and not (issue_path / CONFIG_FILE).exists():
+                return simple_path
+            file_name = CONFIG_FILE
+        return issue_path / file_name
+    
+    def issue_format(self, issue_name: str) -> str:
+        """'structured' for simpleStoryConfig.ts issues, 'html' for storyConfig.ts"""
+        return 'structured' if self.get_config_path(issue_name).name == SIMPLE_CONFIG_FILE else 'html'
+    
+    def _indexed_config_files(self) -> Dict[str, str]:
+        """Map issue names to the config file storyIndex.ts imports for them"""
+        try:
+            stamp = file_stamp(self.story_index_path)
+        except FileNotFoundError:
+            return {}
+        if stamp != self._indexed_configs_stamp:
+            content = self.story_index_path.read_text(encoding='utf-8')
+            self._indexed_configs = {
+                issue_name: f"{module}.ts" for issue_name, module in indexed_modules(content).items()
+            }
+            self._indexed_configs_stamp = stamp
+        return self._indexed_configs
+    
+    def issue_stamp(self, issue_name: str) -> FileStamp:
+        """Get the (mtime_ns, size, inode) stamp of an issue's storyConfig.ts
         
-        return issues
+        While edits are waiting in the write-behind queue this is the stamp
+        of the in-memory document instead.
+        """
+        return issue_cache.stamp(self.get_config_path(issue_name))
     
-    def load_issue(self, issue_name: str) -> Dict[str, Any]:
-        """Load issue data from storyConfig.ts file"""
-        config_path = self.components_path / issue_name / "storyConfig.ts"
+    def unsaved_issues(self) -> List[str]:
+        """Names of issues with edits that have not been written yet"""
+        return sorted(Path(path).parent.name for path in issue_cache.dirty_paths())
+    
+    def flush(self, issue_name: Optional[str] = None) -> int:
+        """Write queued edits now (for one issue, or all); returns files written"""
+        paths = None if issue_name is None else [self.get_config_path(issue_name)]
+        return write_pipeline.flush(paths)
+    
+    def read_document(self, issue_name: str) -> StoryDocument:
+        """Return the parsed story document (shared and cached)"""
+        config_path = self.get_config_path(issue_name)
         
-        if not config_path.exists():
+        if not issue_cache.is_dirty(config_path) and not config_path.exists():
             raise FileNotFoundError(f"Issue '{issue_name}' not found")
         
-        # Read the TypeScript file and parse it
-        content = config_path.read_text(encoding='utf-8')
-        
-        # This is a simplified parser - in a real implementation,
-        # you'd want to use a proper TypeScript parser
-        # For now, we'll extract basic information
+        document_class = StructuredStoryDocument if config_path.name == SIMPLE_CONFIG_FILE else StoryDocument
         
-        # Extract issue ID
-        id_match = re.search(r'id:\s*["\']([^"\']+)["\']', content)
-        issue_id = id_match.group(1) if id_match else issue_name
+        def parse(text: str) -> StoryDocument:
+            with metrics.timer('story_manager_parse_seconds', format=document_class.format):
+                document = document_class(text, issue_name)
+            metrics.inc('story_manager_parse_bytes_total', len(text), format=document_class.format)
+            return document
         
-        # Extract background theme
-        theme_match = re.search(r'backgroundTheme:\s*["\']([^"\']+)["\']', content)
-        background_theme = theme_match.group(1) if theme_match else "antarctica"
-        
-        # Count chapters and pages (simplified)
-        chapter_matches = re.findall(r'id:\s*["\']chapter-\d+["\']', content)
-        page_matches = re.findall(r'id:\s*["\']page-\d+-\d+["\']', content)
+        return issue_cache.get(config_path, parse)
+    
+    def read_issue(self, issue_name: str) -> Dict[str, Any]:
+        """Return the parsed issue model (shared and cached - do not mutate)"""
+        return self.read_document(issue_name).issue
+    
+    def read_outline(self, issue_name: str) -> Dict[str, Any]:
+        """Return chapter titles with page ids and sizes only"""
+        return self.read_document(issue_name).outline()
+    
+    def read_page(self, issue_name: str, chapter_index: int, page_index: int) -> Dict[str, Any]:
+        """Return a single page of an issue"""
+        return self.read_document(issue_name).page(chapter_index, page_index)
+    
+    def load_issue(self, issue_name: str) -> Dict[str, Any]:
+        """Load issue summary data from storyConfig.ts file"""
+        config_path = self.get_config_path(issue_name)
+        issue_data = self.read_issue(issue_name)
+        chapters = issue_data.get('chapters', [])
         
         return {
             'name': issue_name,
-            'id': issue_id,
-            'backgroundTheme': background_theme,
-            'chapters': [],  # Would need more complex parsing for full data
+            'id': issue_data.get('id') or issue_name,
+            'backgroundTheme': issue_data.get('backgroundTheme', "antarctica"),
+            'chapters': [],  # Full chapter data is served by /api/issue/<name>
+            'chapterCount': len(chapters),
+            'pageCount': sum(len(chapter.get('pages', [])) for chapter in chapters),
+            'format': self.issue_format(issue_name),
             'path': str(config_path)
         }
     
-    def write_story_config(self, issue_name: str, content: str) -> None:
-        """Write story configuration to file"""
-        config_path = self.components_path / issue_name / "storyConfig.ts"
-        config_path.write_text(content, encoding='utf-8')
+    def write_story_config(self, issue_name: str, content: str, operation: Optional[Dict[str, Any]] = None) -> Future:
+        """Write story configuration to file atomically"""
+        document_class = StructuredStoryDocument if self.issue_format(issue_name) == 'structured' else StoryDocument
+        return self.write_document(issue_name, document_class(content, issue_name), operation)
+    
+    def record_external_edit(self, issue_name: str) -> Optional[int]:
+        """Journal a hand edit of the config made since the last recorded write; returns its seq"""
+        config_path = self.get_config_path(issue_name)
+        if issue_cache.is_dirty(config_path):
+            # A queued write will replace the file; it is what the journal already holds
+            return None
+        try:
+            return edit_journal.record_external(config_path)
+        except OSError:
+            return None
     
-    def update_story_index(self, issue_name: str, capitalized_name: str) -> None:
-        """Update the storyIndex.ts file to include new issue"""
-        if not self.story_index_path.exists():
-            # Create basic storyIndex.ts if it doesn't exist
-            self._create_basic_story_index()
+    def write_document(self, issue_name: str, document: StoryDocument,
+                       operation: Optional[Dict[str, Any]] = None) -> Future:
+        """Write an edited story document and keep it cached for later reads.
         
-        content = self.story_index_path.read_text(encoding='utf-8')
+        The document is pinned in the cache until the write lands, so reads
+        see the edit even while it waits in the write-behind queue. Returns a
+        Future that resolves once the content is durable on disk. The edit
+        is recorded in the issue's journal as operation (e.g.
+        ``{'op': 'add-page', 'chapter_index': 0}``) for undo and history;
+        if the write fails, a ``write-failed`` record of the file as it
+        stayed takes its place.
         
-        # Add import statement
-        import_line = f"import {{ story{capitalized_name} }} from '../components/{issue_name}/storyConfig';"
+        An issue without a config file yet gets the one for the document's
+        format.
+        """
+        config_path = self.get_config_path(issue_name)
+        if document.format == 'structured' and not config_path.exists() and not issue_cache.is_dirty(config_path):
+            config_path = config_path.with_name(SIMPLE_CONFIG_FILE)
+        text = document.text
+        try:
+            edit_journal.record(config_path, text, operation, on_disk=not issue_cache.is_dirty(config_path))
+        except OSError:
+            # History is a convenience; the edit itself must still be saved
+            pass
+        stamp = issue_cache.put_dirty(config_path, document, len(text))
         
-        # Check if import already exists
-        if import_line not in content:
-            # Find the last import and add after it
-            import_pattern = r'(import.*?from.*?;)'
-            imports = re.findall(import_pattern, content)
-            if imports:
-                last_import = imports[-1]
-                content = content.replace(last_import, f"{last_import}\n{import_line}")
-            else:
-                # Add at the beginning if no imports found
-                content = f"{import_line}\n\n{content}"
+        def settle(future: Future) -> None:
+            # Re-stamp so the next read doesn't re-parse what we just wrote
+            written = future.exception() is None
+            issue_cache.settle_dirty(config_path, stamp, written)
+            if not written and not issue_cache.is_dirty(config_path):
+                # The journal already has this edit; unless a newer queued write carries it, record the
+                # file as it stayed
+                try:
+                    edit_journal.record_failed_write(config_path)
+                except OSError:
+                    pass
         
-        # Add to storyIssues object
-        story_issues_pattern = r'(export const storyIssues: { \[key: string\]: any } = {)([\s\S]*?)(};)'
-        match = re.search(story_issues_pattern, content)
+        future = write_pipeline.write(config_path, text)
+        future.add_done_callback(settle)
+        story_events.publish({'type': 'issue', 'issue': issue_name, 'origin': 'edit'})
+        return future
+    
+    def story_index_entries(self, lazy: Iterable[str] = (), eager: Iterable[str] = (),
+                            configs: Optional[Dict[str, str]] = None) -> List[IndexEntry]:
+        """Scan src/components for issues with a config file.
         
-        if match:
-            prefix = match.group(1)
-            middle = match.group(2)
-            suffix = match.group(3)
-            
-            # Add new issue to the object
-            new_entry = f'  "{issue_name}": story{capitalized_name},'
-            if new_entry not in middle:
-                # Add before the closing brace
-                middle = middle.rstrip() + f"\n{new_entry}\n"
-                content = content.replace(match.group(0), f"{prefix}{middle}{suffix}")
+        Each issue keeps the config file and loading mode storyIndex.ts
+        already uses for it unless named in lazy or eager, or given a new
+        config file name in configs.
+        """
+        try:
+            current = lazy_issues(self.story_index_path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            current = set()
+        lazy, eager = set(lazy), set(eager)
         
-        self.story_index_path.write_text(content, encoding='utf-8')
+        entries = []
+        if not self.components_path.exists():
+            return entries
+        for item in sorted(self.components_path.iterdir(), key=lambda path: natural_key(path.name)):
+            if not item.is_dir() or item.name.startswith('.'):
+                continue
+            config_path = item / configs[item.name] if configs and item.name in configs \
+                else self.get_config_path(item.name)
+            try:
+                export_name = find_export_name(config_path.read_text(encoding='utf-8'))
+            except FileNotFoundError:
+                continue
+            if export_name is None:
+                # Not a story config we can import; validation reports it
+                continue
+            is_lazy = item.name in lazy or (item.name in current and item.name not in eager)
+            entries.append(IndexEntry(item.name, config_path.stem, export_name, is_lazy))
+        return entries
     
-    def _create_basic_story_index(self) -> None:
-        """Create a basic storyIndex.ts file"""
-        basic_content = '''// Central index for all story configurations
-// This makes it easy to import all story configs from one place
-
-import { storyIssue1 } from '../components/issue1/storyConfig';
-// import { storyIssue2 } from '../components/issue2/storyConfig';
-// import { storyIssue3 } from '../components/issue3/storyConfig';
-// import { storyTeam1 } from '../components/team1/storyConfig';
-// ... add more issues as they are created
-
-// Export all story issues as an object with string keys
-export const storyIssues: { [key: string]: any } = {
-  "issue1": storyIssue1,
-  // "issue2": storyIssue2,
-  // "issue3": storyIssue3,
-  // "team1": storyTeam1,
-  // ... add more issues here
-};
-
-// Export individual issues for direct access
-export { storyIssue1 };
-// export { storyIssue2 };
-// export { storyIssue3 };
-// export { storyTeam1 };
-'''
-        self.story_index_path.write_text(basic_content, encoding='utf-8')
+    def update_story_index(self, lazy: Iterable[str] = (), eager: Iterable[str] = (),
+                           configs: Optional[Dict[str, str]] = None) -> bool:
+        """Regenerate storyIndex.ts from the issues on disk; returns whether it changed"""
+        with self._story_index_lock:
+            content = render_story_index(self.story_index_entries(lazy, eager, configs))
+            return write_if_changed(self.story_index_path, content, fsync=True)
     
     def get_project_structure(self) -> Dict[str, Any]:
         """Get the current project structure"""
@@ -0,0 +1,282 @@
+"""
+File Watcher for Lexicon Quest Story Manager
+Notices hand edits to story configs and storyIndex.ts, reparses them in the
+background and publishes change events.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set
+
+from file_manager import CONFIG_FILE, FileManager
+from issue_cache import file_stamp, issue_cache
+from story_events import EventBroker, story_events
+from structured_document import SIMPLE_CONFIG_FILE
+
+# Files whose changes matter to the story manager
+WATCHED_NAMES = frozenset({CONFIG_FILE, SIMPLE_CONFIG_FILE})
+DEFAULT_POLL_INTERVAL = 1.0
+# Editors save in bursts (truncate, write, rename); handle them together
+SETTLE_DELAY = 0.1
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+_EVENT_HEADER = struct.Struct('iIII')
+_DIRECTORY_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF \
+    | IN_MOVE_SELF | IN_ONLYDIR
+
+
+class _Inotify:
+    """Minimal ctypes binding of Linux inotify"""
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return wd
+
+    def read_events(self, timeout: float):
+        """Yield (wd, mask, name) for events available within timeout"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+            offset += length
+            yield wd, mask, name
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """Watches src/components/*/ and src/data/ and reports changed files.
+
+    Uses inotify where available and falls back to polling stats every
+    ``poll_interval`` seconds. ``on_change`` receives batches of changed
+    paths on the watcher thread; a path of an issue directory itself means
+    the issue was added or removed.
+    """
+
+    def __init__(self, components_path: Path, data_path: Path, on_change: Callable[[Set[Path]], None],
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: bool = True):
+        self.components_path = components_path
+        self.data_path = data_path
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> str:
+        """Start watching in a background thread; returns 'inotify' or 'polling'"""
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify()
+            except (OSError, AttributeError):
+                inotify = None
+        self.mode = 'inotify' if inotify else 'polling'
+        target = (lambda: self._run_inotify(inotify)) if inotify else self._run_polling
+        self._thread = threading.Thread(target=target, name='story-watcher', daemon=True)
+        self._thread.start()
+        return self.mode
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    # inotify
+
+    def _run_inotify(self, inotify: _Inotify) -> None:
+        directories: Dict[int, Path] = {}
+
+        def watch(path: Path) -> None:
+            try:
+                directories[inotify.add_watch(path, _DIRECTORY_MASK)] = path
+            except OSError:
+                pass
+
+        def watch_all() -> None:
+            watch(self.components_path)
+            watch(self.data_path)
+            for item in self._issue_directories():
+                watch(item)
+
+        try:
+            watch_all()
+            pending: Set[Path] = set()
+            while not self._stop.is_set():
+                events = list(inotify.read_events(SETTLE_DELAY if pending else self.poll_interval))
+                if not events and pending:
+                    self._deliver(pending)
+                    pending = set()
+                    continue
+
+                for wd, mask, name in events:
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were lost: treat everything as changed
+                        watch_all()
+                        pending |= self._all_paths()
+                        continue
+                    directory = directories.get(wd)
+                    if directory is None:
+                        continue
+                    if mask & IN_IGNORED:
+                        del directories[wd]
+                        continue
+                    if directory == self.components_path:
+                        if mask & IN_ISDIR:
+                            if mask & (IN_CREATE | IN_MOVED_TO):
+                                watch(directory / name)
+                            pending.add(directory / name)
+                    elif directory == self.data_path:
+                        if name == 'storyIndex.ts':
+                            pending.add(directory / name)
+                    elif name in WATCHED_NAMES:
+                        pending.add(directory / name)
+        finally:
+            inotify.close()
+
+    # Polling
+
+    def _run_polling(self) -> None:
+        snapshot = self._snapshot()
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            changed = {path for path in snapshot.keys() | current.keys() if snapshot.get(path) != current.get(path)}
+            snapshot = current
+            if changed:
+                self._deliver(changed)
+
+    def _snapshot(self) -> Dict[Path, tuple]:
+        """Stamp of every watched file, plus a marker for every issue directory"""
+        snapshot: Dict[Path, tuple] = {}
+        for path in self._all_paths():
+            try:
+                snapshot[path] = () if path.parent == self.components_path else file_stamp(path)
+            except FileNotFoundError:
+                pass
+        return snapshot
+
+    # Helpers
+
+    def _issue_directories(self):
+        try:
+            return [item for item in self.components_path.iterdir() if item.is_dir() and not item.name.startswith('.')]
+        except FileNotFoundError:
+            return []
+
+    def _all_paths(self) -> Set[Path]:
+        paths = {self.data_path / 'storyIndex.ts'}
+        for item in self._issue_directories():
+            paths.add(item)
+            paths.update(item / name for name in WATCHED_NAMES)
+        return paths
+
+    def _deliver(self, paths: Set[Path]) -> None:
+        try:
+            self.on_change(paths)
+        except Exception as e:
+            # Keep watching; the next request will still see the file
+            print(f"⚠️  File watcher could not handle {len(paths)} change(s): {e}")
+
+
+class StoryWatcher:
+    """Keeps the FileManager's cache and issue index in sync with hand edits.
+
+    A changed config is reparsed on the watcher thread (so the next request
+    is a cache hit) and announced on the event broker. Changes the story
+    manager wrote itself are recognised by their stamp and skipped: their
+    edit was already announced when it was made.
+    """
+
+    def __init__(self, file_manager: FileManager, events: EventBroker = story_events,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: bool = True):
+        self.file_manager = file_manager
+        self.events = events
+        self.watcher = FileWatcher(file_manager.components_path, file_manager.data_path, self.handle,
+                                   poll_interval, use_inotify)
+
+    def start(self) -> str:
+        return self.watcher.start()
+
+    def stop(self) -> None:
+        self.watcher.stop()
+
+    def handle(self, paths: Set[Path]) -> None:
+        """Reparse changed issues and publish what changed"""
+        issues_changed = False
+        for path in sorted(paths):
+            if path == self.file_manager.story_index_path:
+                issues_changed = True
+                self.events.publish({'type': 'index', 'origin': 'disk'})
+            elif path.parent == self.file_manager.components_path:
+                issues_changed = True
+            elif path == self.file_manager.get_config_path(path.parent.name):
+                issues_changed |= self._reparse(path.parent.name, path)
+
+        if issues_changed:
+            # Stat-based refresh: only the issues that changed are summarized again
+            self.file_manager.list_issues()
+            self.events.publish({'type': 'issues', 'origin': 'disk'})
+
+    def _reparse(self, issue_name: str, path: Path) -> bool:
+        """Bring one issue's cached document up to date; returns whether it changed"""
+        if issue_cache.is_dirty(path):
+            # Our own queued edit is newer than anything on disk
+            return False
+        try:
+            stamp = file_stamp(path)
+        except FileNotFoundError:
+            issue_cache.invalidate(path)
+            return True
+        if issue_cache.cached_stamp(path) == stamp:
+            # Written by the story manager; already announced
+            return False
+
+        event = {'type': 'issue', 'issue': issue_name, 'origin': 'disk'}
+        try:
+            self.file_manager.read_document(issue_name)
+        except (OSError, ValueError) as e:
+            event['error'] = str(e)
+        self.events.publish(event)
+        return True
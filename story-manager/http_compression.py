@@ -0,0 +1,128 @@
+"""
+Response Compression for Lexicon Quest Story Manager
+Accept-Encoding negotiation plus a cache of compressed bodies, so unchanged
+issues are not recompressed on every request.
+"""
+
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    zstd = None
+
+try:
+    import brotli  # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/css')
+MIN_COMPRESS_SIZE = 1024
+DEFAULT_CACHE_BYTES = 16 * 1024 * 1024
+
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {
+    # mtime=0 keeps gzip output byte-identical for identical input
+    'gzip': lambda body: gzip.compress(body, compresslevel=6, mtime=0),
+}
+if brotli is not None:
+    ENCODERS['br'] = lambda body: brotli.compress(body, quality=5)
+if zstd is not None:
+    ENCODERS['zstd'] = lambda body: zstd.compress(body)
+
+# Preferred encoding when the client accepts several with equal weight
+PREFERENCE = ('zstd', 'br', 'gzip')
+
+
+def is_compressible(content_type: str, size: int) -> bool:
+    """Check whether a response is worth compressing"""
+    return size >= MIN_COMPRESS_SIZE and content_type.split(';')[0].strip() in COMPRESSIBLE_TYPES
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best available encoding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best = None
+    best_weight = 0.0
+    for encoding in PREFERENCE:
+        if encoding not in ENCODERS:
+            continue
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Give each encoding of a representation its own strong ETag"""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_encoding(etag: str) -> str:
+    """Map an encoded ETag back to the ETag of the identity representation"""
+    for encoding in ENCODERS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+class CompressionCache:
+    """LRU cache of compressed bodies keyed by (ETag, encoding)"""
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def compress(self, body: bytes, encoding: str, etag: Optional[str] = None) -> bytes:
+        """Compress body, reusing the cached result when the ETag is known"""
+        if etag is None:
+            return ENCODERS[encoding](body)
+
+        key = (etag, encoding)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        compressed = ENCODERS[encoding](body)
+
+        with self._lock:
+            if key not in self._entries and len(compressed) <= self.max_bytes:
+                self._entries[key] = compressed
+                self._bytes += len(compressed)
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted)
+        return compressed
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current memory use"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+compression_cache = CompressionCache()
@@ -0,0 +1,366 @@
+"""
+Image Pipeline for Lexicon Quest Story Manager
+Audits the images referenced by story pages and generates downscaled,
+content-hashed variants that the story configs can point to instead.
+"""
+
+import hashlib
+import json
+import re
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image  # Optional: pip install Pillow
+except ImportError:
+    Image = None
+
+from content_optimizer import OPTIMIZED_SUFFIX
+from file_manager import FileManager
+from issue_cache import file_stamp
+from write_pipeline import atomic_write_text
+
+RASTER_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+IMAGE_EXTENSIONS = RASTER_EXTENSIONS + ('.avif', '.svg')
+SOURCE_EXTENSIONS = ('.ts', '.tsx', '.js', '.jsx', '.css', '.html')
+
+DEFAULT_WIDTHS = (480, 960, 1600)
+DEFAULT_MAX_BYTES = 500 * 1024
+DEFAULT_QUALITY = 80
+VARIANT_FORMAT = 'webp'
+VARIANTS_DIR = 'optimized'
+CACHE_VERSION = 1
+HASH_LENGTH = 10
+
+# src="/issues/issue1/map.png", url('/kowai/egg.png') or content: "/issues/issue1/secret letter.png"
+_REFERENCE = re.compile(
+    r'(?P<attr>\bsrc=)?(?P<quote>["\'`(])(?P<path>/[^"\'`()<>\n]*?\.(?:png|jpe?g|gif|webp|avif|svg))(?=["\'`)])',
+    re.IGNORECASE
+)
+_SRCSET = re.compile(r'\bsrcset="(?P<candidates>[^"]*)"')
+_UNSAFE_FILENAME = re.compile(r'[^\w.-]+')
+
+# JPEG start-of-frame markers (everything from C0 to CF except DHT, JPG and DAC)
+_JPEG_FRAME_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_dimensions(path: Path) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a PNG, GIF, JPEG or WebP header without decoding it"""
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+            return struct.unpack('>II', head[16:24])
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', head[6:10])
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            chunk = head[12:16]
+            if chunk == b'VP8X':
+                return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+            if chunk == b'VP8L':
+                bits = int.from_bytes(head[21:25], 'little')
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b'VP8 ':
+                width, height = struct.unpack('<HH', head[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            return None
+        if head[:2] == b'\xff\xd8':
+            f.seek(2)
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                length = struct.unpack('>H', f.read(2))[0]
+                if marker[1] in _JPEG_FRAME_MARKERS:
+                    height, width = struct.unpack('>xHH', f.read(5))
+                    return width, height
+                f.seek(length - 2, 1)
+    return None
+
+
+def find_references(text: str) -> List[str]:
+    """Return the absolute image URLs referenced in source text"""
+    # Paths built from ${...} expressions can't be resolved statically
+    return [match.group('path') for match in _REFERENCE.finditer(text) if '${' not in match.group('path')]
+
+
+class ImagePipeline:
+    """Image audit, variant generation and reference rewriting.
+
+    Variants are written to public/optimized/ mirroring the source layout,
+    as ``<name>.<hash>-<width>w.webp`` where the hash covers the source bytes
+    and encoding settings. A cache next to storyIndex.ts records each
+    source's stamp and variants, so unchanged images are never decoded again.
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None, widths=DEFAULT_WIDTHS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, quality: int = DEFAULT_QUALITY):
+        self.file_manager = file_manager or FileManager()
+        self.public_path = self.file_manager.project_root / "public"
+        self.source_path = self.file_manager.project_root / "src"
+        self.variants_path = self.public_path / VARIANTS_DIR
+        self.cache_path = self.file_manager.data_path / "imageVariants.meta.json"
+        self.widths = tuple(sorted(widths))
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self._cache: Optional[Dict[str, Any]] = None
+
+    @property
+    def settings(self) -> str:
+        return f"{VARIANT_FORMAT}:q{self.quality}:{','.join(str(w) for w in self.widths)}"
+
+    # Scanning
+
+    def story_references(self) -> Dict[str, List[str]]:
+        """Map each issue to the image URLs its story config references"""
+        references = {}
+        for issue in self.file_manager.list_issues():
+            text = self.file_manager.read_document(issue['name']).text
+            references[issue['name']] = find_references(text)
+        return references
+
+    def all_references(self) -> Dict[str, List[str]]:
+        """Map every image URL referenced anywhere in the site source to the files using it"""
+        references: Dict[str, List[str]] = {}
+        # Generated copies of story configs would only repeat the config's references
+        sources = [path for path in self.source_path.rglob('*')
+                   if path.suffix in SOURCE_EXTENSIONS and not path.stem.endswith(OPTIMIZED_SUFFIX)]
+        sources.append(self.file_manager.project_root / "index.html")
+        for path in sources:
+            try:
+                text = path.read_text(encoding='utf-8')
+            except (FileNotFoundError, UnicodeDecodeError):
+                continue
+            relative = str(path.relative_to(self.file_manager.project_root))
+            for url in find_references(text):
+                files = references.setdefault(url, [])
+                if relative not in files:
+                    files.append(relative)
+        return references
+
+    def url_path(self, url: str) -> Path:
+        """Map a site URL to its file under public/"""
+        return self.public_path / url.lstrip('/')
+
+    # Audit
+
+    def audit(self, scope: str = "issues") -> Dict[str, Any]:
+        """Report missing, unused and oversized images.
+
+        Unused and oversized assets are looked for under public/<scope>/.
+        """
+        references = self.all_references()
+        generated = self._variant_sources()
+        used = {generated.get(url, url) for url in references}
+
+        missing = [
+            {'url': url, 'files': files}
+            for url, files in sorted(references.items())
+            if not self.url_path(url).exists()
+        ]
+
+        unused = []
+        oversized = []
+        scope_path = self.public_path / scope
+        for path in sorted(scope_path.rglob('*')) if scope_path.exists() else []:
+            if path.suffix.lower() not in IMAGE_EXTENSIONS or self.variants_path in path.parents:
+                continue
+            url = '/' + path.relative_to(self.public_path).as_posix()
+            size = path.stat().st_size
+            if url not in used:
+                unused.append({'url': url, 'bytes': size})
+                continue
+            dimensions = image_dimensions(path) if path.suffix.lower() in RASTER_EXTENSIONS else None
+            if size > self.max_bytes or (dimensions and dimensions[0] > self.widths[-1]):
+                oversized.append({
+                    'url': url,
+                    'bytes': size,
+                    'width': dimensions[0] if dimensions else None,
+                    'height': dimensions[1] if dimensions else None,
+                })
+
+        return {
+            'referenced': len(references),
+            'missing': missing,
+            'unused': unused,
+            'oversized': oversized,
+        }
+
+    # Variants
+
+    def optimize(self, urls: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Generate variants for the given URLs (default: every image the stories use).
+
+        Returns the cache entry of each processed image.
+        """
+        if urls is None:
+            sources = self._variant_sources()
+            urls = sorted({sources.get(url, url) for refs in self.story_references().values() for url in refs})
+
+        cache = self._load_cache()
+        results = {}
+        for url in urls:
+            path = self.url_path(url)
+            if path.suffix.lower() not in RASTER_EXTENSIONS or not path.exists() \
+                    or self.variants_path in path.parents:
+                continue
+            results[url] = self._optimize_one(url, path, cache)
+        self._save_cache()
+        return results
+
+    def _optimize_one(self, url: str, path: Path, cache: Dict[str, Any]) -> Dict[str, Any]:
+        stamp = list(file_stamp(path)[:2])
+        entry = cache.get(url)
+        if entry and entry['stamp'] == stamp and entry['settings'] == self.settings and self._variants_exist(entry):
+            return dict(entry, cached=True)
+
+        data = path.read_bytes()
+        digest = hashlib.sha256(data + self.settings.encode()).hexdigest()[:HASH_LENGTH]
+        if entry and entry.get('hash') == digest and self._variants_exist(entry):
+            # Touched but not changed
+            entry['stamp'] = stamp
+            return dict(entry, cached=True)
+
+        if Image is None:
+            raise RuntimeError("Pillow is required to generate image variants (pip install Pillow)")
+
+        previous: List[str] = []
+        if entry:
+            self._remove_variants(entry)
+            # Remember superseded variant URLs so rewrite() can update references to them
+            previous = sorted(set(entry.get('previous', [])) | {v['url'] for v in entry['variants']})
+
+        entry = {'stamp': stamp, 'hash': digest, 'settings': self.settings, 'bytes': len(data), 'variants': [],
+                 'previous': previous}
+        with Image.open(path) as image:
+            entry['width'], entry['height'] = image.size
+            if getattr(image, 'is_animated', False):
+                # Re-encoding animations is lossy and slow; leave them as they are
+                entry['skipped'] = 'animated'
+                cache[url] = entry
+                return dict(entry, cached=False)
+
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            relative = path.relative_to(self.public_path)
+            out_dir = self.variants_path / relative.parent
+            out_dir.mkdir(parents=True, exist_ok=True)
+            stem = _UNSAFE_FILENAME.sub('-', path.stem)
+
+            for width in sorted({min(w, image.width) for w in self.widths}):
+                height = max(1, round(image.height * width / image.width))
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                name = f"{stem}.{digest}-{width}w.{VARIANT_FORMAT}"
+                resized.save(out_dir / name, VARIANT_FORMAT, quality=self.quality, method=6)
+                entry['variants'].append({
+                    'width': width,
+                    'url': '/' + (out_dir / name).relative_to(self.public_path).as_posix(),
+                    'bytes': (out_dir / name).stat().st_size,
+                })
+
+        if entry['variants'][-1]['bytes'] >= len(data):
+            # Not worth serving if even the re-encoded copy is bigger
+            self._remove_variants(entry)
+            entry['variants'] = []
+            entry['skipped'] = 'not smaller'
+        cache[url] = entry
+        return dict(entry, cached=False)
+
+    def _variants_exist(self, entry: Dict[str, Any]) -> bool:
+        return all(self.url_path(variant['url']).exists() for variant in entry['variants'])
+
+    def _remove_variants(self, entry: Dict[str, Any]) -> None:
+        for variant in entry['variants']:
+            try:
+                self.url_path(variant['url']).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _variant_sources(self) -> Dict[str, str]:
+        """Map every variant URL (current or superseded) back to the image it was generated from"""
+        sources = {}
+        for url, entry in self._load_cache().items():
+            for variant_url in entry.get('previous', []):
+                sources[variant_url] = url
+            for variant in entry['variants']:
+                sources[variant['url']] = url
+        return sources
+
+    # Rewriting
+
+    def rewrite(self, srcset: bool = False) -> Dict[str, int]:
+        """Point story configs at the generated variants; returns references rewritten per issue.
+
+        ``<img src>`` references get a ``srcset`` of every width when srcset
+        is set; other references (CSS url(), block fields) use the largest
+        variant. Tags that already have a ``srcset`` keep it, refreshed when
+        it lists variants of a regenerated image.
+        """
+        cache = self._load_cache()
+        sources = self._variant_sources()
+        rewritten = {}
+        for issue in self.file_manager.list_issues():
+            issue_name = issue['name']
+            text = self.file_manager.read_document(issue_name).text
+            count = 0
+
+            def candidates(entry: Dict[str, Any]) -> str:
+                return ', '.join(f"{v['url']} {v['width']}w" for v in entry['variants'])
+
+            def replace_srcset(match: 're.Match[str]') -> str:
+                nonlocal count
+                urls = {candidate.split()[0] for candidate in match.group('candidates').split(',') if candidate.strip()}
+                images = {sources.get(url) for url in urls}
+                entry = cache.get(images.pop()) if len(images) == 1 else None
+                # Only a srcset we generated (all variants of one image) is ours to update
+                if not entry or len(entry['variants']) < 2 or urls == {v['url'] for v in entry['variants']}:
+                    return match.group()
+                count += 1
+                return f'srcset="{candidates(entry)}"'
+
+            def has_srcset(match: 're.Match[str]') -> bool:
+                tag_start = text.rfind('<', 0, match.start())
+                tag_end = text.find('>', match.end())
+                return tag_start >= 0 and _SRCSET.search(text, tag_start, tag_end if tag_end >= 0 else len(text)) is not None
+
+            def replace(match: 're.Match[str]') -> str:
+                nonlocal count
+                entry = cache.get(sources.get(match.group('path'), match.group('path')))
+                if not entry or not entry['variants']:
+                    return match.group()
+                largest = entry['variants'][-1]['url']
+                if match.group('path') == largest:
+                    return match.group()
+                count += 1
+                if srcset and match.group('attr') and match.group('quote') == '"' and len(entry['variants']) > 1 \
+                        and not has_srcset(match):
+                    # The original closing quote ends the srcset attribute
+                    return f'src="{largest}" srcset="{candidates(entry)}'
+                return f"{match.group('attr') or ''}{match.group('quote')}{largest}"
+
+            text = _SRCSET.sub(replace_srcset, text)
+            new_text = _REFERENCE.sub(replace, text)
+            if count:
+                self.file_manager.write_story_config(issue_name, new_text, {'op': 'rewrite-images'}).result()
+            rewritten[issue_name] = count
+        return rewritten
+
+    # Cache
+
+    def _load_cache(self) -> Dict[str, Any]:
+        if self._cache is None:
+            self._cache = {}
+            try:
+                data = json.loads(self.cache_path.read_text(encoding='utf-8'))
+                if data.get('version') == CACHE_VERSION:
+                    self._cache = data.get('images', {})
+            except (FileNotFoundError, ValueError):
+                pass
+        return self._cache
+
+    def _save_cache(self) -> None:
+        content = json.dumps({'version': CACHE_VERSION, 'images': self._load_cache()}, indent=2, sort_keys=True)
+        try:
+            atomic_write_text(self.cache_path, content, fsync=False)
+        except OSError:
+            # Without the cache the next run re-encodes; the variants are still valid
+            pass
@@ -0,0 +1,209 @@
+"""
+Issue Cache for Lexicon Quest Story Manager
+Process-wide cache of parsed story configs, invalidated by file stat.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# (mtime_ns, size, inode) - changes whenever the file is rewritten or replaced
+FileStamp = Tuple[int, int, int]
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def file_stamp(path: Path) -> FileStamp:
+    """Return the invalidation stamp of a file (raises FileNotFoundError)"""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class _Entry(NamedTuple):
+    stamp: FileStamp
+    value: Any
+    cost: int
+    dirty: bool = False
+
+
+class IssueCache:
+    """LRU cache of parsed issues keyed by path.
+
+    Entries are validated against the file's stamp on every lookup and
+    evicted least-recently-used first once the total source size of the
+    cached files exceeds ``max_bytes``. Cached values are shared between
+    callers and must be treated as read-only.
+
+    Values edited in memory but not yet written are marked dirty: they are
+    served without looking at the file and are never evicted until
+    ``put`` records the flushed file.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._bytes = 0
+        self._dirty_sequence = 0
+        self._lock = threading.RLock()
+
+    def get(self, path: Path, loader: Callable[[str], Any]) -> Any:
+        """Return the cached value for path, calling loader(text) on a miss"""
+        key = str(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.dirty:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+
+        stamp = file_stamp(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+
+        text = Path(path).read_text(encoding='utf-8')
+        value = loader(text)
+
+        # Only cache if the file did not change while we were reading it
+        if file_stamp(path) == stamp:
+            self.put(path, value, stamp)
+        return value
+
+    def put(self, path: Path, value: Any, stamp: Optional[FileStamp] = None) -> None:
+        """Store a value for path, stamped with the file's current state (marks it clean)"""
+        key = str(path)
+        if stamp is None:
+            stamp = file_stamp(path)
+        cost = stamp[1]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.dirty and entry.value is not value:
+                # A newer in-memory edit wins over a value read from disk
+                return
+            self._discard(key)
+            if cost > self.max_bytes:
+                return
+            self._entries[key] = _Entry(stamp, value, cost)
+            self._bytes += cost
+            self._evict()
+
+    def put_dirty(self, path: Path, value: Any, size: int) -> FileStamp:
+        """Pin a value whose edits have not reached the file yet.
+
+        Returns the in-memory stamp (edit time, size, -sequence) that stands
+        in for the file's stamp until the value is flushed.
+        """
+        key = str(path)
+
+        with self._lock:
+            self._dirty_sequence += 1
+            # A negative inode keeps in-memory stamps distinct from file stamps
+            stamp = (time.time_ns(), size, -self._dirty_sequence)
+            self._discard(key)
+            self._entries[key] = _Entry(stamp, value, size, dirty=True)
+            self._bytes += size
+            self._evict()
+        return stamp
+
+    def settle_dirty(self, path: Path, stamp: FileStamp, written: bool) -> None:
+        """Finish a flush of the value pinned with stamp.
+
+        If the write succeeded the value is re-stamped from the file and
+        becomes an ordinary entry; if it failed it is dropped so the file is
+        re-read. Nothing happens if a newer edit has been pinned since.
+        """
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.dirty or entry.stamp != stamp:
+                return
+            self._discard(key)
+            if not written:
+                return
+            try:
+                file_state = file_stamp(path)
+            except FileNotFoundError:
+                return
+            self._entries[key] = _Entry(file_state, entry.value, file_state[1])
+            self._bytes += file_state[1]
+            self._evict()
+
+    def stamp(self, path: Path) -> FileStamp:
+        """Return the stamp of the cached value if it is dirty, else of the file"""
+        with self._lock:
+            entry = self._entries.get(str(path))
+            if entry is not None and entry.dirty:
+                return entry.stamp
+        return file_stamp(path)
+
+    def cached_stamp(self, path: Path) -> Optional[FileStamp]:
+        """Return the stamp of the cached value for path without touching the file"""
+        with self._lock:
+            entry = self._entries.get(str(path))
+            return entry.stamp if entry is not None else None
+
+    def is_dirty(self, path: Path) -> bool:
+        """Check whether path has edits that are only in memory"""
+        with self._lock:
+            entry = self._entries.get(str(path))
+            return entry is not None and entry.dirty
+
+    def dirty_paths(self) -> List[str]:
+        """Return the paths whose edits are only in memory"""
+        with self._lock:
+            return [key for key, entry in self._entries.items() if entry.dirty]
+
+    def invalidate(self, path: Path) -> None:
+        """Drop the cached value for path"""
+        with self._lock:
+            self._discard(str(path))
+
+    def clear(self) -> None:
+        """Drop every cached value"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current memory use"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'dirty': sum(1 for entry in self._entries.values() if entry.dirty),
+            }
+
+    def _evict(self) -> None:
+        """Drop least-recently-used clean entries until under budget"""
+        if self._bytes <= self.max_bytes:
+            return
+        for key in [key for key, entry in self._entries.items() if not entry.dirty]:
+            self._discard(key)
+            self.evictions += 1
+            if self._bytes <= self.max_bytes:
+                break
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.cost
+
+
+# Shared by every FileManager and StoryGenerator in the process
+issue_cache = IssueCache()
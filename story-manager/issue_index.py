@@ -0,0 +1,102 @@
+"""
+Issue Index for Lexicon Quest Story Manager
+Persistent metadata index of every issue, refreshed only for changed files.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from issue_cache import file_stamp
+from write_pipeline import atomic_write_text
+
+INDEX_VERSION = 2
+
+
+class IssueIndex:
+    """Metadata (id, theme, counts, mtime, size) for every issue on disk.
+
+    The index is stored as JSON next to storyIndex.ts. A refresh stats each
+    issue's config file (storyConfig.ts or simpleStoryConfig.ts) and only re-summarizes files whose mtime or size changed,
+    so listing issues costs one stat per issue rather than a parse. Issues
+    that fail to load are kept with their error and left out of listings.
+    """
+
+    def __init__(self, components_path: Path, index_path: Path,
+                 summarize: Callable[[str], Dict[str, Any]],
+                 config_path: Optional[Callable[[str], Path]] = None):
+        self.components_path = components_path
+        self.index_path = index_path
+        self.summarize = summarize
+        self.config_path = config_path or (lambda name: components_path / name / "storyConfig.ts")
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """Bring the index up to date and return all entries sorted by name"""
+        with self._lock:
+            entries = self._load()
+            seen = set()
+            changed = False
+
+            if self.components_path.exists():
+                for item in self.components_path.iterdir():
+                    if not item.is_dir() or item.name.startswith('.'):
+                        continue
+                    config_path = str(self.config_path(item.name))
+                    try:
+                        mtime_ns, size, _ = file_stamp(config_path)
+                    except FileNotFoundError:
+                        continue
+
+                    seen.add(item.name)
+                    entry = entries.get(item.name)
+                    if entry and entry.get('mtime_ns') == mtime_ns and entry.get('size') == size \
+                            and entry.get('path') == config_path:
+                        continue
+
+                    try:
+                        entry = dict(self.summarize(item.name))
+                    except Exception as e:
+                        # If we can't load the issue, leave it out of the listing, but remember
+                        # the failure against the stamp so it isn't re-parsed until the file changes
+                        entry = {'path': config_path, 'error': str(e)}
+                    entry['mtime_ns'] = mtime_ns
+                    entry['size'] = size
+                    entries[item.name] = entry
+                    changed = True
+
+            for name in set(entries) - seen:
+                del entries[name]
+                changed = True
+
+            if changed:
+                self._save(entries)
+
+            return [entries[name] for name in sorted(entries) if 'error' not in entries[name]]
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Return one page of entries and the total number of issues"""
+        entries = self.refresh()
+        end = None if limit is None else offset + limit
+        return entries[offset:end], len(entries)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = {}
+            try:
+                data = json.loads(self.index_path.read_text(encoding='utf-8'))
+                if data.get('version') == INDEX_VERSION:
+                    self._entries = data.get('issues', {})
+            except (FileNotFoundError, ValueError, AttributeError):
+                pass
+        return self._entries
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        content = json.dumps({'version': INDEX_VERSION, 'issues': entries}, indent=2, sort_keys=True)
+        try:
+            atomic_write_text(self.index_path, content, fsync=False)
+        except OSError:
+            # The index is only an accelerator; listing still works without it
+            pass
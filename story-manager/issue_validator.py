@@ -0,0 +1,226 @@
+"""
+Issue Validator for Lexicon Quest Story Manager
+Checks story configs in parallel worker processes, caching results by file hash.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from file_manager import FileManager
+from issue_cache import file_stamp
+from story_parser import parse_story_config
+from write_pipeline import atomic_write_text
+
+# Bump when the checks change so cached results are discarded
+VALIDATOR_VERSION = 1
+
+_QUEST_ATTRIBUTE = re.compile(r'data-quest-id\s*=\s*["\']?(\d+)')
+_QUEST_FILE = re.compile(r'^Quest(\d+)\.tsx$')
+
+
+def quest_files(issue_path: Path) -> List[str]:
+    """Names of the Quest<N>.tsx components in an issue directory"""
+    try:
+        return sorted(name for name in os.listdir(issue_path) if _QUEST_FILE.match(name))
+    except FileNotFoundError:
+        return []
+
+
+def quest_references(value: Any) -> List[int]:
+    """Quest ids a page refers to, from data-quest-id attributes and quest-button blocks"""
+    if isinstance(value, str):
+        return [int(quest_id) for quest_id in _QUEST_ATTRIBUTE.findall(value)]
+    if isinstance(value, list):
+        return [quest_id for item in value for quest_id in quest_references(item)]
+    if isinstance(value, dict):
+        found = [quest_id for item in value.values() for quest_id in quest_references(item)]
+        if value.get('type') == 'quest-button' and isinstance(value.get('data'), dict):
+            quest_id = value['data'].get('questId')
+            found.append(quest_id if isinstance(quest_id, int) else -1)
+        return found
+    return []
+
+
+def check_issue(issue: Dict[str, Any], quests: List[str]) -> Dict[str, Any]:
+    """Check a parsed issue model against the issue's Quest<N>.tsx files.
+
+    Returns the errors, warnings and chapter and page counts described in
+    ``validate_issue``.
+    """
+    errors: List[str] = []
+    warnings: List[str] = []
+    counts = {'chapters': 0, 'pages': 0}
+    available = {int(_QUEST_FILE.match(name).group(1)) for name in quests}
+    referenced = set()
+    chapter_ids = set()
+    page_ids = set()
+
+    for chapter_number, chapter in enumerate(issue['chapters'], 1):
+        where = f"Chapter {chapter_number}"
+        chapter_id = chapter.get('id')
+        if not chapter_id:
+            errors.append(f"{where} has no id")
+        elif chapter_id in chapter_ids:
+            errors.append(f"{where} repeats chapter id '{chapter_id}'")
+        elif chapter_id != f"chapter-{chapter_number}":
+            warnings.append(f"{where} has id '{chapter_id}', expected 'chapter-{chapter_number}'")
+        chapter_ids.add(chapter_id)
+        if not chapter.get('pages'):
+            warnings.append(f"{where} has no pages")
+
+        for page_number, page in enumerate(chapter.get('pages', []), 1):
+            where = f"Chapter {chapter_number}, page {page_number}"
+            page_id = page.get('id')
+            if not page_id:
+                errors.append(f"{where} has no id")
+            elif page_id in page_ids:
+                errors.append(f"{where} repeats page id '{page_id}'")
+            elif page_id != f"page-{chapter_number}-{page_number}":
+                warnings.append(f"{where} has id '{page_id}', expected 'page-{chapter_number}-{page_number}'")
+            page_ids.add(page_id)
+
+            for quest_id in quest_references(page):
+                if quest_id not in available:
+                    errors.append(f"{where} starts quest {quest_id}, but there is no Quest{quest_id}.tsx"
+                                  if quest_id >= 0 else f"{where} has a quest button without a numeric questId")
+                referenced.add(quest_id)
+            counts['pages'] += 1
+        counts['chapters'] += 1
+
+    for quest_id in sorted(available - referenced):
+        warnings.append(f"Quest{quest_id}.tsx is never started from the story")
+
+    return {'errors': errors, 'warnings': warnings, **counts}
+
+
+def validate_issue(issue_name: str, config_path: str, quests: List[str]) -> Dict[str, Any]:
+    """Parse and check one issue's config; runs in a worker process.
+
+    Errors break the reader (unparseable file, missing or duplicate ids,
+    quest buttons without a Quest<N>.tsx); warnings are ids that do not
+    follow the chapter-N / page-N-M numbering and unused quest components.
+    """
+    start = time.perf_counter()
+    result = {'issue': issue_name, 'path': config_path, 'errors': [], 'warnings': [], 'chapters': 0, 'pages': 0}
+
+    try:
+        text = Path(config_path).read_text(encoding='utf-8')
+        issue = parse_story_config(text, issue_name)
+    except (OSError, ValueError) as e:
+        result['errors'].append(f"Cannot parse {Path(config_path).name}: {e}")
+        result['ms'] = (time.perf_counter() - start) * 1000
+        return result
+
+    result.update(check_issue(issue, quests))
+    result['ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+
+class IssueValidator:
+    """Validates every issue, farming changed ones out to a process pool.
+
+    Results are cached next to storyIndex.ts keyed by a hash of the config
+    file and the list of quest components, so repeated runs only parse the
+    issues that changed. An unchanged stamp skips even the hashing.
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None, workers: Optional[int] = None):
+        self.file_manager = file_manager or FileManager()
+        self.workers = workers
+        self.cache_path = self.file_manager.data_path / "storyValidation.meta.json"
+
+    def validate(self, issue_names: Optional[List[str]] = None, force: bool = False) -> List[Dict[str, Any]]:
+        """Validate the given issues (default: all); returns one result per issue, sorted by name"""
+        all_issues = self._issue_names()
+        for issue_name in issue_names or []:
+            if issue_name not in all_issues:
+                raise FileNotFoundError(f"Issue '{issue_name}' not found")
+        names = issue_names or all_issues
+
+        cache = self._load_cache()
+        changed = False
+        results: Dict[str, Dict[str, Any]] = {}
+        jobs = {}
+        for issue_name in names:
+            config_path = self.file_manager.get_config_path(issue_name)
+            quests = quest_files(config_path.parent)
+            cached = cache.get(issue_name)
+            try:
+                stamp = list(file_stamp(config_path))
+            except FileNotFoundError:
+                stamp = None
+            reusable = not force and cached and cached['path'] == str(config_path) and cached['quests'] == quests
+
+            if reusable and stamp is not None and cached['stamp'] == stamp:
+                results[issue_name] = dict(cached['result'], cached=True)
+                continue
+            digest = self._hash(config_path)
+            if reusable and digest == cached['hash']:
+                # Touched but not changed (checkout, copy): keep the result, remember the new stamp
+                cached['stamp'] = stamp
+                changed = True
+                results[issue_name] = dict(cached['result'], cached=True)
+                continue
+
+            jobs[issue_name] = (str(config_path), quests, stamp, digest)
+
+        for issue_name, result in self._run(jobs).items():
+            config_path, quests, stamp, digest = jobs[issue_name]
+            cache[issue_name] = {'path': config_path, 'quests': quests, 'stamp': stamp, 'hash': digest,
+                                 'result': result}
+            changed = True
+            results[issue_name] = dict(result, cached=False)
+
+        if issue_names is None:
+            for issue_name in set(cache) - set(all_issues):
+                del cache[issue_name]
+                changed = True
+        if changed:
+            self._save_cache(cache)
+        return [results[name] for name in sorted(results)]
+
+    def _run(self, jobs: Dict[str, tuple]) -> Dict[str, Dict[str, Any]]:
+        """Validate issues in worker processes (inline when there is only one)"""
+        if len(jobs) <= 1 or self.workers == 1:
+            return {name: validate_issue(name, job[0], job[1]) for name, job in jobs.items()}
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {name: pool.submit(validate_issue, name, job[0], job[1]) for name, job in jobs.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def _issue_names(self) -> List[str]:
+        components_path = self.file_manager.components_path
+        if not components_path.exists():
+            return []
+        return sorted(
+            item.name for item in components_path.iterdir()
+            if item.is_dir() and not item.name.startswith('.')
+            and self.file_manager.get_config_path(item.name).exists()
+        )
+
+    @staticmethod
+    def _hash(path: Path) -> Optional[str]:
+        try:
+            return hashlib.sha256(path.read_bytes()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def _load_cache(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return {}
+        return data.get('issues', {}) if data.get('version') == VALIDATOR_VERSION else {}
+
+    def _save_cache(self, cache: Dict[str, Any]) -> None:
+        content = json.dumps({'version': VALIDATOR_VERSION, 'issues': cache}, indent=2, sort_keys=True)
+        try:
+            atomic_write_text(self.cache_path, content, fsync=False)
+        except OSError:
+            # The cache only speeds up later runs
+            pass
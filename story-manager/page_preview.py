@@ -0,0 +1,128 @@
+"""
+Page Preview for Lexicon Quest Story Manager
+Renders single pages of the cached issue model into the preview.html template.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from html import escape
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from block_renderer import page_html
+from content_styles import ContentStyles
+from file_manager import FileManager
+from issue_cache import file_stamp
+
+PREVIEW_TEMPLATE = Path(__file__).parent / 'preview.html'
+# Rendered pages kept in memory (a few KB each)
+PREVIEW_CACHE_SIZE = 256
+
+_SLOT = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+# Until a stylesheet has been built (Tailwind not installed yet), the Play CDN styles the page in the browser
+FALLBACK_STYLES = '<script src="https://cdn.tailwindcss.com"></script>'
+
+
+def _neighbour(chapters, chapter_index: int, page_index: int, step: int) -> Optional[Tuple[int, int]]:
+    """The previous (step -1) or next (step 1) page, skipping empty chapters"""
+    page_index += step
+    while 0 <= chapter_index < len(chapters):
+        pages = chapters[chapter_index].get('pages', [])
+        if 0 <= page_index < len(pages):
+            return chapter_index, page_index
+        chapter_index += step
+        if 0 <= chapter_index < len(chapters):
+            page_index = 0 if step > 0 else len(chapters[chapter_index].get('pages', [])) - 1
+    return None
+
+
+def _stylesheet_link(url: str) -> str:
+    if not url:
+        return FALLBACK_STYLES
+    return f'<link rel="stylesheet" id="content-styles" href="{escape(url)}">'
+
+
+class PagePreview:
+    """Renders pages into the preview template on the server.
+
+    A rendered page is cached together with the page dict it came from.
+    Edits replace only the page dicts they change (the model is
+    copy-on-write), so a cached preview stays valid until its own page,
+    its chapter title, its neighbours, the template or the content
+    stylesheet change. The ETag
+    is a hash of the output: a reparse that renders the same HTML still
+    answers 304.
+
+    Rendering only reads the URL of the last built stylesheet; a page that
+    has to be re-rendered asks for a background build, since its classes
+    may have changed.
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None, template_path: Path = PREVIEW_TEMPLATE,
+                 styles: Optional[ContentStyles] = None):
+        self.file_manager = file_manager or FileManager()
+        self.styles = styles or ContentStyles(self.file_manager)
+        self.template_path = template_path
+        self._template: Optional[str] = None
+        self._template_stamp = None
+        self._cache: 'OrderedDict[Tuple[str, int, int], Tuple[Tuple, bytes, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, issue_name: str, chapter_index: int, page_index: int) -> Tuple[bytes, str]:
+        """Return (html, etag) for one page; raises FileNotFoundError or IndexError if it doesn't exist"""
+        document = self.file_manager.read_document(issue_name)
+        page = document.page(chapter_index, page_index)
+        chapters = document.issue['chapters']
+        chapter = chapters[chapter_index]
+        template, template_stamp = self._read_template()
+        previous = _neighbour(chapters, chapter_index, page_index, -1)
+        following = _neighbour(chapters, chapter_index, page_index, 1)
+        stylesheet = self.styles.url() or ''
+        source = (page, chapter.get('title'), len(chapter['pages']), previous, following, template_stamp, stylesheet)
+
+        key = (issue_name, chapter_index, page_index)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0][0] is page and cached[0][1:] == source[1:]:
+                self._cache.move_to_end(key)
+                return cached[1], cached[2]
+
+        self.styles.schedule_build()
+        title = chapter.get('title') or f"Chapter {chapter_index + 1}"
+        slots = {
+            'title': escape(f"{title} · {page.get('id') or f'Page {page_index + 1}'}"),
+            'issue': escape(issue_name),
+            'stylesheet_link': _stylesheet_link(stylesheet),
+            'chapter_title': escape(title),
+            'location': escape(f"{issue_name} · Chapter {chapter_index + 1} · "
+                               f"Page {page_index + 1} of {len(chapter['pages'])}"),
+            'content': page_html(page),
+            'previous_link': self._link(issue_name, previous, '← Previous'),
+            'next_link': self._link(issue_name, following, 'Next →'),
+        }
+        body = _SLOT.sub(lambda match: slots.get(match.group(1), match.group(0)), template).encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()[:20]
+
+        with self._lock:
+            self._cache[key] = (source, body, etag)
+            self._cache.move_to_end(key)
+            while len(self._cache) > PREVIEW_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return body, etag
+
+    @staticmethod
+    def _link(issue_name: str, target: Optional[Tuple[int, int]], label: str) -> str:
+        if target is None:
+            return ''
+        return f'<a href="/preview/{escape(issue_name)}/{target[0]}/{target[1]}">{label}</a>'
+
+    def _read_template(self) -> Tuple[str, Any]:
+        """The template text, re-read only when the file changes"""
+        stamp = file_stamp(self.template_path)
+        with self._lock:
+            if stamp != self._template_stamp:
+                self._template = self.template_path.read_text(encoding='utf-8')
+                self._template_stamp = stamp
+            return self._template, self._template_stamp
@@ -0,0 +1,188 @@
+"""
+Request Metrics for Lexicon Quest Story Manager
+In-process latency histograms and counters, rendered in Prometheus text format.
+"""
+
+import bisect
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds: cache hits take well under a millisecond, full
+# rewrites of a large issue with fsync can take a second
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+PROFILE_LINES = 40
+
+# name -> (type, help, buckets)
+METRICS = {
+    'story_manager_request_seconds': ('histogram', "Request latency by method, route and status", LATENCY_BUCKETS),
+    'story_manager_response_bytes': ('histogram', "Response body size by route", SIZE_BUCKETS),
+    'story_manager_parse_seconds': ('histogram', "Time to parse a story config", LATENCY_BUCKETS),
+    'story_manager_parse_bytes_total': ('counter', "Story config bytes parsed", None),
+    'story_manager_render_seconds': ('histogram', "Time to regenerate a story config from its model",
+                                     LATENCY_BUCKETS),
+    'story_manager_write_seconds': ('histogram', "Time to write one file atomically", LATENCY_BUCKETS),
+    'story_manager_write_bytes_total': ('counter', "Bytes written by the write pipeline", None),
+    'story_manager_json_encode_seconds': ('histogram', "Time to encode JSON response bodies", LATENCY_BUCKETS),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+# A collector returns (name, type, help, labels, value) samples read at scrape time
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels)
+    return f'{{{pairs}}}' if pairs else ''
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """Histograms and counters keyed by metric name and labels.
+
+    Recording is a dict lookup and a few additions under one lock, cheap
+    enough to leave on for every request. Gauges that other components
+    already track (cache and queue statistics) are read at scrape time
+    from registered collectors instead of being updated on every change.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Record one value in a histogram"""
+        buckets = METRICS[name][2]
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = self._histograms.setdefault(name, {}).get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = _Histogram(len(buckets))
+            index = bisect.bisect_left(buckets, value)
+            if index < len(buckets):
+                histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Add to a counter"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counters = self._counters.setdefault(name, {})
+            counters[key] = counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """Observe the time spent in a with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        with self._lock:
+            histograms = {name: {key: (list(h.counts), h.sum, h.count) for key, h in series.items()}
+                          for name, series in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+
+        for name, (kind, help_text, buckets) in METRICS.items():
+            series = histograms.get(name) if kind == 'histogram' else counters.get(name)
+            if not series:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key in sorted(series):
+                if kind == 'counter':
+                    lines.append(f'{name}{_format_labels(key)} {_format_number(series[key])}')
+                    continue
+                counts, total, count = series[key]
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{_format_labels(key + (("le", repr(float(bound))),))} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(key + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{_format_labels(key)} {_format_number(total)}')
+                lines.append(f'{name}_count{_format_labels(key)} {count}')
+
+        described = set()
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception:
+                # A broken collector must not take the whole scrape down
+                continue
+            for name, kind, help_text, labels, value in samples:
+                if name not in described:
+                    described.add(name)
+                    lines.append(f'# HELP {name} {help_text}')
+                    lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name}{_format_labels(sorted(labels.items()))} {_format_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class RequestProfile:
+    """cProfile around one request.
+
+    Only one profiler can be active per interpreter, so concurrent
+    profiled requests take turns; ``start`` waits for the previous one.
+    """
+
+    _active = threading.Lock()
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.started: Optional[float] = None
+        self.seconds = 0.0
+
+    def start(self) -> None:
+        self._active.acquire()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self) -> None:
+        if self.started is None:
+            return
+        self.profiler.disable()
+        self.seconds = time.perf_counter() - self.started
+        self.started = None
+        self._active.release()
+
+    def report(self, sort: str = 'cumulative', lines: int = PROFILE_LINES) -> str:
+        """The top functions, as printed by pstats"""
+        output = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(lines)
+        return output.getvalue()
+
+
+# Shared by the web GUI and the modules it calls into
+metrics = MetricsRegistry()
@@ -0,0 +1,330 @@
+"""
+Search Index for Lexicon Quest Story Manager
+Incremental, persisted full-text index over the visible text of every page.
+"""
+
+import bisect
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from file_manager import FileManager
+from issue_cache import issue_cache
+from story_document import StoryDocument, is_template_value
+from story_parser import cook_template
+from write_pipeline import atomic_write_text
+
+# Bump when tokenizing or the shard format changes so every issue is reindexed
+SEARCH_VERSION = 1
+DEFAULT_LIMIT = 20
+SNIPPET_CHARS = 160
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Chapter title words count this many times in each of the chapter's pages
+TITLE_WEIGHT = 3
+
+_WORD = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+_SPACE = re.compile(r'\s+')
+# Structured-block fields that hold styling, URLs or ids rather than text
+_HIDDEN_KEYS = frozenset({'type', 'id', 'questId', 'level'})
+_STYLE_KEY = re.compile(r'(?:class(?:name)?|colou?r|image|src|url)$', re.IGNORECASE)
+# Tags whose content is never shown
+_INVISIBLE_TAGS = frozenset({'script', 'style', 'template'})
+
+
+def normalize(word: str) -> str:
+    """Fold case and accents so 'Kowaï' matches 'kowai'"""
+    decomposed = unicodedata.normalize('NFKD', word.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).replace('’', "'")
+
+
+def tokenize(text: str) -> List[str]:
+    return [normalize(match.group()) for match in _WORD.finditer(text)]
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the text nodes of an HTML fragment"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _INVISIBLE_TAGS:
+            self._hidden += 1
+        # Tags separate words even without whitespace: <p>one</p><p>two</p>
+        self.parts.append(' ')
+        alt = dict(attrs).get('alt') if tag == 'img' else None
+        if alt:
+            self.parts.append(f' {alt} ')
+
+    def handle_endtag(self, tag):
+        if tag in _INVISIBLE_TAGS and self._hidden:
+            self._hidden -= 1
+        self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self._hidden:
+            self.parts.append(data)
+
+
+def html_text(html: str) -> str:
+    """Visible text of an HTML fragment, with whitespace collapsed"""
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return _SPACE.sub(' ', ''.join(extractor.parts)).strip()
+
+
+def _visible_parts(value: Any, key: Optional[str] = None) -> Iterator[str]:
+    if key is not None and (key in _HIDDEN_KEYS or _STYLE_KEY.search(key)):
+        return
+    if isinstance(value, str):
+        if is_template_value(key, value) or key == 'htmlContent':
+            try:
+                value = cook_template(value)
+            except ValueError:
+                pass
+            yield html_text(value)
+        else:
+            yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _visible_parts(item)
+    elif isinstance(value, dict):
+        # Column items of type 'image' keep their URL in 'content'
+        is_image = value.get('type') == 'image'
+        for item_key, item in value.items():
+            if not (is_image and item_key == 'content'):
+                yield from _visible_parts(item, item_key)
+
+
+def page_text(page: Dict[str, Any]) -> str:
+    """Visible text of a page (htmlContent or structured content blocks)"""
+    fields = {key: value for key, value in page.items() if key in ('htmlContent', 'content')}
+    return ' '.join(part for part in _visible_parts(fields) if part)
+
+
+def snippet(text: str, terms: List[str], prefix: Optional[str] = None) -> Tuple[str, List[List[int]]]:
+    """Cut a window of text around the first matching word; returns it with match offsets"""
+    words = [(match.start(), match.end(), normalize(match.group())) for match in _WORD.finditer(text)]
+    wanted = set(terms)
+
+    def matches(word: str) -> bool:
+        return word in wanted or (prefix is not None and word.startswith(prefix))
+
+    first = next((start for start, _, word in words if matches(word)), 0)
+    start = max(0, first - SNIPPET_CHARS // 3)
+    if start:
+        space = text.find(' ', start)
+        start = space + 1 if 0 <= space < first else start
+    end = min(len(text), start + SNIPPET_CHARS)
+    if end < len(text):
+        space = text.rfind(' ', start, end)
+        end = space if space > first else end
+
+    offsets = [[word_start - start, word_end - start] for word_start, word_end, word in words
+               if start <= word_start and word_end <= end and matches(word)]
+    return text[start:end], offsets
+
+
+class SearchIndex:
+    """Inverted index over the pages of every issue.
+
+    Each issue is a shard stored as JSON in ``src/data/storySearch/`` with
+    its page texts, lengths and postings (term -> [[page, frequency]]).
+    ``refresh`` stats each issue's config (or uses the in-memory stamp of
+    unsaved edits) and reindexes only the issues that changed, so a search
+    costs a few stats per issue plus the posting lookups. Hits are ranked
+    with BM25.
+    """
+
+    def __init__(self, file_manager: Optional[FileManager] = None, index_path: Optional[Path] = None):
+        self.file_manager = file_manager or FileManager()
+        self.index_path = index_path or self.file_manager.data_path / "storySearch"
+        self._shards: Optional[Dict[str, Dict[str, Any]]] = None
+        self._postings: Dict[str, Dict[str, List[List[int]]]] = {}
+        self._terms: Optional[List[str]] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> Dict[str, int]:
+        """Reindex changed issues and drop removed ones; returns counts"""
+        with self._lock:
+            shards = self._load()
+            seen = set()
+            reindexed = 0
+            for issue_name in self._issue_names():
+                config_path = self.file_manager.get_config_path(issue_name)
+                try:
+                    stamp = list(issue_cache.stamp(config_path))
+                except FileNotFoundError:
+                    continue
+                seen.add(issue_name)
+                config_path = str(config_path)
+                shard = shards.get(issue_name)
+                if shard and shard['path'] == config_path and shard['stamp'] == stamp:
+                    continue
+                try:
+                    document = self.file_manager.read_document(issue_name)
+                except (OSError, ValueError):
+                    continue
+                self._set_shard(issue_name, self._build_shard(document, config_path, stamp))
+                reindexed += 1
+
+            removed = set(shards) - seen
+            for issue_name in removed:
+                self._set_shard(issue_name, None)
+            return {'issues': len(shards), 'reindexed': reindexed, 'removed': len(removed)}
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, refresh: bool = True) -> Dict[str, Any]:
+        """Ranked page hits for a query.
+
+        Every word counts towards the score; the last word also matches as a
+        prefix unless the query ends with a space, so results follow typing.
+        """
+        if refresh:
+            self.refresh()
+        terms = tokenize(query)
+        prefix = terms.pop() if terms and not query[-1:].isspace() else None
+
+        with self._lock:
+            shards = self._load()
+            expansions = {term: 1.0 for term in terms}
+            if prefix:
+                for term in self._prefix_terms(prefix):
+                    # Completions score slightly below an exact word
+                    expansions.setdefault(term, 1.0 if term == prefix else 0.8)
+
+            document_count = sum(len(shard['pages']) for shard in shards.values()) or 1
+            average_length = sum(length for shard in shards.values() for length in shard['lengths']) / document_count
+            scores: Dict[Tuple[str, int], float] = {}
+            for term, weight in expansions.items():
+                postings = self._postings.get(term, {})
+                frequency = sum(len(pages) for pages in postings.values())
+                idf = math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+                for issue_name, pages in postings.items():
+                    lengths = shards[issue_name]['lengths']
+                    for page_number, count in pages:
+                        norm = K1 * (1 - B + B * lengths[page_number] / (average_length or 1))
+                        score = weight * idf * count * (K1 + 1) / (count + norm)
+                        key = (issue_name, page_number)
+                        scores[key] = scores.get(key, 0.0) + score
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            hits = []
+            for (issue_name, page_number), score in ranked[:limit]:
+                page = shards[issue_name]['pages'][page_number]
+                text, offsets = snippet(page['text'], terms, prefix)
+                hits.append({
+                    'issue': issue_name,
+                    'chapter': page['chapter'],
+                    'page': page['page'],
+                    'chapterTitle': page['chapterTitle'],
+                    'pageId': page['id'],
+                    'score': round(score, 3),
+                    'snippet': text,
+                    'matches': offsets,
+                })
+        return {'query': query, 'total': len(scores), 'hits': hits}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            shards = self._load()
+            return {
+                'issues': len(shards),
+                'pages': sum(len(shard['pages']) for shard in shards.values()),
+                'terms': len(self._postings),
+            }
+
+    def _issue_names(self) -> List[str]:
+        try:
+            with os.scandir(self.file_manager.components_path) as entries:
+                return [entry.name for entry in entries if entry.is_dir() and not entry.name.startswith('.')]
+        except FileNotFoundError:
+            return []
+
+    # Shards
+
+    @staticmethod
+    def _build_shard(document: StoryDocument, config_path: str, stamp: List[int]) -> Dict[str, Any]:
+        pages = []
+        lengths = []
+        postings: Dict[str, List[List[int]]] = {}
+        for chapter_index, chapter in enumerate(document.issue['chapters']):
+            title = chapter.get('title') or ''
+            title_counts = Counter(tokenize(title))
+            for page_index, page in enumerate(chapter.get('pages', [])):
+                text = page_text(page)
+                counts = Counter(tokenize(text))
+                for term, count in title_counts.items():
+                    counts[term] += count * TITLE_WEIGHT
+                page_number = len(pages)
+                for term, count in counts.items():
+                    postings.setdefault(term, []).append([page_number, count])
+                pages.append({'chapter': chapter_index, 'page': page_index, 'id': page.get('id'),
+                              'chapterTitle': title, 'text': text})
+                lengths.append(sum(counts.values()))
+        return {'version': SEARCH_VERSION, 'path': config_path, 'stamp': stamp, 'pages': pages,
+                'lengths': lengths, 'postings': postings}
+
+    def _set_shard(self, issue_name: str, shard: Optional[Dict[str, Any]]) -> None:
+        """Swap one issue's postings in the merged index and persist the shard"""
+        old = self._shards.pop(issue_name, None)
+        if old:
+            for term in old['postings']:
+                issues = self._postings.get(term)
+                if issues is not None:
+                    issues.pop(issue_name, None)
+                    if not issues:
+                        del self._postings[term]
+        self._terms = None
+
+        shard_path = self.index_path / f"{issue_name}.json"
+        if shard is None:
+            try:
+                shard_path.unlink()
+            except FileNotFoundError:
+                pass
+            return
+
+        self._add(issue_name, shard)
+        try:
+            self.index_path.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(shard_path, json.dumps(shard, ensure_ascii=False, separators=(',', ':')), fsync=False)
+        except OSError:
+            # The shard is rebuilt from the issue on the next run
+            pass
+
+    def _add(self, issue_name: str, shard: Dict[str, Any]) -> None:
+        self._shards[issue_name] = shard
+        for term, pages in shard['postings'].items():
+            self._postings.setdefault(term, {})[issue_name] = pages
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        if self._terms is None:
+            self._terms = sorted(self._postings)
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + '\U0010ffff')
+        return self._terms[start:end]
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._shards is None:
+            self._shards = {}
+            for shard_path in sorted(self.index_path.glob('*.json')):
+                try:
+                    shard = json.loads(shard_path.read_text(encoding='utf-8'))
+                except (OSError, ValueError):
+                    continue
+                if shard.get('version') == SEARCH_VERSION:
+                    self._add(shard_path.stem, shard)
+        return self._shards
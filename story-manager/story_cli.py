@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Command line tools for Lexicon Quest Story Manager
+Build steps that run outside the web GUI, e.g. before `npm run build`.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from block_converter import BlockConverter
+from bundle_builder import BundleBuilder
+from content_optimizer import ContentOptimizer
+from content_styles import ContentStyles
+from edit_journal import edit_journal
+from file_manager import FileManager
+from image_pipeline import DEFAULT_MAX_BYTES, DEFAULT_QUALITY, DEFAULT_WIDTHS, ImagePipeline
+from issue_validator import IssueValidator
+from search_index import DEFAULT_LIMIT, SearchIndex
+from story_generator import StoryGenerator
+from story_index import render_story_index
+from story_transfer import FORMATS, StoryTransfer
+from structured_document import SIMPLE_CONFIG_FILE
+
+
+def run_validation(args) -> bool:
+    """Validate issues and print the findings; returns False if any issue has errors"""
+    validator = IssueValidator(workers=args.jobs)
+    start = time.perf_counter()
+    results = validator.validate(args.issues or None, force=args.force)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        timing = "cached" if result['cached'] else f"{result['ms']:.0f} ms"
+        icon = "❌" if result['errors'] else "⚠️ " if result['warnings'] else "✅"
+        print(f"{icon} {result['issue']}: {result['chapters']} chapter(s), {result['pages']} page(s) ({timing})")
+        for message in result['errors']:
+            print(f"   ❌ {message}")
+        for message in result['warnings']:
+            print(f"   ⚠️  {message}")
+
+    errors = sum(len(result['errors']) for result in results)
+    warnings = sum(len(result['warnings']) for result in results)
+    parsed = sum(not result['cached'] for result in results)
+    print(f"📊 {len(results)} issue(s) checked ({parsed} parsed) in {elapsed * 1000:.0f} ms:"
+          f" {errors} error(s), {warnings} warning(s)")
+    return errors == 0
+
+
+def cmd_validate(args) -> int:
+    """Check page ids, chapter numbering and quest references of every issue"""
+    return 0 if run_validation(args) else 1
+
+
+def cmd_build(args) -> int:
+    """Validate issues, then compile them into per-chapter JSON bundles"""
+    if not args.skip_validation and not run_validation(args):
+        print("❌ Fix the errors above before building (or pass --skip-validation)")
+        return 1
+
+    builder = BundleBuilder(output_path=Path(args.output) if args.output else None, workers=args.jobs)
+    start = time.perf_counter()
+    # One stylesheet for the classes of every issue, rewritten only when that set changes
+    styles = ContentStyles(builder.file_manager, builder.output_path).build(args.force, prune=True)
+    report = builder.build(args.issues or None, force=args.force, styles_url=styles['url'])
+    # Minified story configs for the production bundle (see vite.config.ts)
+    optimized = ContentOptimizer(builder.file_manager).optimize(args.issues or None)
+    elapsed = time.perf_counter() - start
+
+    for issue_name, result in report['issues'].items():
+        if result['skipped']:
+            print(f"⏭️  {issue_name}: unchanged")
+        else:
+            print(f"📦 {issue_name}: {result['compiled']} chapter(s) compiled, {result['reused']} reused"
+                  f"{', %d removed' % result['removed'] if result['removed'] else ''} ({result['ms']:.0f} ms)")
+    for path in report['removed'] + styles['pruned']:
+        print(f"🗑️  Removed {path}")
+    print_styles(styles)
+    print_optimized(optimized)
+    print(f"✅ Bundles written to {builder.output_path} in {elapsed * 1000:.0f} ms"
+          f"{' (manifest updated)' if report['manifest_changed'] else ''}")
+    return 1 if styles['error'] else 0
+
+
+def print_styles(report) -> None:
+    """Print the outcome of a content stylesheet build"""
+    if report['error']:
+        print(f"❌ Content stylesheet not built: {report['error']}")
+        if report['file']:
+            print(f"   ⚠️  {report['file']} is out of date")
+        return
+    action = "written" if report['changed'] else "unchanged"
+    print(f"🎨 {report['file']} {action}: {report['classes']} class(es), {report['bytes'] / 1024:.1f} KB"
+          f" ({report['scanned']} page(s) rescanned)")
+
+
+def cmd_styles(args) -> int:
+    """Build the CSS subset for the Tailwind classes that story pages use"""
+    styles = ContentStyles(output_path=Path(args.output) if args.output else None)
+    start = time.perf_counter()
+    report = styles.build(force=args.force)
+    print_styles(report)
+    if report['error']:
+        return 1
+    print(f"✅ {report['url']} ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return 0
+
+
+def print_optimized(reports, verbose: bool = False) -> None:
+    """Print bytes saved per issue by the content optimizer"""
+    for report in reports:
+        saved = report['bytes'] - report['optimizedBytes']
+        percent = saved * 100 / report['bytes'] if report['bytes'] else 0
+        action = "written" if report['changed'] else "unchanged"
+        print(f"🗜️  {report['issue']}: {report['bytes'] / 1024:.1f} KB → {report['optimizedBytes'] / 1024:.1f} KB"
+              f" (-{saved / 1024:.1f} KB, {percent:.0f}%; gzip {report['gzipBytes'] / 1024:.1f} KB →"
+              f" {report['optimizedGzipBytes'] / 1024:.1f} KB), {action}")
+        print(f"   {report['minified']} of {report['values']} content value(s) minified"
+              f" (-{(report['bytes'] - report['minifiedBytes']) / 1024:.1f} KB),"
+              f" {len(report['fragments'])} shared fragment(s)")
+        if verbose:
+            for fragment in report['fragments']:
+                print(f"   {fragment['name']} ×{fragment['count']}: {fragment['fragment']}")
+
+
+def cmd_optimize(args) -> int:
+    """Write minified story configs with repeated markup hoisted into constants"""
+    optimizer = ContentOptimizer()
+    start = time.perf_counter()
+    reports = optimizer.optimize(args.issues or None, write=not args.dry_run)
+    print_optimized(reports, verbose=args.verbose)
+    saved = sum(report['bytes'] - report['optimizedBytes'] for report in reports)
+    print(f"✅ {len(reports)} issue(s) {'checked' if args.dry_run else 'optimized'}, {saved / 1024:.1f} KB saved"
+          f" in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return 0
+
+
+def cmd_convert(args) -> int:
+    """Convert HTML issues to content blocks in simpleStoryConfig.ts"""
+    converter = BlockConverter(workers=args.jobs)
+    start = time.perf_counter()
+    reports = converter.convert(args.issues or None, dry_run=args.dry_run, force=args.force,
+                                switch=not args.keep_index)
+    for report in reports:
+        blocks = ', '.join(f"{count} {kind}" for kind, count in sorted(report['blocks'].items()))
+        saved = report['bytes'] - report['structuredBytes']
+        action = "written" if report['written'] else "checked" if args.dry_run \
+            else f"not written ({SIMPLE_CONFIG_FILE} exists; pass --force)"
+        print(f"🧱 {report['issue']}: {report['pages']} page(s) → {blocks} ({report['ms']:.0f} ms), {action}")
+        print(f"   {report['coverage'] * 100:.0f}% of page HTML mapped to blocks;"
+              f" {report['rawPages']} page(s) keep raw HTML ({report['rawBytes'] / 1024:.1f} KB)")
+        print(f"   {report['bytes'] / 1024:.1f} KB → {report['structuredBytes'] / 1024:.1f} KB"
+              f" ({saved * 100 / report['bytes'] if report['bytes'] else 0:.0f}% smaller)")
+    written = sum(report['written'] for report in reports)
+    print(f"✅ {len(reports)} issue(s) converted, {written} written in {(time.perf_counter() - start) * 1000:.0f} ms"
+          f"{'; storyIndex.ts now imports them' if written and not args.keep_index else ''}")
+    return 0
+
+
+def cmd_history(args) -> int:
+    """List, restore or compact the edit journal of an issue"""
+    generator = StoryGenerator()
+    config_path = generator.file_manager.get_config_path(args.issue)
+    if args.compact:
+        freed = edit_journal.compact(config_path, args.compact)
+        print(f"🧹 {args.issue}: kept the newest {args.compact} record(s), {freed / 1024:.1f} KB freed")
+    if args.restore is not None:
+        return run_restore(generator, args.issue, 'restore', args.restore)
+
+    history = generator.history(args.issue, args.limit)
+    for record in history['records']:
+        details = ', '.join(f"{key}={value}" for key, value in record.items()
+                            if key not in ('seq', 'time', 'op', 'digest', 'checkpoint', 'bytes'))
+        marker = "👉" if record['seq'] == history['head'] else "  "
+        print(f"{marker} {record['seq']:>5} {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['time']))}"
+              f" {record['op']}{f' ({details})' if details else ''}{' 📸' if record['checkpoint'] else ''}")
+    print(f"📜 {history['count']} record(s), {history['bytes'] / 1024:.1f} KB;"
+          f" undo → {history['undo'] or '-'}, redo → {history['redo'] or '-'}")
+    return 0
+
+
+def run_restore(generator: StoryGenerator, issue_name: str, action: str, seq=None) -> int:
+    """Undo, redo or restore one issue and wait for the file to be written"""
+    if action == 'undo':
+        write = generator.undo(issue_name)
+    elif action == 'redo':
+        write = generator.redo(issue_name)
+    else:
+        write = generator.restore(issue_name, seq)
+    generator.file_manager.flush(issue_name)
+    write.result()
+    history = generator.history(issue_name, 1)
+    print(f"✅ {issue_name}: {action} done, now at version {history['head']}"
+          f" (undo → {history['undo'] or '-'}, redo → {history['redo'] or '-'})")
+    return 0
+
+
+def cmd_undo(args) -> int:
+    """Undo the last edit of an issue"""
+    return run_restore(StoryGenerator(), args.issue, 'undo')
+
+
+def cmd_redo(args) -> int:
+    """Redo the last undone edit of an issue"""
+    return run_restore(StoryGenerator(), args.issue, 'redo')
+
+
+def cmd_index(args) -> int:
+    """Regenerate src/data/storyIndex.ts from the issue directories"""
+    file_manager = FileManager()
+    entries = file_manager.story_index_entries(args.lazy, args.eager)
+    for entry in entries:
+        print(f"{'💤' if entry.lazy else '📥'} {entry.issue}: {entry.export} from {entry.module}.ts"
+              f"{' (lazy)' if entry.lazy else ''}")
+
+    if args.check:
+        current = file_manager.story_index_path.read_bytes() if file_manager.story_index_path.exists() else b''
+        if current != render_story_index(entries).encode('utf-8'):
+            print(f"❌ {file_manager.story_index_path.name} is out of date; run story_cli.py index")
+            return 1
+        print(f"✅ {file_manager.story_index_path.name} is up to date")
+        return 0
+
+    changed = file_manager.update_story_index(args.lazy, args.eager)
+    print(f"✅ {file_manager.story_index_path.name} {'updated' if changed else 'unchanged'} ({len(entries)} issue(s))")
+    return 0
+
+
+def cmd_search(args) -> int:
+    """Search the visible text of every page"""
+    index = SearchIndex()
+    start = time.perf_counter()
+    refreshed = index.refresh()
+    indexed = time.perf_counter()
+    result = index.search(' '.join(args.query), args.limit, refresh=False)
+    searched = time.perf_counter()
+
+    for hit in result['hits']:
+        print(f"📄 {hit['issue']} › {hit['chapterTitle']} › page {hit['page'] + 1} ({hit['pageId']}, {hit['score']:.2f})")
+        print(f"   {hit['snippet']}")
+    print(f"🔎 {result['total']} page(s) matched in {(searched - indexed) * 1000:.1f} ms"
+          f" (index refresh {(indexed - start) * 1000:.0f} ms, {refreshed['reindexed']} issue(s) reindexed)")
+    return 0
+
+
+def cmd_images(args) -> int:
+    """Audit story images and optionally generate and use optimized variants"""
+    pipeline = ImagePipeline(widths=args.widths, max_bytes=args.max_kb * 1024, quality=args.quality)
+
+    if args.optimize or args.rewrite:
+        start = time.perf_counter()
+        results = pipeline.optimize()
+        saved = 0
+        for url, entry in results.items():
+            if entry.get('skipped'):
+                print(f"⏭️  {url}: {entry['skipped']}, left as is")
+                continue
+            largest = entry['variants'][-1]
+            saved += entry['bytes'] - largest['bytes']
+            state = "cached" if entry['cached'] else "encoded"
+            print(f"🖼️  {url}: {entry['bytes'] / 1024:.0f} KB -> {largest['bytes'] / 1024:.0f} KB"
+                  f" ({', '.join(str(v['width']) for v in entry['variants'])} px, {state})")
+        print(f"✅ {len(results)} image(s) processed in {time.perf_counter() - start:.1f} s,"
+              f" {saved / 1024 / 1024:.1f} MB saved at full width")
+
+    if args.rewrite:
+        for issue_name, count in pipeline.rewrite(srcset=args.srcset).items():
+            if count:
+                print(f"✏️  {issue_name}: {count} reference(s) now use optimized images")
+
+    report = pipeline.audit()
+    for item in report['missing']:
+        print(f"❌ Missing {item['url']} (used in {', '.join(item['files'])})")
+    for item in report['oversized']:
+        size = f", {item['width']}x{item['height']}" if item['width'] else ""
+        print(f"⚠️  Oversized {item['url']} ({item['bytes'] / 1024:.0f} KB{size})")
+    for item in report['unused']:
+        print(f"🗑️  Unused {item['url']} ({item['bytes'] / 1024:.0f} KB)")
+    print(f"📊 {report['referenced']} referenced, {len(report['missing'])} missing,"
+          f" {len(report['oversized'])} oversized, {len(report['unused'])} unused")
+    return 1 if args.strict and report['missing'] else 0
+
+
+def cmd_export(args) -> int:
+    """Stream issues as NDJSON records to a file or stdout"""
+    transfer = StoryTransfer()
+    start = time.perf_counter()
+    if args.output in (None, '-'):
+        count = transfer.export(sys.stdout, args.issues or None, args.format)
+        sys.stdout.flush()
+    else:
+        with open(args.output, 'w', encoding='utf-8', newline='\n') as output:
+            count = transfer.export(output, args.issues or None, args.format)
+    # stdout may be the export itself, so report on stderr
+    print(f"📤 Exported {count} record(s) in {(time.perf_counter() - start) * 1000:.0f} ms", file=sys.stderr)
+    return 0
+
+
+def cmd_import(args) -> int:
+    """Create or replace issues from an NDJSON export"""
+    transfer = StoryTransfer()
+    start = time.perf_counter()
+    if args.input == '-':
+        reports = transfer.import_lines(sys.stdin, args.format, args.dry_run)
+    else:
+        with open(args.input, encoding='utf-8') as lines:
+            reports = transfer.import_lines(lines, args.format, args.dry_run)
+
+    for report in reports:
+        action = "would create" if args.dry_run and report['created'] else "would replace" if args.dry_run \
+            else "created" if report['created'] else "replaced"
+        blocks = f", {report['blocks']} block(s)" if report['format'] == 'structured' else ""
+        print(f"📥 {report['issue']}: {action} ({report['format']}), {report['chapters']} chapter(s),"
+              f" {report['pages']} page(s){blocks}, {report['bytes'] / 1024:.0f} KB")
+    print(f"✅ {len(reports)} issue(s) {'checked' if args.dry_run else 'imported'}"
+          f" in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return 0
+
+
+def main():
+    """Run a story manager command"""
+    parser = argparse.ArgumentParser(description="Lexicon Quest Story Manager - command line tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    validate = commands.add_parser('validate', help="Check page ids, chapter numbering and quest references")
+    validate.add_argument('issues', nargs='*', help="Issues to check (default: all)")
+    validate.add_argument('--force', action='store_true', help="Ignore cached results")
+    validate.add_argument('--jobs', '-j', type=int, help="Worker processes (default: one per CPU)")
+    validate.set_defaults(handler=cmd_validate)
+
+    build = commands.add_parser('build', help="Validate issues and compile them into per-chapter JSON bundles")
+    build.add_argument('issues', nargs='*', help="Issues to build (default: all)")
+    build.add_argument('--force', action='store_true', help="Recompile every chapter")
+    build.add_argument('--output', help="Output directory (default: public/issues)")
+    build.add_argument('--jobs', '-j', type=int, help="Worker processes (default: one per CPU)")
+    build.add_argument('--skip-validation', action='store_true', help="Build even if validation fails")
+    build.set_defaults(handler=cmd_build)
+
+    styles = commands.add_parser('styles', help="Build the CSS subset for the Tailwind classes pages use")
+    styles.add_argument('--force', action='store_true', help="Rewrite the stylesheet even if no class changed")
+    styles.add_argument('--output', help="Output directory (default: public/issues)")
+    styles.set_defaults(handler=cmd_styles)
+
+    optimize = commands.add_parser('optimize', help="Write minified story configs for the production build")
+    optimize.add_argument('issues', nargs='*', help="Issues to optimize (default: all)")
+    optimize.add_argument('--dry-run', action='store_true', help="Report the savings without writing anything")
+    optimize.add_argument('--verbose', '-v', action='store_true', help="List the shared fragments")
+    optimize.set_defaults(handler=cmd_optimize)
+
+    convert = commands.add_parser('convert', help="Convert HTML issues to content blocks in simpleStoryConfig.ts")
+    convert.add_argument('issues', nargs='*', help="Issues to convert (default: every issue with a storyConfig.ts)")
+    convert.add_argument('--dry-run', action='store_true', help="Report coverage without writing anything")
+    convert.add_argument('--force', action='store_true', help="Overwrite an existing simpleStoryConfig.ts")
+    convert.add_argument('--keep-index', action='store_true', help="Leave storyIndex.ts on the HTML config")
+    convert.add_argument('--jobs', '-j', type=int, help="Worker processes (default: one per CPU)")
+    convert.set_defaults(handler=cmd_convert)
+
+    history = commands.add_parser('history', help="Show, restore or compact an issue's edit journal")
+    history.add_argument('issue', help="Issue name")
+    history.add_argument('--limit', type=int, default=20, help="Records to list (0 for all)")
+    history.add_argument('--restore', type=int, metavar='SEQ', help="Bring back the version after record SEQ")
+    history.add_argument('--compact', type=int, metavar='N', help="Drop all but the newest N records")
+    history.set_defaults(handler=cmd_history)
+
+    undo = commands.add_parser('undo', help="Undo the last edit of an issue")
+    undo.add_argument('issue', help="Issue name")
+    undo.set_defaults(handler=cmd_undo)
+
+    redo = commands.add_parser('redo', help="Redo the last undone edit of an issue")
+    redo.add_argument('issue', help="Issue name")
+    redo.set_defaults(handler=cmd_redo)
+
+    index = commands.add_parser('index', help="Regenerate src/data/storyIndex.ts from the issue directories")
+    index.add_argument('--lazy', nargs='+', default=[], metavar='ISSUE', help="Load these issues with import()")
+    index.add_argument('--eager', nargs='+', default=[], metavar='ISSUE', help="Import these issues statically")
+    index.add_argument('--check', action='store_true', help="Only report whether the index is up to date")
+    index.set_defaults(handler=cmd_index)
+
+    search = commands.add_parser('search', help="Find pages by their visible text")
+    search.add_argument('query', nargs='+', help="Words to look for (the last one also matches as a prefix)")
+    search.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help="Maximum number of hits")
+    search.set_defaults(handler=cmd_search)
+
+    images = commands.add_parser('images', help="Audit images and generate optimized variants")
+    images.add_argument('--optimize', action='store_true', help="Generate resized WebP variants (needs Pillow)")
+    images.add_argument('--rewrite', action='store_true', help="Point story configs at the variants (implies --optimize)")
+    images.add_argument('--srcset', action='store_true', help="With --rewrite, give <img> tags a srcset of every width")
+    images.add_argument('--widths', type=int, nargs='+', default=list(DEFAULT_WIDTHS), help="Variant widths in pixels")
+    images.add_argument('--quality', type=int, default=DEFAULT_QUALITY, help="WebP quality")
+    images.add_argument('--max-kb', type=int, default=DEFAULT_MAX_BYTES // 1024, help="Report images larger than this")
+    images.add_argument('--strict', action='store_true', help="Exit with an error if any image is missing")
+    images.set_defaults(handler=cmd_images)
+
+    export = commands.add_parser('export', help="Stream issues as NDJSON, one record per chapter, page or block")
+    export.add_argument('issues', nargs='*', help="Issues to export (default: all)")
+    export.add_argument('--format', choices=FORMATS, help="Convert every page to this format")
+    export.add_argument('--output', '-o', help="File to write (default: stdout)")
+    export.set_defaults(handler=cmd_export)
+
+    import_ = commands.add_parser('import', help="Create or replace issues from an NDJSON export")
+    import_.add_argument('input', help="NDJSON file, or - for stdin")
+    import_.add_argument('--format', choices=FORMATS, help="Format of new issues (default: as recorded)")
+    import_.add_argument('--dry-run', action='store_true', help="Check the records without writing anything")
+    import_.set_defaults(handler=cmd_import)
+
+    args = parser.parse_args()
+    try:
+        sys.exit(args.handler(args))
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+"""
+Story Document for Lexicon Quest Story Manager
+Keeps a parsed story config together with the source spans of its chapters
+and pages, so edits can be spliced into the file text instead of
+regenerating the whole file.
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from request_metrics import metrics
+from story_parser import Span, StoryConfigParser, StoryEvent, skip_whitespace, template_end
+
+# Keys whose string values are written as raw template literals
+TEMPLATE_KEYS = frozenset({'htmlContent', 'content'})
+
+DEFAULT_HEADER = "import type { StoryIssue } from '../../types/storyTypes';\n\n"
+
+_IDENTIFIER_KEY = re.compile(r'[A-Za-z_$][\w$]*')
+
+
+def template_literal(raw: str) -> str:
+    """Wrap raw template source in backticks, rejecting content that would end it early"""
+    literal = f'`{raw}`'
+    try:
+        end = template_end(literal, 0)
+    except ValueError:
+        end = -1
+    if end != len(literal):
+        raise ValueError("Content contains an unescaped backtick or unbalanced ${...}; escape it as \\`")
+    return literal
+
+
+def is_template_value(key: Optional[str], value: Any) -> bool:
+    """Check whether a value is written as a template literal"""
+    if key not in TEMPLATE_KEYS or not isinstance(value, str):
+        return False
+    # Structured blocks also use 'content' for image paths, which stay quoted
+    return key != 'content' or '<' in value
+
+
+def format_key(key: str) -> str:
+    """Format an object key the way our story configs write them"""
+    return key if _IDENTIFIER_KEY.fullmatch(key) else json.dumps(key, ensure_ascii=False)
+
+
+def format_value(value: Any, indent: int = 0, key: Optional[str] = None) -> str:
+    """Format a model value as a TypeScript literal whose closing line is at indent"""
+    if is_template_value(key, value):
+        return template_literal(value)
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return json.dumps(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+
+    pad = ' ' * indent
+    inner = ' ' * (indent + 2)
+    if isinstance(value, dict):
+        if not value:
+            return '{}'
+        fields = ',\n'.join(
+            f'{inner}{format_key(k)}: {format_value(v, indent + 2, k)}' for k, v in value.items()
+        )
+        return f'{{\n{fields}\n{pad}}}'
+    if isinstance(value, list):
+        if not value:
+            return '[]'
+        items = ''.join(f'{inner}{format_value(item, indent + 2)},\n' for item in value)
+        return f'[\n{items}{pad}]'
+
+    raise TypeError(f"Cannot write {type(value).__name__} to a story config")
+
+
+def render_story_config(issue: Dict[str, Any], export_name: str, type_name: Optional[str] = 'StoryIssue',
+                        header: str = DEFAULT_HEADER, trailer: str = ';\n') -> str:
+    """Render a complete story config file from an issue model"""
+    annotation = f': {type_name}' if type_name else ''
+    with metrics.timer('story_manager_render_seconds'):
+        return f'{header}export const {export_name}{annotation} = {format_value(issue)}{trailer}'
+
+
+class _Node:
+    """Source spans of one object literal (issue, chapter or page).
+
+    ``start`` and ``end`` are relative to the parent's start (the root's to the
+    file); ``spans`` and ``children`` are relative to this node's own start.
+    Nodes are never changed in place: an edit rebuilds only the nodes that
+    contain it, moves the later siblings on each level and shares every
+    other subtree, so document copies can share one tree.
+    """
+    __slots__ = ('start', 'end', 'spans', 'children')
+
+    def __init__(self, start: int, end: int, spans: Dict[str, Span], children: List['_Node']):
+        self.start = start
+        self.end = end
+        self.spans = spans
+        self.children = children
+
+    @classmethod
+    def from_event(cls, event: StoryEvent, children: Optional[List['_Node']] = None, base: int = 0) -> '_Node':
+        """Build a node from a parser event; children are positioned relative to base 0"""
+        start = event.start
+        spans = {key: (span[0] - start, span[1] - start) for key, span in event.spans.items()}
+        children = [child.moved(-start) for child in children or []]
+        return cls(start - base, event.end - base, spans, children)
+
+    def moved(self, delta: int) -> '_Node':
+        return _Node(self.start + delta, self.end + delta, self.spans, self.children)
+
+    def shifted(self, a: int, b: int, delta: int) -> '_Node':
+        """This node after text[a:b] (in the parent's offsets) was replaced by a span delta characters longer"""
+        end_threshold = max(b, a + 1)
+        if self.end < end_threshold:
+            return self
+        if self.start >= b:
+            return self.moved(delta)
+        a, b, end_threshold = a - self.start, b - self.start, end_threshold - self.start
+        spans = {
+            key: (span[0] + delta if span[0] >= b else span[0], span[1] + delta if span[1] >= end_threshold else span[1])
+            for key, span in self.spans.items()
+        }
+        children = [child.shifted(a, b, delta) for child in self.children]
+        return _Node(self.start, self.end + delta, spans, children)
+
+
+class StoryDocument:
+    """A story config's source text, issue model and object spans.
+
+    Edits splice only the affected literal into ``text`` and update the model
+    copy-on-write, so readers holding ``issue`` keep a consistent snapshot.
+    When an edit cannot be expressed as a splice (e.g. the key being set is
+    absent from the source) the file is regenerated from the model instead.
+    """
+
+    # Which story format (and backend) this document edits
+    format = 'html'
+
+    def __init__(self, text: str, issue_name: Optional[str] = None):
+        self.issue_name = issue_name
+        self._load(text)
+
+    def _load(self, text: str) -> None:
+        parser = StoryConfigParser(text)
+        issue: Dict[str, Any] = {'id': self.issue_name}
+        chapters: List[Dict[str, Any]] = []
+        pages: List[Dict[str, Any]] = []
+        chapter_nodes: List[_Node] = []
+        page_nodes: List[_Node] = []
+        root: Optional[_Node] = None
+
+        for event in parser.events():
+            if event.kind == 'page':
+                pages.append(event.data)
+                page_nodes.append(_Node.from_event(event))
+            elif event.kind == 'chapter':
+                chapter = dict(event.data)
+                chapter['pages'] = pages
+                chapters.append(chapter)
+                chapter_nodes.append(_Node.from_event(event, page_nodes))
+                pages, page_nodes = [], []
+            else:
+                issue.update(event.data)
+                root = _Node.from_event(event, chapter_nodes)
+
+        issue['chapters'] = chapters
+        self.text = text
+        self.issue = issue
+        self.export_name = parser.export_name
+        self.type_name = parser.type_name
+        self.header = text[:parser.export_start]
+        self.trailer = text[root.end:]
+        self._root = root
+
+    def copy(self) -> 'StoryDocument':
+        """An independent document to edit; the text, model and span tree are shared, not reparsed.
+
+        Edits replace these rather than changing them, so the copy costs O(1).
+        """
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        return clone
+
+    # Read views
+
+    def outline(self) -> Dict[str, Any]:
+        """Chapter titles with page ids and source sizes, without page content"""
+        chapters = []
+        for chapter, chapter_node in zip(self.issue['chapters'], self._root.children):
+            chapters.append({
+                'id': chapter.get('id'),
+                'title': chapter.get('title'),
+                'pages': [
+                    {'id': page.get('id'), 'size': page_node.end - page_node.start}
+                    for page, page_node in zip(chapter['pages'], chapter_node.children)
+                ]
+            })
+        return {'id': self.issue.get('id'), 'format': self.format, 'chapters': chapters}
+
+    def page(self, chapter_index: int, page_index: int) -> Dict[str, Any]:
+        """Return a single page of the model"""
+        chapters = self.issue['chapters']
+        if not 0 <= chapter_index < len(chapters):
+            raise IndexError(f"Chapter {chapter_index + 1} not found")
+        pages = chapters[chapter_index]['pages']
+        if not 0 <= page_index < len(pages):
+            raise IndexError(f"Page {page_index + 1} not found")
+        return pages[page_index]
+
+    def chapter_source(self, chapter_index: int) -> str:
+        """Return the source text of one chapter literal"""
+        start, end = self._element_span((), chapter_index)
+        return self.text[start:end]
+
+    # Rendering
+
+    def render(self) -> str:
+        """Regenerate the whole file from the model"""
+        return render_story_config(self.issue, self.export_name, self.type_name, self.header, self.trailer)
+
+    def _regenerate(self) -> None:
+        self._load(self.render())
+
+    # Page edits
+
+    def set_page_field(self, chapter_index: int, page_index: int, key: str, value: Any) -> None:
+        """Set one field of a page"""
+        span = self._span((chapter_index, page_index), key)
+        literal = format_value(value, self._line_indent(span[0]) if span else 0, key)
+
+        page = dict(self.issue['chapters'][chapter_index]['pages'][page_index])
+        page[key] = value
+        self._replace_page(chapter_index, page_index, page)
+
+        if span is None:
+            self._regenerate()
+        else:
+            self._splice(span[0], span[1], literal)
+
+    def insert_page(self, chapter_index: int, page: Dict[str, Any]) -> None:
+        """Append a page to a chapter"""
+        path = (chapter_index,)
+        array = self._span(path, 'pages')
+        last = self._last_span(path)
+        # Format first: content that can't be written must leave the model untouched
+        literal = format_value(page, self._element_indent(array, last)) if array else None
+        chapter = dict(self.issue['chapters'][chapter_index])
+        chapter['pages'] = list(chapter.get('pages', [])) + [page]
+        self._replace_chapter(chapter_index, chapter)
+
+        if array is None:
+            self._regenerate()
+            return
+
+        start = self._insert_element(array, last, page, literal)
+        page_index = len(chapter['pages']) - 1
+        self._insert_node(path, page_index, StoryConfigParser(self.text).page_event(start, chapter_index, page_index))
+
+    def remove_page(self, chapter_index: int, page_index: int) -> None:
+        """Remove a page from a chapter"""
+        chapter = dict(self.issue['chapters'][chapter_index])
+        pages = list(chapter['pages'])
+        pages.pop(page_index)
+        chapter['pages'] = pages
+        self._replace_chapter(chapter_index, chapter)
+
+        self._remove_element((chapter_index,), page_index)
+
+    def move_page(self, chapter_index: int, page_index: int, to_index: int) -> None:
+        """Move a page so that it ends up at to_index in its chapter, keeping its source text"""
+        chapter = dict(self.issue['chapters'][chapter_index])
+        pages = list(chapter['pages'])
+        if not 0 <= page_index < len(pages):
+            raise IndexError(f"Page {page_index + 1} not found")
+        if not 0 <= to_index < len(pages):
+            raise IndexError(f"Page position {to_index + 1} is out of range")
+        if page_index == to_index:
+            return
+        pages.insert(to_index, pages.pop(page_index))
+        chapter['pages'] = pages
+        self._replace_chapter(chapter_index, chapter)
+
+        path = (chapter_index,)
+        if self._span(path, 'pages') is None:
+            self._regenerate()
+            return
+
+        start = self._move_element(path, 'pages', page_index, to_index)
+        self._insert_node(path, to_index, StoryConfigParser(self.text).page_event(start, chapter_index, to_index))
+
+    # Chapter edits
+
+    def set_chapter_field(self, chapter_index: int, key: str, value: Any) -> None:
+        """Set one field of a chapter (other than its pages)"""
+        span = self._span((chapter_index,), key)
+        literal = format_value(value, self._line_indent(span[0]) if span else 0, key)
+
+        chapter = dict(self.issue['chapters'][chapter_index])
+        chapter[key] = value
+        self._replace_chapter(chapter_index, chapter)
+
+        if span is None:
+            self._regenerate()
+        else:
+            self._splice(span[0], span[1], literal)
+
+    def insert_chapter(self, chapter: Dict[str, Any]) -> None:
+        """Append a chapter to the issue"""
+        chapter_index = len(self.issue['chapters'])
+        array = self._span((), 'chapters')
+        last = self._last_span(())
+        literal = format_value(chapter, self._element_indent(array, last)) if array else None
+        self._set_chapters(list(self.issue['chapters']) + [chapter])
+
+        if array is None:
+            self._regenerate()
+            return
+
+        start = self._insert_element(array, last, chapter, literal)
+        self._insert_chapter_node(start, chapter_index)
+
+    def remove_chapter(self, chapter_index: int) -> None:
+        """Remove a chapter and all of its pages"""
+        chapters = list(self.issue['chapters'])
+        chapters.pop(chapter_index)
+        self._set_chapters(chapters)
+
+        self._remove_element((), chapter_index)
+
+    def move_chapter(self, chapter_index: int, to_index: int) -> None:
+        """Move a chapter (with its pages) so that it ends up at to_index, keeping its source text"""
+        chapters = list(self.issue['chapters'])
+        if not 0 <= chapter_index < len(chapters):
+            raise IndexError(f"Chapter {chapter_index + 1} not found")
+        if not 0 <= to_index < len(chapters):
+            raise IndexError(f"Chapter position {to_index + 1} is out of range")
+        if chapter_index == to_index:
+            return
+        chapters.insert(to_index, chapters.pop(chapter_index))
+        self._set_chapters(chapters)
+
+        if self._span((), 'chapters') is None:
+            self._regenerate()
+            return
+
+        start = self._move_element((), 'chapters', chapter_index, to_index)
+        self._insert_chapter_node(start, to_index)
+
+    # Model copy-on-write helpers
+
+    def _set_chapters(self, chapters: List[Dict[str, Any]]) -> None:
+        issue = dict(self.issue)
+        issue['chapters'] = chapters
+        self.issue = issue
+
+    def _replace_chapter(self, chapter_index: int, chapter: Dict[str, Any]) -> None:
+        chapters = list(self.issue['chapters'])
+        chapters[chapter_index] = chapter
+        self._set_chapters(chapters)
+
+    def _replace_page(self, chapter_index: int, page_index: int, page: Dict[str, Any]) -> None:
+        chapter = dict(self.issue['chapters'][chapter_index])
+        pages = list(chapter['pages'])
+        pages[page_index] = page
+        chapter['pages'] = pages
+        self._replace_chapter(chapter_index, chapter)
+
+    # Span tree helpers; a path is () for the issue, (chapter,) or (chapter, page)
+
+    def _locate(self, path: Tuple[int, ...]) -> Tuple[_Node, int]:
+        """Return the node at path and its absolute start offset"""
+        node = self._root
+        start = node.start
+        for index in path:
+            node = node.children[index]
+            start += node.start
+        return node, start
+
+    def _span(self, path: Tuple[int, ...], key: str) -> Optional[Span]:
+        """Absolute span of one property value of the node at path"""
+        node, start = self._locate(path)
+        span = node.spans.get(key)
+        return (start + span[0], start + span[1]) if span else None
+
+    def _element_span(self, path: Tuple[int, ...], index: int) -> Span:
+        """Absolute span of one child of the node at path"""
+        node, start = self._locate(path)
+        child = node.children[index]
+        return start + child.start, start + child.end
+
+    def _set_children(self, path: Tuple[int, ...], change: Callable[[List[_Node]], None]) -> None:
+        """Apply change to a copy of the children at path, rebuilding only the nodes above it"""
+        def rebuild(node: _Node, depth: int) -> _Node:
+            children = list(node.children)
+            if depth == len(path):
+                change(children)
+            else:
+                children[path[depth]] = rebuild(children[path[depth]], depth + 1)
+            return _Node(node.start, node.end, node.spans, children)
+
+        self._root = rebuild(self._root, 0)
+
+    def _insert_node(self, path: Tuple[int, ...], index: int, event: StoryEvent,
+                     children: Optional[List[_Node]] = None) -> None:
+        _, start = self._locate(path)
+        node = _Node.from_event(event, children, base=start)
+        self._set_children(path, lambda siblings: siblings.insert(index, node))
+
+    def _insert_chapter_node(self, start: int, chapter_index: int) -> None:
+        page_nodes = []
+        for event in StoryConfigParser(self.text).chapter_events(start, chapter_index):
+            if event.kind == 'page':
+                page_nodes.append(_Node.from_event(event))
+            else:
+                self._insert_node((), chapter_index, event, page_nodes)
+
+    # Text splicing helpers
+
+    def _splice(self, a: int, b: int, replacement: str) -> None:
+        """Replace text[a:b]; the string is rebuilt (one O(file) copy), the span tree is path-copied"""
+        self.text = ''.join((self.text[:a], replacement, self.text[b:]))
+        delta = len(replacement) - (b - a)
+        if delta:
+            self._root = self._root.shifted(a, b, delta)
+
+    def _line_indent(self, pos: int) -> int:
+        line_start = self.text.rfind('\n', 0, pos) + 1
+        indent = line_start
+        while indent < pos and self.text[indent] in ' \t':
+            indent += 1
+        return indent - line_start
+
+    def _last_span(self, path: Tuple[int, ...]) -> Optional[Span]:
+        node, _ = self._locate(path)
+        return self._element_span(path, len(node.children) - 1) if node.children else None
+
+    def _element_indent(self, array: Span, last: Optional[Span]) -> int:
+        """Indent of a new element appended after last (or into the empty array)"""
+        return self._line_indent(last[0]) if last is not None else self._line_indent(array[0]) + 2
+
+    def _insert_element(self, array: Span, last: Optional[Span], value: Any, literal: Optional[str] = None) -> int:
+        """Insert a value after the last element of an array; return its start offset.
+
+        ``literal`` is inserted verbatim instead of formatting ``value``; it
+        must already be indented for the array's element level.
+        """
+        text = self.text
+        indent = self._element_indent(array, last)
+        if last is not None:
+            after = skip_whitespace(text, last[1])
+            if text[after] == ',':
+                at, lead = after + 1, ''
+            else:
+                at, lead = last[1], ','
+            insertion = f"{lead}\n{' ' * indent}{literal or format_value(value, indent)},"
+        else:
+            outer = self._line_indent(array[0])
+            at, lead = array[0] + 1, ''
+            insertion = f"\n{' ' * indent}{literal or format_value(value, indent)},"
+            if '\n' not in text[at:array[1]]:
+                insertion += f"\n{' ' * outer}"
+
+        self._splice(at, at, insertion)
+        return at + len(lead) + 1 + indent
+
+    def _move_element(self, path: Tuple[int, ...], key: str, index: int, to_index: int) -> int:
+        """Cut an element of the key array at path and reinsert it before the element now at to_index.
+
+        The element's node is dropped from the tree; returns the new start
+        offset so the caller can parse a node for it.
+        """
+        start, end = self._element_span(path, index)
+        literal = self.text[start:end]
+        self._remove_element(path, index)
+        node, _ = self._locate(path)
+        if to_index < len(node.children):
+            at = self._element_span(path, to_index)[0]
+            self._splice(at, at, f"{literal},\n{' ' * self._line_indent(at)}")
+            return at
+        return self._insert_element(self._span(path, key), self._last_span(path), None, literal)
+
+    def _remove_element(self, path: Tuple[int, ...], index: int) -> None:
+        """Remove an array element together with its separator and leading whitespace"""
+        start, end = self._element_span(path, index)
+        self._set_children(path, lambda siblings: siblings.pop(index))
+        self._remove_span(start, end)
+
+    def _remove_span(self, start: int, end: int) -> None:
+        text = self.text
+        a = start
+        while a > 0 and text[a - 1].isspace():
+            a -= 1
+        b = skip_whitespace(text, end)
+        b = b + 1 if b < len(text) and text[b] == ',' else end
+        self._splice(a, b, '')
@@ -0,0 +1,111 @@
+"""
+Story Events for Lexicon Quest Story Manager
+In-process publish/subscribe of issue changes, streamed to browsers as Server-Sent Events.
+"""
+
+import json
+import queue
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Events kept for clients that reconnect with Last-Event-ID
+HISTORY_SIZE = 256
+# Events a slow subscriber may fall behind before it is told to resync
+SUBSCRIBER_BACKLOG = 1024
+
+
+class Subscription:
+    """One subscriber's queue of (id, event) pairs; None means the broker closed"""
+
+    def __init__(self, broker: 'EventBroker'):
+        self.broker = broker
+        self.queue: 'queue.Queue' = queue.Queue(SUBSCRIBER_BACKLOG)
+
+    def get(self, timeout: float):
+        """Return the next (id, event), None once closed; raises queue.Empty on timeout"""
+        return self.queue.get(timeout=timeout)
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """Fans events out to every subscriber.
+
+    Events get increasing ids so a reconnecting client can ask for what it
+    missed. A subscriber that is too far behind (or asks for an id older
+    than the history) gets a single ``resync`` event instead, telling it to
+    reload everything.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Subscription] = []
+        self._history: 'deque' = deque(maxlen=HISTORY_SIZE)
+        self._next_id = 1
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Send an event ({'type': ..., ...}) to every subscriber; returns its id"""
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+            self._history.append((event_id, event))
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            self._offer(subscription, (event_id, event))
+        return event_id
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """Start receiving events, first replaying those after last_event_id"""
+        subscription = Subscription(self)
+        with self._lock:
+            if self._closed:
+                subscription.queue.put(None)
+                return subscription
+            if last_event_id is not None:
+                missed = [item for item in self._history if item[0] > last_event_id]
+                oldest = self._history[0][0] if self._history else self._next_id
+                if last_event_id < oldest - 1:
+                    missed = [(self._next_id - 1, {'type': 'resync'})]
+                for item in missed:
+                    subscription.queue.put(item)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def close(self) -> None:
+        """End every subscription (on server shutdown)"""
+        with self._lock:
+            self._closed = True
+            subscribers, self._subscribers = self._subscribers, []
+        for subscription in subscribers:
+            self._offer(subscription, None)
+
+    @staticmethod
+    def _offer(subscription: Subscription, item) -> None:
+        try:
+            subscription.queue.put_nowait(item)
+        except queue.Full:
+            # Too far behind to catch up event by event
+            with subscription.queue.mutex:
+                subscription.queue.queue.clear()
+            subscription.queue.put_nowait(item if item is None else (item[0], {'type': 'resync'}))
+
+
+def format_sse(event_id: int, event: Dict[str, Any]) -> bytes:
+    """Encode an event in text/event-stream format"""
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n".encode('utf-8')
+
+
+# Shared by the file watcher, FileManager edits and the /api/events stream
+story_events = EventBroker()
@@ -3,16 +3,62 @@ Story Generator for Lexicon Quest
 Generates TypeScript story configuration files.
 """
 
-import re
-from pathlib import Path
+import functools
+import json
+import threading
+from concurrent.futures import Future
 from typing import Dict, List, Any, Optional
+from edit_journal import edit_journal
 from file_manager import FileManager
+from issue_validator import check_issue, quest_files
+from structured_document import text_block, validate_block
+
+# Batch operations: op -> (edit method, required fields, optional fields)
+BATCH_OPERATIONS = {
+    'add-chapter': ('_add_chapter', ('title',), ('description',)),
+    'update-chapter': ('_update_chapter', ('chapter_index', 'title'), ()),
+    'move-chapter': ('_move_chapter', ('chapter_index', 'to_index'), ()),
+    'delete-chapter': ('_delete_chapter', ('chapter_index',), ()),
+    'add-page': ('_add_page', ('chapter_index', 'content'), ('title',)),
+    'update-page': ('_update_page', ('chapter_index', 'page_index', 'content'), ()),
+    'move-page': ('_move_page', ('chapter_index', 'page_index', 'to_index'), ()),
+    'delete-page': ('_delete_page', ('chapter_index', 'page_index'), ()),
+    'insert-block': ('_insert_block', ('chapter_index', 'page_index', 'block_index', 'block'), ()),
+    'update-block': ('_update_block', ('chapter_index', 'page_index', 'block_index', 'block'), ()),
+    'move-block': ('_move_block', ('chapter_index', 'page_index', 'block_index', 'to_index'), ()),
+    'delete-block': ('_delete_block', ('chapter_index', 'page_index', 'block_index'), ()),
+    'renumber': ('_renumber', (), ()),
+}
+
+
+def _locked_issue(method):
+    """Run a mutator while holding the per-issue lock of its issue_name argument"""
+    @functools.wraps(method)
+    def wrapper(self, issue_name, *args, **kwargs):
+        with self.issue_lock(issue_name):
+            return method(self, issue_name, *args, **kwargs)
+    return wrapper
+
 
 class StoryGenerator:
+    # Shared by all instances so concurrent requests can't interleave
+    # read-modify-write cycles on the same storyConfig.ts
+    _issue_locks: Dict[str, threading.RLock] = {}
+    _issue_locks_guard = threading.Lock()
+    
     def __init__(self):
         self.file_manager = FileManager()
     
-    def create_issue(self, issue_name: str) -> None:
+    def issue_lock(self, issue_name: str) -> threading.RLock:
+        """Get the lock that serializes writes to one issue"""
+        with self._issue_locks_guard:
+            lock = self._issue_locks.get(issue_name)
+            if lock is None:
+                lock = self._issue_locks[issue_name] = threading.RLock()
+            return lock
+    
+    @_locked_issue
+    def create_issue(self, issue_name: str) -> Future:
         """Create a new story issue"""
         # Create directory
         self.file_manager.create_issue_directory(issue_name)
@@ -21,130 +67,262 @@ class StoryGenerator:
         capitalized_name = self._capitalize(issue_name)
         content = self._generate_story_config_content(issue_name, capitalized_name)
         
-        # Write story config file
-        self.file_manager.write_story_config(issue_name, content)
+        # Write story config file now, bypassing any write-behind delay:
+        # the index imports it
+        future = self.file_manager.write_story_config(issue_name, content, {'op': 'create-issue'})
+        self.file_manager.flush(issue_name)
+        future.result()
         
-        # Update story index
-        self.file_manager.update_story_index(issue_name, capitalized_name)
+        # Regenerate the story index so it imports the new issue
+        self.file_manager.update_story_index()
+        return future
     
-    def add_chapter(self, issue_name: str, title: str, description: str = "") -> None:
-        """Add a chapter to an existing issue"""
-        # Load existing issue data
-        issue_data = self._load_issue_data(issue_name)
-        
-        # Create new chapter
-        chapter_number = len(issue_data.get('chapters', [])) + 1
-        new_chapter = {
-            'id': f'chapter-{chapter_number}',
-            'title': title,
-            'description': description,
-            'theme': 'adventure',
-            'pages': [
-                {
-                    'id': f'page-{chapter_number}-1',
-                    'htmlContent': self._generate_default_page_content(title, description)
-                }
-            ]
-        }
-        
-        # Add chapter to issue
-        if 'chapters' not in issue_data:
-            issue_data['chapters'] = []
-        issue_data['chapters'].append(new_chapter)
+    def _editable_document(self, issue_name: str):
+        """A private copy of the cached document to edit.
         
-        # Save updated issue
-        self._save_issue_data(issue_name, issue_data)
+        Edits go to the copy and write_document publishes it, so an edit
+        that fails part-way leaves the cached issue as it was.
+        """
+        return self.file_manager.read_document(issue_name).copy()
     
-    def add_page(self, issue_name: str, chapter_index: int, title: str, content: str) -> None:
+    @_locked_issue
+    def add_chapter(self, issue_name: str, title: str, description: str = "") -> Future:
+        """Add a chapter to an existing issue"""
+        document = self._editable_document(issue_name)
+        self._add_chapter(document, title, description)
+        return self.file_manager.write_document(issue_name, document, {'op': 'add-chapter', 'title': title})
+    
+    @_locked_issue
+    def add_page(self, issue_name: str, chapter_index: int, title: str, content: str) -> Future:
         """Add a page to a chapter"""
-        # Load existing issue data
-        issue_data = self._load_issue_data(issue_name)
-        
-        if chapter_index >= len(issue_data.get('chapters', [])):
-            raise IndexError(f"Chapter {chapter_index + 1} not found")
+        document = self._editable_document(issue_name)
+        self._add_page(document, chapter_index, content, title)
+        return self.file_manager.write_document(issue_name, document, {'op': 'add-page', 'chapter_index': chapter_index,
+                                                                       'title': title})
+    
+    @_locked_issue
+    def update_page(self, issue_name: str, chapter_index: int, page_index: int, content: str) -> Future:
+        """Update a specific page"""
+        document = self._editable_document(issue_name)
+        self._update_page(document, chapter_index, page_index, content)
+        return self.file_manager.write_document(issue_name, document, {'op': 'update-page', 'chapter_index': chapter_index,
+                                                                       'page_index': page_index})
+    
+    @_locked_issue
+    def apply_batch(self, issue_name: str, operations: List[Dict[str, Any]]) -> Future:
+        """Apply an ordered list of edits to one issue and write it once.
         
-        chapter = issue_data['chapters'][chapter_index]
-        page_number = len(chapter.get('pages', [])) + 1
-        chapter_id = chapter.get('id', f'chapter-{chapter_index + 1}')
+        The edits are made on a copy of the cached document, so when an
+        operation fails, or the result has validation errors the issue did
+        not have before, nothing is written and the cache is left unchanged.
+        """
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("A batch needs a non-empty list of operations")
         
-        new_page = {
-            'id': f'page-{chapter_index + 1}-{page_number}',
-            'htmlContent': content
-        }
+        original = self.file_manager.read_document(issue_name)
+        document = original.copy()
+        for number, operation in enumerate(operations, 1):
+            try:
+                self._apply_operation(document, operation)
+            except Exception as e:
+                op = operation.get('op') if isinstance(operation, dict) else None
+                raise ValueError(f"Operation {number} ({op or 'invalid'}) failed, nothing was saved: {e}")
         
-        if 'pages' not in chapter:
-            chapter['pages'] = []
-        chapter['pages'].append(new_page)
+        quests = quest_files(self.file_manager.get_config_path(issue_name).parent)
+        before = set(check_issue(original.issue, quests)['errors'])
+        introduced = [error for error in check_issue(document.issue, quests)['errors'] if error not in before]
+        if introduced:
+            raise ValueError(f"Batch not saved, it would break the issue: {'; '.join(introduced)}")
         
-        # Save updated issue
-        self._save_issue_data(issue_name, issue_data)
+        ops = ', '.join(str(operation.get('op')) for operation in operations)
+        return self.file_manager.write_document(issue_name, document, {'op': 'batch', 'ops': ops})
     
-    def update_page(self, issue_name: str, chapter_index: int, page_index: int, content: str) -> None:
-        """Update a specific page"""
-        # Load existing issue data
-        issue_data = self._load_issue_data(issue_name)
+    def _apply_operation(self, document, operation: Dict[str, Any]) -> None:
+        """Run one batch operation against a document"""
+        if not isinstance(operation, dict):
+            raise ValueError("an operation must be an object with an 'op' field")
+        spec = BATCH_OPERATIONS.get(operation.get('op'))
+        if spec is None:
+            raise ValueError(f"unknown op {operation.get('op')!r}; expected one of {', '.join(BATCH_OPERATIONS)}")
+        method, required, optional = spec
+        missing = [field for field in required if field not in operation]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
         
-        if chapter_index >= len(issue_data.get('chapters', [])):
+        fields = {}
+        for field in required + optional:
+            if field in operation:
+                value = operation[field]
+                fields[field] = int(value) if field.endswith('_index') else value
+        getattr(self, method)(document, **fields)
+    
+    # Document edits, shared by the single-edit methods and apply_batch
+    
+    def _chapter(self, document, chapter_index: int) -> Dict[str, Any]:
+        chapters = document.issue.get('chapters', [])
+        if not 0 <= chapter_index < len(chapters):
             raise IndexError(f"Chapter {chapter_index + 1} not found")
-        
-        chapter = issue_data['chapters'][chapter_index]
-        if page_index >= len(chapter.get('pages', [])):
+        return chapters[chapter_index]
+    
+    def _check_page(self, document, chapter_index: int, page_index: int) -> None:
+        if not 0 <= page_index < len(self._chapter(document, chapter_index).get('pages', [])):
             raise IndexError(f"Page {page_index + 1} not found")
-        
-        # Update page content
-        chapter['pages'][page_index]['htmlContent'] = content
-        
-        # Save updated issue
-        self._save_issue_data(issue_name, issue_data)
     
-    def _load_issue_data(self, issue_name: str) -> Dict[str, Any]:
-        """Load issue data from the TypeScript file"""
-        config_path = self.file_manager.components_path / issue_name / "storyConfig.ts"
-        
-        if not config_path.exists():
-            raise FileNotFoundError(f"Issue '{issue_name}' not found")
+    def _add_chapter(self, document, title: str, description: str = "") -> None:
+        # Create new chapter (StoryChapter only has id, title and pages;
+        # the description goes into the opening page)
+        chapter_number = len(document.issue.get('chapters', [])) + 1
+        new_chapter = {
+            'id': f'chapter-{chapter_number}',
+            'title': title,
+            'pages': [
+                self._new_page(document, f'page-{chapter_number}-1',
+                               self._generate_default_page_content(title, description))
+            ]
+        }
         
-        content = config_path.read_text(encoding='utf-8')
+        # Splice the chapter into the file
+        document.insert_chapter(new_chapter)
+    
+    def _update_chapter(self, document, chapter_index: int, title: str) -> None:
+        self._chapter(document, chapter_index)
+        # Splice the new title into the file
+        document.set_chapter_field(chapter_index, 'title', title)
+    
+    def _move_chapter(self, document, chapter_index: int, to_index: int) -> None:
+        document.move_chapter(chapter_index, to_index)
+    
+    def _delete_chapter(self, document, chapter_index: int) -> None:
+        self._chapter(document, chapter_index)
+        # Cut the chapter out of the file
+        document.remove_chapter(chapter_index)
+    
+    def _add_page(self, document, chapter_index: int, content: str, title: str = "") -> None:
+        chapter = self._chapter(document, chapter_index)
+        page_number = len(chapter.get('pages', [])) + 1
         
-        # Parse the TypeScript content (simplified parser)
-        issue_data = {
-            'id': issue_name,
-            'chapters': []
-        }
+        new_page = self._new_page(document, f'page-{chapter_index + 1}-{page_number}', content)
         
-        # Extract chapters using regex (simplified approach)
-        chapter_pattern = r'{\s*id:\s*["\'](chapter-\d+)["\'],\s*title:\s*["\']([^"\']+)["\'],\s*pages:\s*\[(.*?)\]\s*}'
-        chapter_matches = re.findall(chapter_pattern, content, re.DOTALL)
+        # Splice the page into the chapter
+        document.insert_page(chapter_index, new_page)
+    
+    def _update_page(self, document, chapter_index: int, page_index: int, content: str) -> None:
+        self._check_page(document, chapter_index, page_index)
         
-        for match in chapter_matches:
-            chapter_id, title, pages_content = match
-            chapter = {
-                'id': chapter_id,
-                'title': title,
-                'pages': []
-            }
-            
-            # Extract pages from chapter
-            page_pattern = r'{\s*id:\s*["\'](page-\d+-\d+)["\'],\s*htmlContent:\s*`([^`]+)`'
-            page_matches = re.findall(page_pattern, pages_content, re.DOTALL)
-            
-            for page_match in page_matches:
-                page_id, html_content = page_match
-                page = {
-                    'id': page_id,
-                    'htmlContent': html_content
-                }
-                chapter['pages'].append(page)
-            
-            issue_data['chapters'].append(chapter)
+        if document.format == 'structured':
+            self._update_blocks(document, chapter_index, page_index, content)
+        else:
+            # Splice only this page's content into the file
+            document.set_page_field(chapter_index, page_index, 'htmlContent', content)
+    
+    def _move_page(self, document, chapter_index: int, page_index: int, to_index: int) -> None:
+        self._chapter(document, chapter_index)
+        document.move_page(chapter_index, page_index, to_index)
+    
+    def _delete_page(self, document, chapter_index: int, page_index: int) -> None:
+        self._check_page(document, chapter_index, page_index)
+        # Cut the page out of the file
+        document.remove_page(chapter_index, page_index)
+    
+    def _renumber(self, document) -> None:
+        """Give chapters and pages the chapter-N / page-N-M ids of their current position"""
+        for chapter_number, chapter in enumerate(document.issue['chapters'], 1):
+            if chapter.get('id') != f'chapter-{chapter_number}':
+                document.set_chapter_field(chapter_number - 1, 'id', f'chapter-{chapter_number}')
+            for page_number, page in enumerate(chapter.get('pages', []), 1):
+                if page.get('id') != f'page-{chapter_number}-{page_number}':
+                    document.set_page_field(chapter_number - 1, page_number - 1, 'id',
+                                            f'page-{chapter_number}-{page_number}')
+    
+    def _new_page(self, document, page_id: str, html: str) -> Dict[str, Any]:
+        """Build a page in the issue's format from HTML content"""
+        if document.format == 'structured':
+            return {'id': page_id, 'content': [text_block(html)]}
+        return {'id': page_id, 'htmlContent': html}
+    
+    def _update_blocks(self, document, chapter_index: int, page_index: int, content: str) -> None:
+        """Apply an edited JSON block list, rewriting only the blocks that changed"""
+        try:
+            blocks = json.loads(content)
+        except ValueError as e:
+            raise ValueError(f"Structured pages are edited as a JSON array of content blocks: {e}")
+        if not isinstance(blocks, list):
+            raise ValueError("Structured pages are edited as a JSON array of content blocks")
+        for block in blocks:
+            validate_block(block)
         
-        return issue_data
+        current = document.blocks(chapter_index, page_index)
+        if len(blocks) != len(current):
+            document.set_page_field(chapter_index, page_index, 'content', blocks)
+            return
+        for block_index, (old, new) in enumerate(zip(current, blocks)):
+            if old != new:
+                document.update_block(chapter_index, page_index, block_index, new)
     
-    def _save_issue_data(self, issue_name: str, issue_data: Dict[str, Any]) -> None:
-        """Save issue data to TypeScript file"""
-        capitalized_name = self._capitalize(issue_name)
-        content = self._generate_story_config_content_from_data(issue_data, capitalized_name)
-        self.file_manager.write_story_config(issue_name, content)
+    # Block edits (structured issues only)
+    
+    def _require_structured(self, document) -> None:
+        """Content block edits need the structured format"""
+        if document.format != 'structured':
+            raise ValueError(f"Issue '{document.issue_name}' uses HTML pages; "
+                             "content blocks need a simpleStoryConfig.ts issue")
+    
+    @_locked_issue
+    def insert_block(self, issue_name: str, chapter_index: int, page_index: int,
+                     block_index: int, block: Dict[str, Any]) -> Future:
+        """Insert a content block into a page"""
+        document = self._editable_document(issue_name)
+        self._insert_block(document, chapter_index, page_index, block_index, block)
+        return self.file_manager.write_document(issue_name, document, {'op': 'insert-block', 'chapter_index': chapter_index,
+                                                                       'page_index': page_index, 'block_index': block_index})
+    
+    @_locked_issue
+    def update_block(self, issue_name: str, chapter_index: int, page_index: int,
+                     block_index: int, block: Dict[str, Any]) -> Future:
+        """Replace one content block of a page"""
+        document = self._editable_document(issue_name)
+        self._update_block(document, chapter_index, page_index, block_index, block)
+        return self.file_manager.write_document(issue_name, document, {'op': 'update-block', 'chapter_index': chapter_index,
+                                                                       'page_index': page_index, 'block_index': block_index})
+    
+    @_locked_issue
+    def move_block(self, issue_name: str, chapter_index: int, page_index: int,
+                   block_index: int, to_index: int) -> Future:
+        """Move a content block to another position on its page"""
+        document = self._editable_document(issue_name)
+        self._move_block(document, chapter_index, page_index, block_index, to_index)
+        return self.file_manager.write_document(issue_name, document, {'op': 'move-block', 'chapter_index': chapter_index,
+                                                                       'page_index': page_index, 'block_index': block_index})
+    
+    @_locked_issue
+    def delete_block(self, issue_name: str, chapter_index: int, page_index: int, block_index: int) -> Future:
+        """Remove a content block from a page"""
+        document = self._editable_document(issue_name)
+        self._delete_block(document, chapter_index, page_index, block_index)
+        return self.file_manager.write_document(issue_name, document, {'op': 'delete-block', 'chapter_index': chapter_index,
+                                                                       'page_index': page_index, 'block_index': block_index})
+    
+    def _insert_block(self, document, chapter_index: int, page_index: int,
+                      block_index: int, block: Dict[str, Any]) -> None:
+        self._require_structured(document)
+        self._check_page(document, chapter_index, page_index)
+        document.insert_block(chapter_index, page_index, block_index, block)
+    
+    def _update_block(self, document, chapter_index: int, page_index: int,
+                      block_index: int, block: Dict[str, Any]) -> None:
+        self._require_structured(document)
+        self._check_page(document, chapter_index, page_index)
+        document.update_block(chapter_index, page_index, block_index, block)
+    
+    def _move_block(self, document, chapter_index: int, page_index: int, block_index: int, to_index: int) -> None:
+        self._require_structured(document)
+        self._check_page(document, chapter_index, page_index)
+        document.move_block(chapter_index, page_index, block_index, to_index)
+    
+    def _delete_block(self, document, chapter_index: int, page_index: int, block_index: int) -> None:
+        self._require_structured(document)
+        self._check_page(document, chapter_index, page_index)
+        document.remove_block(chapter_index, page_index, block_index)
     
     def _generate_story_config_content(self, issue_name: str, capitalized_name: str) -> str:
         """Generate basic story config content for new issue"""
@@ -170,39 +348,6 @@ export const story{capitalized_name}: StoryIssue = {{
 }};
 '''
     
-    def _generate_story_config_content_from_data(self, issue_data: Dict[str, Any], capitalized_name: str) -> str:
-        """Generate story config content from issue data"""
-        content = f'''import type {{ StoryIssue }} from '../../types/storyTypes';
-
-export const story{capitalized_name}: StoryIssue = {{
-  id: "{issue_data['id']}",
-  chapters: [
-'''
-        
-        for chapter in issue_data.get('chapters', []):
-            content += f'''    {{
-      id: "{chapter['id']}",
-      title: "{chapter['title']}",
-      pages: [
-'''
-            
-            for page in chapter.get('pages', []):
-                content += f'''        {{
-          id: "{page['id']}",
-          htmlContent: `{page['htmlContent']}`
-        }},
-'''
-            
-            content += '''      ]
-    },
-'''
-        
-        content += '''  ]
-};
-'''
-        
-        return content
-    
     def _generate_default_page_content(self, title: str, description: str) -> str:
         """Generate default HTML content for a new page"""
         return f'''<div class="mb-8 p-6 rounded-2xl bg-white/60 border border-blue-300/50 text-center">
@@ -215,76 +360,72 @@ export const story{capitalized_name}: StoryIssue = {{
         return ''.join(word.capitalize() for word in text.split('-'))
     
     
-    def update_chapter(self, issue_name: str, chapter_index: int, title: str) -> None:
+    @_locked_issue
+    def update_chapter(self, issue_name: str, chapter_index: int, title: str) -> Future:
         """Update an existing chapter"""
         try:
-            # Load current issue data
-            issue_data = self._load_issue_data(issue_name)
-            
-            if not issue_data or 'chapters' not in issue_data:
-                raise ValueError(f"Issue {issue_name} not found or has no chapters")
-            
-            chapters = issue_data['chapters']
-            if chapter_index >= len(chapters):
-                raise ValueError(f"Chapter index {chapter_index} out of range")
+            document = self._editable_document(issue_name)
             
-            # Update the chapter
-            chapters[chapter_index]['title'] = title
-            
-            # Save updated issue data (same as update_page method)
-            self._save_issue_data(issue_name, issue_data)
+            self._update_chapter(document, chapter_index, title)
+            return self.file_manager.write_document(issue_name, document, {'op': 'update-chapter',
+                                                                           'chapter_index': chapter_index, 'title': title})
             
         except Exception as e:
             raise Exception(f"Failed to update chapter: {str(e)}")
     
-    def delete_chapter(self, issue_name: str, chapter_index: int) -> None:
+    @_locked_issue
+    def delete_chapter(self, issue_name: str, chapter_index: int) -> Future:
         """Delete an existing chapter"""
         try:
-            # Load current issue data
-            issue_data = self._load_issue_data(issue_name)
-            
-            if not issue_data or 'chapters' not in issue_data:
-                raise ValueError(f"Issue {issue_name} not found or has no chapters")
-            
-            chapters = issue_data['chapters']
-            if chapter_index >= len(chapters):
-                raise ValueError(f"Chapter index {chapter_index} out of range")
+            document = self._editable_document(issue_name)
             
-            # Remove the chapter
-            chapters.pop(chapter_index)
-            
-            # Save updated issue data
-            self._save_issue_data(issue_name, issue_data)
+            self._delete_chapter(document, chapter_index)
+            return self.file_manager.write_document(issue_name, document, {'op': 'delete-chapter',
+                                                                           'chapter_index': chapter_index})
             
         except Exception as e:
             raise Exception(f"Failed to delete chapter: {str(e)}")
     
-    def delete_page(self, issue_name: str, chapter_index: int, page_index: int) -> None:
+    @_locked_issue
+    def delete_page(self, issue_name: str, chapter_index: int, page_index: int) -> Future:
         """Delete an existing page"""
         try:
-            # Load current issue data
-            issue_data = self._load_issue_data(issue_name)
-            
-            if not issue_data or 'chapters' not in issue_data:
-                raise ValueError(f"Issue {issue_name} not found or has no chapters")
-            
-            chapters = issue_data['chapters']
-            if chapter_index >= len(chapters):
-                raise ValueError(f"Chapter index {chapter_index} out of range")
-            
-            chapter = chapters[chapter_index]
-            if 'pages' not in chapter:
-                raise ValueError(f"Chapter {chapter_index} has no pages")
-            
-            pages = chapter['pages']
-            if page_index >= len(pages):
-                raise ValueError(f"Page index {page_index} out of range")
-            
-            # Remove the page
-            pages.pop(page_index)
+            document = self._editable_document(issue_name)
             
-            # Save updated issue data
-            self._save_issue_data(issue_name, issue_data)
+            self._delete_page(document, chapter_index, page_index)
+            return self.file_manager.write_document(issue_name, document, {'op': 'delete-page',
+                                                                           'chapter_index': chapter_index,
+                                                                           'page_index': page_index})
             
         except Exception as e:
-            raise Exception(f"Failed to delete page: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to delete page: {str(e)}")
+    
+    # History
+    
+    def history(self, issue_name: str, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Journaled edits of an issue, newest first, with where undo and redo would go"""
+        self.file_manager.read_document(issue_name)  # raises FileNotFoundError for unknown issues
+        return edit_journal.history(self.file_manager.get_config_path(issue_name), limit)
+    
+    @_locked_issue
+    def undo(self, issue_name: str) -> Future:
+        """Go back to the version before the last edit"""
+        # A hand edit of the file counts as the last edit, so it must be journaled before picking the target
+        self.file_manager.record_external_edit(issue_name)
+        return self._restore(issue_name, edit_journal.undo_target(self.file_manager.get_config_path(issue_name)), 'undo')
+    
+    @_locked_issue
+    def redo(self, issue_name: str) -> Future:
+        """Reapply the last undone edit"""
+        self.file_manager.record_external_edit(issue_name)
+        return self._restore(issue_name, edit_journal.redo_target(self.file_manager.get_config_path(issue_name)), 'redo')
+    
+    @_locked_issue
+    def restore(self, issue_name: str, seq: int) -> Future:
+        """Bring back the issue as it was after journal record seq (undoable like any edit)"""
+        return self._restore(issue_name, seq, 'restore')
+    
+    def _restore(self, issue_name: str, seq: int, op: str) -> Future:
+        document = self.file_manager.read_document(issue_name)
+        text = edit_journal.text_at(self.file_manager.get_config_path(issue_name), seq)
+        return self.file_manager.write_document(issue_name, type(document)(text, issue_name), {'op': op, 'to': seq})
@@ -0,0 +1,88 @@
+"""
+Story Index Generator for Lexicon Quest Story Manager
+Renders src/data/storyIndex.ts from a scan of the issue directories.
+"""
+
+import re
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+# import { storyIssue1 } from '../components/issue1/storyConfig';
+_STATIC_IMPORT = re.compile(r"^\s*import\s*\{[^}]*\}\s*from\s*['\"]\.\./components/([^/'\"]+)/(\w+)['\"]", re.MULTILINE)
+# "issue2": () => import('../components/issue2/storyConfig').then(...)
+_DYNAMIC_IMPORT = re.compile(r"^(?!\s*//).*?\bimport\(\s*['\"]\.\./components/([^/'\"]+)/(\w+)['\"]\s*\)",
+                             re.MULTILINE)
+_NUMBER = re.compile(r'(\d+)')
+
+HEADER = """// Central index for all story configurations
+// Generated by story-manager from the issues in src/components - do not edit by hand.
+// Regenerate with: python3 story-manager/story_cli.py index
+"""
+
+
+class IndexEntry(NamedTuple):
+    """One issue in storyIndex.ts"""
+    issue: str
+    module: str       # config module without .ts, e.g. 'simpleStoryConfig'
+    export: str       # exported story object, e.g. 'simpleStoryIssue1'
+    lazy: bool        # loaded with a dynamic import() so it gets its own chunk
+
+
+def natural_key(name: str) -> List:
+    """Sort key that puts issue2 before issue10"""
+    return [int(part) if part.isdigit() else part for part in _NUMBER.split(name)]
+
+
+def indexed_modules(content: str) -> Dict[str, str]:
+    """Map issue names to the config module storyIndex.ts imports for them"""
+    modules = dict(_DYNAMIC_IMPORT.findall(content))
+    modules.update(_STATIC_IMPORT.findall(content))
+    return modules
+
+
+def lazy_issues(content: str) -> Set[str]:
+    """Issues that an existing storyIndex.ts loads with a dynamic import()"""
+    return {issue for issue, _ in _DYNAMIC_IMPORT.findall(content)}
+
+
+def render_story_index(entries: Iterable[IndexEntry]) -> str:
+    """Render storyIndex.ts; the output depends only on the entries, sorted by issue name.
+
+    Eager issues are imported statically and listed in ``storyIssues``.
+    Lazy issues are only reachable through ``storyIssueLoaders`` (or
+    ``loadStoryIssue``), which every issue has, so bundlers split them out.
+    """
+    entries = sorted(entries, key=lambda entry: natural_key(entry.issue))
+    eager = [entry for entry in entries if not entry.lazy]
+    path = "'../components/{0.issue}/{0.module}'".format
+
+    lines = [HEADER]
+    for entry in eager:
+        lines.append(f"import {{ {entry.export} }} from {path(entry)};")
+    if eager:
+        lines.append("")
+
+    lines.append("// Export all eagerly loaded story issues as an object with string keys")
+    lines.append("export const storyIssues: { [key: string]: any } = {")
+    lines += [f'  "{entry.issue}": {entry.export},' for entry in eager]
+    lines.append("};")
+    lines.append("")
+
+    lines.append("// Load any issue by id; lazy issues are fetched as separate chunks")
+    lines.append("export const storyIssueLoaders: { [key: string]: () => Promise<any> } = {")
+    for entry in entries:
+        if entry.lazy:
+            lines.append(f'  "{entry.issue}": () => import({path(entry)}).then((module) => module.{entry.export}),')
+        else:
+            lines.append(f'  "{entry.issue}": () => Promise.resolve({entry.export}),')
+    lines.append("};")
+    lines.append("")
+    lines.append("export function loadStoryIssue(issueId: string): Promise<any> {")
+    lines.append("  const load = storyIssueLoaders[issueId];")
+    lines.append("  return load ? load() : Promise.resolve(undefined);")
+    lines.append("}")
+
+    if eager:
+        lines.append("")
+        lines.append("// Export individual issues for direct access")
+        lines.append(f"export {{ {', '.join(entry.export for entry in eager)} }};")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,434 @@
+"""
+Story Config Parser for Lexicon Quest
+Single-pass tokenizer for the TypeScript object-literal subset used by
+storyConfig.ts and simpleStoryConfig.ts files.
+"""
+
+import re
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+Span = Tuple[int, int]
+
+_WHITESPACE = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)*', re.DOTALL)
+_IDENTIFIER = re.compile(r'[A-Za-z_$][\w$]*')
+_NUMBER = re.compile(r'-?(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)')
+_DOUBLE_QUOTED = re.compile(r'"((?:[^"\\\n]|\\.)*)"', re.DOTALL)
+_SINGLE_QUOTED = re.compile(r"'((?:[^'\\\n]|\\.)*)'", re.DOTALL)
+_TEMPLATE_SPECIAL = re.compile(r'[`\\]|\$\{')
+_EXPRESSION_SPECIAL = re.compile(r'[{}`"\'/]')
+_EXPORT = re.compile(r'export\s+const\s+([A-Za-z_$][\w$]*)\s*(?::\s*([A-Za-z_$][\w$.]*))?\s*=\s*')
+_ESCAPE = re.compile(r'\\(u\{[0-9a-fA-F]+\}|u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|\r\n|.)', re.DOTALL)
+
+_SIMPLE_ESCAPES = {
+    'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0',
+    '\n': '', '\r\n': '',
+}
+
+_KEYWORDS = {'true': True, 'false': False, 'null': None, 'undefined': None}
+
+
+class StoryParseError(ValueError):
+    """Raised when a story config falls outside the supported subset"""
+
+    def __init__(self, message: str, text: str, pos: int):
+        self.pos = pos
+        self.line = text.count('\n', 0, pos) + 1
+        self.column = pos - (text.rfind('\n', 0, pos) + 1) + 1
+        super().__init__(f"{message} at line {self.line}, column {self.column}")
+
+
+class StoryEvent(NamedTuple):
+    """A chapter, page or issue emitted while scanning a story config.
+
+    ``start``/``end`` are character offsets of the object literal and
+    ``spans`` maps each key to the offsets of its value literal.
+    """
+    kind: str
+    chapter_index: int
+    page_index: int
+    data: Dict[str, Any]
+    start: int
+    end: int
+    spans: Dict[str, Span]
+
+
+def _unescape(raw: str) -> str:
+    """Decode the escape sequences of a quoted string literal"""
+    if '\\' not in raw:
+        return raw
+
+    def replace(match: 're.Match[str]') -> str:
+        escape = match.group(1)
+        if escape in _SIMPLE_ESCAPES:
+            return _SIMPLE_ESCAPES[escape]
+        if escape.startswith('u{'):
+            return chr(int(escape[2:-1], 16))
+        if escape[0] in 'ux' and len(escape) > 1:
+            return chr(int(escape[1:], 16))
+        return escape
+
+    return _ESCAPE.sub(replace, raw)
+
+
+class StoryConfigParser:
+    """Streaming parser for the object literal exported by a story config.
+
+    Every token is consumed exactly once, so parsing is linear in the file
+    size. Quoted strings are decoded; template literals are returned as their
+    raw source between the backticks (including any ``${...}`` expressions),
+    which is what the generator writes back out.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.export_name: Optional[str] = None
+        self.type_name: Optional[str] = None
+        self.export_start = 0
+
+    def events(self) -> Iterator[StoryEvent]:
+        """Yield page, chapter and issue events in source order"""
+        match = _EXPORT.search(self.text)
+        if not match:
+            raise StoryParseError("No 'export const' story object found", self.text, 0)
+
+        self.export_name = match.group(1)
+        self.type_name = match.group(2)
+        self.export_start = match.start()
+        self.pos = match.end()
+        self._expect('{')
+        yield from self._walk_issue(self.pos - 1)
+
+    def chapter_events(self, pos: int, chapter_index: int) -> Iterator[StoryEvent]:
+        """Yield the page and chapter events of the chapter literal at pos"""
+        self.pos = pos
+        self._expect('{')
+        yield from self._walk_chapter(chapter_index, pos)
+
+    def page_event(self, pos: int, chapter_index: int, page_index: int) -> StoryEvent:
+        """Parse the page literal at pos"""
+        self.pos = pos
+        spans: Dict[str, Span] = {}
+        page = self._object(spans)
+        return StoryEvent('page', chapter_index, page_index, page, pos, self.pos, spans)
+
+    def element_spans(self, pos: int) -> List[Span]:
+        """Return the offsets of each element of the array literal at pos"""
+        self.pos = pos
+        spans: List[Span] = []
+        for _ in self._elements():
+            start = self.pos
+            self._value()
+            spans.append((start, self.pos))
+        return spans
+
+    # Structure walkers
+
+    def _walk_issue(self, start: int) -> Iterator[StoryEvent]:
+        fields: Dict[str, Any] = {}
+        spans: Dict[str, Span] = {}
+
+        for key in self._keys():
+            value_start = self.pos
+            if key == 'chapters':
+                yield from self._walk_chapters()
+            else:
+                fields[key] = self._value()
+            spans[key] = (value_start, self.pos)
+
+        yield StoryEvent('issue', -1, -1, fields, start, self.pos, spans)
+
+    def _walk_chapters(self) -> Iterator[StoryEvent]:
+        chapter_index = 0
+        for _ in self._elements():
+            start = self.pos
+            self._expect('{')
+            yield from self._walk_chapter(chapter_index, start)
+            chapter_index += 1
+
+    def _walk_chapter(self, chapter_index: int, start: int) -> Iterator[StoryEvent]:
+        fields: Dict[str, Any] = {}
+        spans: Dict[str, Span] = {}
+
+        for key in self._keys():
+            value_start = self.pos
+            if key == 'pages':
+                yield from self._walk_pages(chapter_index)
+            else:
+                fields[key] = self._value()
+            spans[key] = (value_start, self.pos)
+
+        yield StoryEvent('chapter', chapter_index, -1, fields, start, self.pos, spans)
+
+    def _walk_pages(self, chapter_index: int) -> Iterator[StoryEvent]:
+        page_index = 0
+        for _ in self._elements():
+            yield self.page_event(self.pos, chapter_index, page_index)
+            page_index += 1
+
+    # Generic literal parsing
+
+    def _keys(self) -> Iterator[str]:
+        """Yield each key of the object whose '{' was just consumed.
+
+        The caller must consume the value before resuming the generator.
+        """
+        text = self.text
+        while True:
+            self._skip_whitespace()
+            if self._peek() == '}':
+                self.pos += 1
+                return
+
+            key = self._key()
+            self._skip_whitespace()
+            self._expect(':')
+            self._skip_whitespace()
+            yield key
+
+            self._skip_whitespace()
+            char = self._peek()
+            if char == ',':
+                self.pos += 1
+            elif char != '}':
+                raise StoryParseError("Expected ',' or '}' after value", text, self.pos)
+
+    def _elements(self) -> Iterator[None]:
+        """Yield once per element of an array; the caller consumes each element"""
+        self._skip_whitespace()
+        self._expect('[')
+        while True:
+            self._skip_whitespace()
+            if self._peek() == ']':
+                self.pos += 1
+                return
+
+            yield None
+
+            self._skip_whitespace()
+            char = self._peek()
+            if char == ',':
+                self.pos += 1
+            elif char != ']':
+                raise StoryParseError("Expected ',' or ']' after element", self.text, self.pos)
+
+    def _key(self) -> str:
+        char = self._peek()
+        if char in ('"', "'"):
+            return self._string()
+        match = _IDENTIFIER.match(self.text, self.pos)
+        if not match:
+            raise StoryParseError("Expected property name", self.text, self.pos)
+        self.pos = match.end()
+        return match.group()
+
+    def _value(self) -> Any:
+        self._skip_whitespace()
+        char = self._peek()
+
+        if char == '{':
+            return self._object()
+        if char == '[':
+            return self._array()
+        if char in ('"', "'"):
+            return self._string()
+        if char == '`':
+            return self._template()
+
+        match = _NUMBER.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            literal = match.group()
+            if literal.lstrip('-')[:2].lower() == '0x':
+                return int(literal, 16)
+            if any(c in literal for c in '.eE'):
+                return float(literal)
+            return int(literal)
+
+        match = _IDENTIFIER.match(self.text, self.pos)
+        if match and match.group() in _KEYWORDS:
+            self.pos = match.end()
+            return _KEYWORDS[match.group()]
+
+        raise StoryParseError("Unsupported expression", self.text, self.pos)
+
+    def _object(self, spans: Optional[Dict[str, Span]] = None) -> Dict[str, Any]:
+        self._skip_whitespace()
+        self._expect('{')
+        result: Dict[str, Any] = {}
+        for key in self._keys():
+            value_start = self.pos
+            result[key] = self._value()
+            if spans is not None:
+                spans[key] = (value_start, self.pos)
+        return result
+
+    def _array(self) -> List[Any]:
+        result = []
+        for _ in self._elements():
+            result.append(self._value())
+        return result
+
+    def _string(self) -> str:
+        pattern = _DOUBLE_QUOTED if self._peek() == '"' else _SINGLE_QUOTED
+        match = pattern.match(self.text, self.pos)
+        if not match:
+            raise StoryParseError("Unterminated string literal", self.text, self.pos)
+        self.pos = match.end()
+        return _unescape(match.group(1))
+
+    def _template(self) -> str:
+        start = self.pos + 1
+        self.pos = self._skip_template(self.pos)
+        return self.text[start:self.pos - 1]
+
+    def _skip_template(self, pos: int) -> int:
+        """Return the offset just past the template literal starting at pos"""
+        text = self.text
+        i = pos + 1
+        while True:
+            match = _TEMPLATE_SPECIAL.search(text, i)
+            if not match:
+                raise StoryParseError("Unterminated template literal", text, pos)
+            token = match.group()
+            if token == '`':
+                return match.end()
+            if token == '\\':
+                i = match.end() + 1
+            else:
+                i = self._skip_expression(match.end())
+
+    def _skip_expression(self, pos: int) -> int:
+        """Return the offset just past the '}' closing a ${...} expression"""
+        text = self.text
+        depth = 0
+        i = pos
+        while True:
+            match = _EXPRESSION_SPECIAL.search(text, i)
+            if not match:
+                raise StoryParseError("Unterminated template expression", text, pos)
+            token = match.group()
+            i = match.end()
+            if token == '{':
+                depth += 1
+            elif token == '}':
+                if depth == 0:
+                    return i
+                depth -= 1
+            elif token == '`':
+                i = self._skip_template(match.start())
+            elif token in ('"', "'"):
+                pattern = _DOUBLE_QUOTED if token == '"' else _SINGLE_QUOTED
+                string_match = pattern.match(text, match.start())
+                if not string_match:
+                    raise StoryParseError("Unterminated string literal", text, match.start())
+                i = string_match.end()
+            elif text.startswith('//', match.start()) or text.startswith('/*', match.start()):
+                i = _WHITESPACE.match(text, match.start()).end()
+
+    # Low-level helpers
+
+    def _skip_whitespace(self) -> None:
+        self.pos = _WHITESPACE.match(self.text, self.pos).end()
+
+    def _peek(self) -> str:
+        if self.pos >= len(self.text):
+            raise StoryParseError("Unexpected end of file", self.text, self.pos)
+        return self.text[self.pos]
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise StoryParseError(f"Expected '{char}'", self.text, self.pos)
+        self.pos += 1
+
+
+def skip_whitespace(text: str, pos: int) -> int:
+    """Return the first offset at or after pos that is not whitespace or a comment"""
+    return _WHITESPACE.match(text, pos).end()
+
+
+def template_end(text: str, pos: int) -> int:
+    """Return the offset just past the template literal starting at pos"""
+    return StoryConfigParser(text)._skip_template(pos)
+
+
+def cook_template(raw: str) -> str:
+    """Return the string value of raw template source.
+
+    ``${...}`` expressions are evaluated when they are string or template
+    literals (as in the configs the generator writes); anything else raises
+    ValueError.
+    """
+    if '${' not in raw:
+        return _unescape(raw)
+    text = f'`{raw}`'
+    value, end = _cook_template(text, 0)
+    if end != len(text):
+        raise ValueError("Template literal ends early; it contains an unescaped backtick")
+    return value
+
+
+def _cook_template(text: str, pos: int) -> Tuple[str, int]:
+    """Evaluate the template literal starting at pos; return its value and the offset past it"""
+    parts = []
+    i = start = pos + 1
+    while True:
+        match = _TEMPLATE_SPECIAL.search(text, i)
+        if not match:
+            raise StoryParseError("Unterminated template literal", text, pos)
+        token = match.group()
+        if token == '\\':
+            i = match.end() + 1
+            continue
+        parts.append(_unescape(text[start:match.start()]))
+        if token == '`':
+            return ''.join(parts), match.end()
+
+        i = skip_whitespace(text, match.end())
+        quote = text[i:i + 1]
+        if quote == '`':
+            value, i = _cook_template(text, i)
+        elif quote in ('"', "'"):
+            string_match = (_DOUBLE_QUOTED if quote == '"' else _SINGLE_QUOTED).match(text, i)
+            if not string_match:
+                raise StoryParseError("Unterminated string literal", text, i)
+            value, i = _unescape(string_match.group(1)), string_match.end()
+        else:
+            raise ValueError("Template literal contains a ${...} expression that cannot be evaluated")
+        i = skip_whitespace(text, i)
+        if text[i:i + 1] != '}':
+            raise ValueError("Template literal contains a ${...} expression that cannot be evaluated")
+        parts.append(value)
+        i = start = i + 1
+
+
+def find_export_name(text: str) -> Optional[str]:
+    """Return the name of the story object a config exports, if any"""
+    match = _EXPORT.search(text)
+    return match.group(1) if match else None
+
+
+def iter_story_events(text: str) -> Iterator[StoryEvent]:
+    """Stream the pages, chapters and issue fields of a story config"""
+    return StoryConfigParser(text).events()
+
+
+def parse_story_config(text: str, issue_name: Optional[str] = None) -> Dict[str, Any]:
+    """Parse a story config into the issue/chapters/pages dictionary model"""
+    issue: Dict[str, Any] = {'id': issue_name}
+    chapters: List[Dict[str, Any]] = []
+    pages: List[Dict[str, Any]] = []
+
+    for event in iter_story_events(text):
+        if event.kind == 'page':
+            pages.append(event.data)
+        elif event.kind == 'chapter':
+            chapter = dict(event.data)
+            chapter['pages'] = pages
+            chapters.append(chapter)
+            pages = []
+        else:
+            issue.update(event.data)
+
+    issue['chapters'] = chapters
+    return issue
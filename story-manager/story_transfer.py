@@ -0,0 +1,261 @@
+"""
+Story Transfer for Lexicon Quest Story Manager
+Streams issues to and from NDJSON, one record per chapter, page or content block.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Union
+
+from block_renderer import render_blocks
+from file_manager import CONFIG_FILE
+from story_document import DEFAULT_HEADER, StoryDocument, render_story_config
+from story_generator import StoryGenerator
+from structured_document import SIMPLE_CONFIG_FILE, StructuredStoryDocument, text_block, validate_block
+from write_pipeline import write_pipeline
+
+# Bump when the record layout changes
+TRANSFER_VERSION = 1
+FORMATS = ('html', 'structured')
+STRUCTURED_HEADER = "import type { SimpleStoryIssue } from '../../types/storyContentTypes';\n\n"
+
+# Keys that describe a record rather than hold model fields
+RECORD_KEYS = frozenset({'record', 'version', 'issue', 'format', 'chapter', 'page', 'block'})
+_ISSUE_NAME = re.compile(r'[A-Za-z0-9][A-Za-z0-9_-]*')
+
+
+def convert_page(page: Dict[str, Any], target: str) -> Dict[str, Any]:
+    """Return a page in the target format.
+
+    HTML pages become a single text block; structured pages are rendered to
+    the HTML the reader would show for their blocks.
+    """
+    if target == 'structured' and 'content' not in page and 'htmlContent' in page:
+        return {('content' if key == 'htmlContent' else key): ([text_block(value)] if key == 'htmlContent' else value)
+                for key, value in page.items()}
+    if target == 'html' and 'htmlContent' not in page and 'content' in page:
+        return {('htmlContent' if key == 'content' else key): (render_blocks(value) if key == 'content' else value)
+                for key, value in page.items()}
+    return page
+
+
+def _fields(model: Dict[str, Any], *skip: str) -> Dict[str, Any]:
+    return {key: value for key, value in model.items() if key not in skip and key not in RECORD_KEYS}
+
+
+class _IssueBuilder:
+    """Collects the records of one issue into an issue model"""
+
+    def __init__(self, record: Dict[str, Any], line: int):
+        self.name = record.get('issue')
+        if not isinstance(self.name, str) or not _ISSUE_NAME.fullmatch(self.name):
+            raise ValueError(f"Line {line}: invalid issue name {self.name!r}")
+        self.format = record.get('format', 'html')
+        if self.format not in FORMATS:
+            raise ValueError(f"Line {line}: unknown format {self.format!r}; expected one of {', '.join(FORMATS)}")
+        self.fields = _fields(record)
+        self.chapters: List[Dict[str, Any]] = []
+        self.pages = 0
+        self.blocks = 0
+
+    def add(self, kind: Any, record: Dict[str, Any], line: int) -> None:
+        if kind == 'chapter':
+            chapter = _fields(record, 'pages')
+            chapter['pages'] = []
+            self.chapters.append(chapter)
+        elif kind == 'page':
+            if not self.chapters:
+                raise ValueError(f"Line {line}: page record before the first chapter of '{self.name}'")
+            page = _fields(record)
+            if self.format == 'structured' and 'htmlContent' not in page:
+                page.setdefault('content', [])
+            self.chapters[-1]['pages'].append(page)
+            self.pages += 1
+        elif kind == 'block':
+            pages = self.chapters[-1]['pages'] if self.chapters else []
+            if not pages or 'content' not in pages[-1]:
+                raise ValueError(f"Line {line}: block record without a structured page to add it to")
+            try:
+                pages[-1]['content'].append(validate_block(_fields(record)))
+            except ValueError as e:
+                raise ValueError(f"Line {line}: {e}")
+            self.blocks += 1
+        else:
+            raise ValueError(f"Line {line}: unknown record {kind!r}")
+
+    def issue(self, target: str, issue_id: str) -> Dict[str, Any]:
+        """The issue model, with every page converted to the target format.
+
+        The exported ``id`` names the issue it came from, so the issue gets
+        issue_id, the id of the issue it is imported into, instead.
+        """
+        issue = dict(self.fields)
+        issue['id'] = issue_id
+        issue['chapters'] = [
+            dict(chapter, pages=[convert_page(page, target) for page in chapter['pages']])
+            for chapter in self.chapters
+        ]
+        return issue
+
+
+class StoryTransfer:
+    """Exports issues as NDJSON and imports them back.
+
+    The stream has one ``issue`` record per issue, followed by its
+    ``chapter`` records, each followed by its ``page`` records; pages of
+    structured issues are followed by one ``block`` record per content
+    block. Values are kept as they appear in the config source, so an
+    export imports back unchanged.
+
+    Both directions hold at most one issue in memory. An import writes
+    each issue once, after its last record, through the write pipeline;
+    a bad record stops the import before its issue is written.
+    """
+
+    def __init__(self, story_generator: Optional[StoryGenerator] = None):
+        self.story_generator = story_generator or StoryGenerator()
+        self.file_manager = self.story_generator.file_manager
+
+    # Export
+
+    def issue_names(self) -> List[str]:
+        """Issues with a config file, in storyIndex.ts order"""
+        return [entry.issue for entry in self.file_manager.story_index_entries()]
+
+    def check_export(self, issue_names: Optional[List[str]] = None, format: Optional[str] = None) -> List[str]:
+        """Validate export arguments up front (before a response starts streaming); returns the issues"""
+        if format is not None and format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}; expected one of {', '.join(FORMATS)}")
+        names = issue_names or self.issue_names()
+        for issue_name in names:
+            if not self.file_manager.get_config_path(issue_name).exists():
+                raise FileNotFoundError(f"Issue '{issue_name}' not found")
+        return names
+
+    def export_records(self, issue_names: Optional[List[str]] = None,
+                       format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the records of the given issues (default: all), optionally converted to one format"""
+        for issue_name in self.check_export(issue_names, format):
+            document = self.file_manager.read_document(issue_name)
+            target = format or document.format
+            yield {'record': 'issue', 'version': TRANSFER_VERSION, 'issue': issue_name, 'format': target,
+                   **_fields(document.issue, 'chapters')}
+            for chapter_index, chapter in enumerate(document.issue['chapters']):
+                yield {'record': 'chapter', 'issue': issue_name, 'chapter': chapter_index, **_fields(chapter, 'pages')}
+                for page_index, page in enumerate(chapter.get('pages', [])):
+                    page = convert_page(page, target)
+                    location = {'issue': issue_name, 'chapter': chapter_index, 'page': page_index}
+                    yield {'record': 'page', **location, **_fields(page, 'content')}
+                    for block_index, block in enumerate(page.get('content', [])):
+                        yield {'record': 'block', **location, 'block': block_index, **_fields(block)}
+
+    def export_lines(self, issue_names: Optional[List[str]] = None, format: Optional[str] = None) -> Iterator[str]:
+        """Yield the export as NDJSON lines"""
+        for record in self.export_records(issue_names, format):
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+
+    def export(self, output: TextIO, issue_names: Optional[List[str]] = None,
+               format: Optional[str] = None) -> int:
+        """Write an NDJSON export to a text stream; returns the number of records"""
+        count = 0
+        for line in self.export_lines(issue_names, format):
+            output.write(line)
+            count += 1
+        return count
+
+    # Import
+
+    def import_lines(self, lines: Iterable[Union[str, bytes]], format: Optional[str] = None,
+                     dry_run: bool = False) -> List[Dict[str, Any]]:
+        """Import NDJSON lines; returns one report per issue.
+
+        Existing issues have their chapters replaced and keep their config
+        file (pages are converted to its format); new issues are created in
+        ``format``, or the format named by their issue record.
+        """
+        if format is not None and format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}; expected one of {', '.join(FORMATS)}")
+        reports: List[Dict[str, Any]] = []
+        writes = []
+        builder: Optional[_IssueBuilder] = None
+        try:
+            for number, line in enumerate(lines, 1):
+                if isinstance(line, bytes):
+                    line = line.decode('utf-8')
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"Line {number}: not a JSON record ({e})")
+                kind = record.get('record') if isinstance(record, dict) else None
+                if kind == 'issue':
+                    if builder is not None:
+                        reports.append(self._import_issue(builder, format, dry_run, writes))
+                    builder = _IssueBuilder(record, number)
+                elif builder is None:
+                    raise ValueError(f"Line {number}: expected an issue record first")
+                else:
+                    builder.add(kind, record, number)
+            if builder is not None:
+                reports.append(self._import_issue(builder, format, dry_run, writes))
+        except BaseException as e:
+            # Still save the issues imported before the failure, but report the failure itself
+            try:
+                self._settle(reports, writes)
+            except Exception:
+                pass
+            if isinstance(e, ValueError) and reports:
+                done = ', '.join(report['issue'] for report in reports)
+                raise ValueError(f"{e} (already imported: {done})")
+            raise
+        self._settle(reports, writes)
+        return reports
+
+    def _import_issue(self, builder: _IssueBuilder, format: Optional[str], dry_run: bool,
+                      writes: List) -> Dict[str, Any]:
+        """Render one collected issue and queue its single write"""
+        issue_name = builder.name
+        with self.story_generator.issue_lock(issue_name):
+            config_path = self.file_manager.get_config_path(issue_name)
+            exists = config_path.exists()
+            if exists:
+                document = self.file_manager.read_document(issue_name)
+                if format is not None and format != document.format:
+                    raise ValueError(f"Issue '{issue_name}' already exists in the {document.format} format; "
+                                     f"import it under a new name to convert it")
+                target = document.format
+                issue = builder.issue(target, document.issue.get('id') or issue_name)
+                text = render_story_config(issue, document.export_name, document.type_name,
+                                           document.header, document.trailer)
+            else:
+                target = format or builder.format
+                capitalized = self.story_generator._capitalize(issue_name)
+                if target == 'structured':
+                    config_path = config_path.with_name(SIMPLE_CONFIG_FILE)
+                    text = render_story_config(builder.issue(target, issue_name), f'simpleStory{capitalized}',
+                                               'SimpleStoryIssue', STRUCTURED_HEADER)
+                else:
+                    config_path = config_path.with_name(CONFIG_FILE)
+                    text = render_story_config(builder.issue(target, issue_name), f'story{capitalized}',
+                                               'StoryIssue', DEFAULT_HEADER)
+
+            report = {'issue': issue_name, 'format': target, 'created': not exists, 'chapters': len(builder.chapters),
+                      'pages': builder.pages, 'blocks': builder.blocks, 'bytes': len(text.encode('utf-8'))}
+            if dry_run:
+                return report
+            if not exists:
+                self.file_manager.create_issue_directory(issue_name)
+            document_class = StructuredStoryDocument if target == 'structured' else StoryDocument
+            # Journaled, cached and announced like any other edit
+            future = self.file_manager.write_document(issue_name, document_class(text, issue_name), {'op': 'import'})
+            writes.append((config_path, future))
+        return report
+
+    def _settle(self, reports: List[Dict[str, Any]], writes: List) -> None:
+        """Write the imported issues now, then index the new ones"""
+        write_pipeline.flush(path for path, _ in writes)
+        for _, future in writes:
+            future.result()
+        if any(report['created'] for report in reports) and writes:
+            self.file_manager.update_story_index()
@@ -0,0 +1,156 @@
+"""
+Structured Story Document for Lexicon Quest Story Manager
+Block-level editing of simpleStoryConfig.ts files, whose pages are lists of
+typed StoryContent blocks instead of raw HTML.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from story_document import StoryDocument, format_value
+from story_parser import Span, StoryConfigParser
+
+SIMPLE_CONFIG_FILE = 'simpleStoryConfig.ts'
+
+# StoryContent['type'] in src/types/storyContentTypes.ts
+BLOCK_TYPES = ('chapter-header', 'text', 'two-column', 'three-column', 'quest-button', 'info-box', 'image')
+
+
+def validate_block(block: Any) -> Dict[str, Any]:
+    """Check that a value is a StoryContent block and return it"""
+    if not isinstance(block, dict):
+        raise ValueError("A content block must be an object with 'type' and 'data'")
+    if block.get('type') not in BLOCK_TYPES:
+        raise ValueError(f"Unknown block type {block.get('type')!r}; expected one of {', '.join(BLOCK_TYPES)}")
+    if not isinstance(block.get('data'), dict):
+        raise ValueError(f"A '{block['type']}' block needs a 'data' object")
+    return block
+
+
+def text_block(html: str) -> Dict[str, Any]:
+    """Wrap HTML in a 'text' block"""
+    return {'type': 'text', 'data': {'content': html}}
+
+
+class StructuredStoryDocument(StoryDocument):
+    """A simpleStoryConfig.ts document with block-level edits.
+
+    Blocks are located by scanning only the edited page's ``content`` array,
+    and each edit splices just the affected block literals, so the rest of
+    the page (and file) keeps its original formatting.
+    """
+
+    format = 'structured'
+
+    def outline(self) -> Dict[str, Any]:
+        """Chapter and page outline, with the block types of every page"""
+        outline = super().outline()
+        for chapter_outline, chapter in zip(outline['chapters'], self.issue['chapters']):
+            for page_outline, page in zip(chapter_outline['pages'], chapter['pages']):
+                page_outline['blocks'] = [block.get('type') for block in page.get('content', [])]
+        return outline
+
+    def blocks(self, chapter_index: int, page_index: int) -> List[Dict[str, Any]]:
+        """Return the content blocks of a page"""
+        return self.page(chapter_index, page_index).get('content', [])
+
+    # Block edits
+
+    def insert_block(self, chapter_index: int, page_index: int, block_index: int, block: Dict[str, Any]) -> None:
+        """Insert a block before block_index (or append when it equals the block count)"""
+        validate_block(block)
+        blocks = list(self.blocks(chapter_index, page_index))
+        if not 0 <= block_index <= len(blocks):
+            raise IndexError(f"Block {block_index + 1} not found")
+        blocks.insert(block_index, block)
+
+        array, spans = self._block_spans(chapter_index, page_index)
+        if array is None:
+            self.set_page_field(chapter_index, page_index, 'content', blocks)
+            return
+
+        indent = self._block_indent(array, spans)
+        literal = format_value(block, indent)
+        self._set_blocks(chapter_index, page_index, blocks)
+        self._insert_block_literal(array, spans, block_index, literal, indent)
+
+    def update_block(self, chapter_index: int, page_index: int, block_index: int, block: Dict[str, Any]) -> None:
+        """Replace one block"""
+        validate_block(block)
+        blocks = list(self.blocks(chapter_index, page_index))
+        if not 0 <= block_index < len(blocks):
+            raise IndexError(f"Block {block_index + 1} not found")
+        blocks[block_index] = block
+
+        array, spans = self._block_spans(chapter_index, page_index)
+        if array is None:
+            self.set_page_field(chapter_index, page_index, 'content', blocks)
+            return
+
+        start, end = spans[block_index]
+        literal = format_value(block, self._line_indent(start))
+        self._set_blocks(chapter_index, page_index, blocks)
+        self._splice(start, end, literal)
+
+    def move_block(self, chapter_index: int, page_index: int, block_index: int, to_index: int) -> None:
+        """Move a block so that it ends up at to_index, keeping its source text"""
+        blocks = list(self.blocks(chapter_index, page_index))
+        if not 0 <= block_index < len(blocks):
+            raise IndexError(f"Block {block_index + 1} not found")
+        if not 0 <= to_index < len(blocks):
+            raise IndexError(f"Block position {to_index + 1} is out of range")
+        if block_index == to_index:
+            return
+        blocks.insert(to_index, blocks.pop(block_index))
+
+        array, spans = self._block_spans(chapter_index, page_index)
+        if array is None:
+            self.set_page_field(chapter_index, page_index, 'content', blocks)
+            return
+
+        self._set_blocks(chapter_index, page_index, blocks)
+        start, end = spans[block_index]
+        literal = self.text[start:end]
+        indent = self._line_indent(start)
+        self._remove_span(start, end)
+
+        array, spans = self._block_spans(chapter_index, page_index)
+        self._insert_block_literal(array, spans, to_index, literal, indent)
+
+    def remove_block(self, chapter_index: int, page_index: int, block_index: int) -> None:
+        """Remove one block"""
+        blocks = list(self.blocks(chapter_index, page_index))
+        if not 0 <= block_index < len(blocks):
+            raise IndexError(f"Block {block_index + 1} not found")
+        blocks.pop(block_index)
+
+        array, spans = self._block_spans(chapter_index, page_index)
+        if array is None:
+            self.set_page_field(chapter_index, page_index, 'content', blocks)
+            return
+
+        self._set_blocks(chapter_index, page_index, blocks)
+        self._remove_span(*spans[block_index])
+
+    # Helpers
+
+    def _set_blocks(self, chapter_index: int, page_index: int, blocks: List[Dict[str, Any]]) -> None:
+        page = dict(self.issue['chapters'][chapter_index]['pages'][page_index])
+        page['content'] = blocks
+        self._replace_page(chapter_index, page_index, page)
+
+    def _block_spans(self, chapter_index: int, page_index: int):
+        """Return the page's content array span and the span of each block in it"""
+        array: Optional[Span] = self._span((chapter_index, page_index), 'content')
+        if array is None or self.text[array[0]] != '[':
+            return None, []
+        return array, StoryConfigParser(self.text).element_spans(array[0])
+
+    def _block_indent(self, array: Span, spans: List[Span]) -> int:
+        return self._line_indent(spans[0][0]) if spans else self._line_indent(array[0]) + 2
+
+    def _insert_block_literal(self, array: Span, spans: List[Span], index: int, literal: str, indent: int) -> None:
+        if index < len(spans):
+            at = spans[index][0]
+            self._splice(at, at, f"{literal},\n{' ' * indent}")
+        else:
+            self._insert_element(array, spans[-1] if spans else None, None, literal)
@@ -0,0 +1,21 @@
+// Compiles a stylesheet read from stdin with the site's own PostCSS pipeline
+// (postcss.config.js: Tailwind and autoprefixer), for content_styles.py.
+//
+//   node story-manager/tailwind_styles.mjs <path the stylesheet stands in for> < input.css > output.css
+import { readFileSync } from 'node:fs'
+import path from 'node:path'
+import { fileURLToPath, pathToFileURL } from 'node:url'
+import postcss from 'postcss'
+
+const projectRoot = path.resolve(path.dirname(fileURLToPath(import.meta.url)), '..')
+const from = path.resolve(process.argv[2] ?? path.join(projectRoot, 'src', 'index.css'))
+
+const { default: config } = await import(pathToFileURL(path.join(projectRoot, 'postcss.config.js')).href)
+const plugins = []
+for (const [name, options] of Object.entries(config.plugins ?? {})) {
+  const { default: plugin } = await import(name)
+  plugins.push(plugin(options))
+}
+
+const result = await postcss(plugins).process(readFileSync(0, 'utf8'), { from })
+process.stdout.write(result.css)
@@ -0,0 +1,52 @@
+"""
+Test fixtures for Lexicon Quest Story Manager
+Runs the story manager against a throwaway copy of the website tree.
+"""
+
+import http.client
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import file_manager  # noqa: E402
+from edit_journal import edit_journal  # noqa: E402
+from web_gui import BoundedThreadingHTTPServer, WebGUI  # noqa: E402
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """An empty website tree that FileManager, and so every builder, works in"""
+    (tmp_path / 'src' / 'components').mkdir(parents=True)
+    (tmp_path / 'src' / 'data').mkdir()
+    monkeypatch.setattr(file_manager, '__file__', str(tmp_path / 'story-manager' / 'file_manager.py'))
+    monkeypatch.setattr(edit_journal, 'root', tmp_path / 'src' / 'data' / 'storyJournal')
+    monkeypatch.setattr(edit_journal, '_journals', {})
+    return tmp_path
+
+
+@pytest.fixture
+def server(project):
+    """The web GUI serving the project on a free port; yields request(method, path, body, headers)"""
+    gui = WebGUI(port=0, workers=4, watch=False)
+    httpd = BoundedThreadingHTTPServer(('127.0.0.1', 0), gui.create_handler(), gui.workers)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    def request(method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=10)
+        try:
+            connection.request(method, path, body, headers or {})
+            response = connection.getresponse()
+            return response.status, response.headers, response.read()
+        finally:
+            connection.close()
+
+    request.gui = gui
+    yield request
+    httpd.shutdown()
+    httpd.server_close()
+    gui.file_manager.flush()
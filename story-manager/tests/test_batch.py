@@ -0,0 +1,63 @@
+import pytest
+
+from story_generator import StoryGenerator
+
+
+@pytest.fixture
+def generator(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.file_manager.flush()
+    return generator
+
+
+def test_batch_writes_once(generator):
+    config_path = generator.file_manager.get_config_path('issue1')
+    generator.apply_batch('issue1', [
+        {'op': 'add-page', 'chapter_index': 0, 'content': '<p>Two</p>'},
+        {'op': 'add-chapter', 'title': 'Second'},
+        {'op': 'move-page', 'chapter_index': 0, 'page_index': 1, 'to_index': 0},
+    ]).result()
+
+    issue = generator.file_manager.read_issue('issue1')
+    assert [chapter['title'] for chapter in issue['chapters']] == ['Chapter 1', 'Second']
+    assert issue['chapters'][0]['pages'][0]['htmlContent'] == '<p>Two</p>'
+    assert '<p>Two</p>' in config_path.read_text()
+    records = generator.history('issue1')['records']
+    assert [record['op'] for record in records] == ['batch', 'create-issue']
+    assert records[0]['ops'] == 'add-page, add-chapter, move-page'
+
+
+def test_failed_operation_saves_nothing(generator):
+    config_path = generator.file_manager.get_config_path('issue1')
+    text = config_path.read_text()
+    original = generator.file_manager.read_document('issue1')
+
+    with pytest.raises(ValueError, match=r'Operation 2 \(delete-page\) failed, nothing was saved'):
+        generator.apply_batch('issue1', [
+            {'op': 'update-page', 'chapter_index': 0, 'page_index': 0, 'content': '<p>Changed</p>'},
+            {'op': 'delete-page', 'chapter_index': 0, 'page_index': 5},
+        ])
+    with pytest.raises(ValueError, match='unknown op'):
+        generator.apply_batch('issue1', [{'op': 'explode'}])
+
+    assert generator.file_manager.read_document('issue1') is original
+    assert original.issue['chapters'][0]['pages'][0]['htmlContent'] != '<p>Changed</p>'
+    assert config_path.read_text() == text
+
+
+def test_batch_may_not_introduce_errors(generator):
+    quest_page = '<button data-quest-id="9">Go</button>'
+    with pytest.raises(ValueError, match='no Quest9.tsx'):
+        generator.apply_batch('issue1', [{'op': 'add-page', 'chapter_index': 0, 'content': quest_page}])
+
+    # Errors the issue already had don't block unrelated edits...
+    generator.add_page('issue1', 0, 'Quest', quest_page).result()
+    generator.apply_batch('issue1', [{'op': 'add-page', 'chapter_index': 0, 'content': '<p>Fine</p>'}]).result()
+    # ...but fixing one error doesn't pay for a new one
+    with pytest.raises(ValueError, match='no Quest8.tsx'):
+        generator.apply_batch('issue1', [
+            {'op': 'update-page', 'chapter_index': 0, 'page_index': 1, 'content': '<p>Fixed</p>'},
+            {'op': 'update-page', 'chapter_index': 0, 'page_index': 2,
+             'content': '<button data-quest-id="8">Go</button>'},
+        ])
@@ -0,0 +1,95 @@
+import pytest
+
+from block_converter import BlockConverter, convert_html
+from story_generator import StoryGenerator
+
+HEADING = 'text-2xl font-bold text-yellow-600 mb-4 font-gagalin'
+
+
+def blocks(source):
+    converted, kept = convert_html(source)
+    assert kept == 0
+    return converted
+
+
+def test_text_and_chapter_header():
+    assert blocks(f'<div class="p-6 rounded-2xl text-left bg-white">\n  <h3 class="{HEADING}">Title</h3>\n'
+                  f'  <p>Hello <b>you</b></p>\n</div>') == [
+        {'type': 'text', 'data': {'heading': 'Title', 'level': 3, 'content': '<p>Hello <b>you</b></p>',
+                                  'className': 'bg-white'}},
+    ]
+    assert blocks('<div style="background-image: url(\'/img/bg.jpg\')" class="text-white">'
+                  '<h2>Chapter One</h2><h2>The Start</h2></div>') == [
+        {'type': 'chapter-header', 'data': {'backgroundImage': '/img/bg.jpg', 'title': 'Chapter One',
+                                            'subtitle': 'The Start', 'textColor': 'text-white'}},
+    ]
+
+
+def test_columns_images_and_buttons():
+    assert blocks('<div class="grid md:grid-cols-2 gap-4"><div><img src="/a.png" alt="A" class="max-w-full rounded-lg">'
+                  '</div><div><p>Right side</p></div></div>') == [
+        {'type': 'two-column', 'data': {'left': {'type': 'image', 'content': '/a.png', 'alt': 'A'},
+                                        'right': {'type': 'text', 'content': '<p>Right side</p>'}}},
+    ]
+    assert blocks('<figure><img src="/x.png" alt="X"><p>Caption</p></figure>') == [
+        {'type': 'image', 'data': {'src': '/x.png', 'alt': 'X', 'caption': 'Caption'}},
+    ]
+    # A quest button at the end of a box becomes a block of its own
+    assert blocks('<div class="p-6 rounded-2xl bg-blue-100"><h3>Note</h3><p>Info here</p>'
+                  '<div class="text-center"><button data-quest-id="2" class="px-4">Go</button></div></div>') == [
+        {'type': 'info-box', 'data': {'title': 'Note', 'content': '<p>Info here</p>'}},
+        {'type': 'quest-button', 'data': {'buttonText': 'Go', 'questId': 2, 'className': 'px-4'}},
+    ]
+
+
+def test_unmatched_markup_is_kept_as_html():
+    source = 'Loose <span>text</span>\n<table><tr><td>Cell</td></tr></table>\n<div class="p-6"><p>Box</p></div>'
+    converted, kept = convert_html(source)
+    raw = 'Loose <span>text</span><table><tr><td>Cell</td></tr></table>'
+    assert converted == [{'type': 'text', 'data': {'content': raw}},
+                         {'type': 'text', 'data': {'content': '<p>Box</p>'}}]
+    assert kept == len(raw)
+
+    # Template expressions only work as written
+    source = '<div class="p-6">\n  <p>${name} says hi</p>\n</div>'
+    assert convert_html(source) == ([{'type': 'text', 'data': {'content': source}}], len(source))
+
+
+@pytest.fixture
+def generator(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.add_page('issue1', 0, 'Quest', '<div class="text-center"><button data-quest-id="1">Go</button></div>'
+                                             '<table><tr><td>Raw</td></tr></table>').result()
+    generator.file_manager.flush()
+    return generator
+
+
+def test_convert_issue(generator):
+    file_manager = generator.file_manager
+    html_config = file_manager.get_config_path('issue1')
+    html_text = html_config.read_text(encoding='utf-8')
+
+    [report] = BlockConverter(file_manager).convert(dry_run=True)
+    assert not report['written'] and not (html_config.parent / 'simpleStoryConfig.ts').exists()
+
+    [report] = BlockConverter(file_manager).convert()
+    # The starter page is a template expression, so it stays HTML too
+    assert report['written'] and report['pages'] == 2 and report['rawPages'] == 2
+    assert report['blocks']['quest-button'] == 1 and 0 < report['coverage'] < 1
+    # storyIndex.ts points at the new file; the HTML config is left alone
+    assert file_manager.get_config_path('issue1').name == 'simpleStoryConfig.ts'
+    assert html_config.read_text(encoding='utf-8') == html_text
+    document = file_manager.read_document('issue1')
+    assert document.format == 'structured'
+    assert document.issue['chapters'][0]['pages'][1]['content'] == [
+        {'type': 'quest-button', 'data': {'buttonText': 'Go', 'questId': 1}},
+        {'type': 'text', 'data': {'content': '<table><tr><td>Raw</td></tr></table>'}},
+    ]
+
+    # An issue already converted is only reported unless forced
+    [report] = BlockConverter(file_manager).convert()
+    assert not report['written']
+    assert BlockConverter(file_manager).convert(force=True)[0]['written']
+    with pytest.raises(FileNotFoundError):
+        BlockConverter(file_manager).convert(['missing'])
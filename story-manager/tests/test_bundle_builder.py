@@ -0,0 +1,49 @@
+import json
+
+from bundle_builder import BundleBuilder
+from story_generator import StoryGenerator
+
+
+def test_build_generated_issue(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.add_page('issue1', 0, 'Second', '<p>Plain page</p>').result()
+    generator.file_manager.flush()
+
+    report = BundleBuilder(generator.file_manager, workers=1).build()
+
+    assert report['issues']['issue1']['compiled'] == 1
+    manifest = json.loads((project / 'public' / 'issues' / 'manifest.json').read_text())
+    chapter_url = manifest['issues']['issue1']['chapters'][0]['url']
+    chapter = json.loads((project / 'public' / chapter_url.lstrip('/')).read_text())
+    first, second = [page['htmlContent'] for page in chapter['pages']]
+    # The generator's `${`...`}` wrapper is evaluated, not shipped as source
+    assert first.startswith('<div') and 'Welcome to issue1' in first and '${' not in first
+    assert second == '<p>Plain page</p>'
+
+
+def test_version_bump_prunes_old_bundles(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.create_issue('issue2')
+    generator.file_manager.flush()
+    builder = BundleBuilder(generator.file_manager, workers=1)
+    builder.build()
+
+    # State written by an older bundle format, naming a file the new format no longer produces
+    old_file = project / 'public' / 'issues' / 'issue1' / 'chapter-1.0ld0ld0ld0.json'
+    old_file.write_text('{}')
+    state = json.loads(builder.state_path.read_text())
+    state['version'] -= 1
+    state['issues']['issue1']['chapters'].append({'source': 'old', 'file': old_file.name})
+    builder.state_path.write_text(json.dumps(state))
+
+    report = builder.build(['issue1'])
+
+    assert not old_file.exists() and str(old_file) in report['removed']
+    # The old manifest is discarded too, so a partial build still rebuilds every issue
+    assert sorted(report['issues']) == ['issue1', 'issue2']
+    manifest = json.loads((project / 'public' / 'issues' / 'manifest.json').read_text())
+    for issue_name in ('issue1', 'issue2'):
+        chapter_url = manifest['issues'][issue_name]['chapters'][0]['url']
+        assert (project / 'public' / chapter_url.lstrip('/')).exists()
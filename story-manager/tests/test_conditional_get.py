@@ -0,0 +1,44 @@
+def test_issue_etag_and_last_modified(server):
+    generator = server.gui.story_generator
+    generator.create_issue('issue1')
+    generator.file_manager.flush()
+
+    status, headers, body = server('GET', '/api/issue/issue1')
+    assert status == 200 and body
+    etag, last_modified = headers['ETag'], headers['Last-Modified']
+    assert headers['Cache-Control'] == 'no-cache'
+
+    status, headers, body = server('GET', '/api/issue/issue1', headers={'If-None-Match': etag})
+    assert (status, headers['ETag'], body) == (304, etag, b'')
+    # Weak comparison and lists of tags, as browsers send them
+    status, _, _ = server('GET', '/api/issue/issue1', headers={'If-None-Match': f'"other", W/{etag}'})
+    assert status == 304
+    status, _, _ = server('GET', '/api/issue/issue1', headers={'If-Modified-Since': last_modified})
+    assert status == 304
+
+    generator.add_page('issue1', 0, 'Second', '<p>Plain page</p>').result()
+    generator.file_manager.flush()
+    status, headers, body = server('GET', '/api/issue/issue1', headers={'If-None-Match': etag})
+    assert status == 200 and headers['ETag'] != etag and b'Plain page' in body
+
+
+def test_issue_list_etag_follows_content(server):
+    generator = server.gui.story_generator
+    generator.create_issue('issue1')
+    generator.file_manager.flush()
+
+    status, headers, _ = server('GET', '/api/issues?limit=1')
+    assert status == 200 and headers['X-Total-Count'] == '1'
+    etag = headers['ETag']
+    assert server('GET', '/api/issues?limit=1', headers={'If-None-Match': etag})[0] == 304
+
+    generator.create_issue('issue2')
+    generator.file_manager.flush()
+    # The first page's entries are unchanged, but its total is not
+    status, headers, _ = server('GET', '/api/issues?limit=1', headers={'If-None-Match': etag})
+    assert status == 200 and headers['X-Total-Count'] == '2'
+
+
+def test_missing_issue_is_not_cached(server):
+    status, headers, body = server('GET', '/api/issue/nope', headers={'If-None-Match': '*'})
+    assert status == 400 and 'ETag' not in headers and b'error' in body
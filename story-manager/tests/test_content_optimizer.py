@@ -0,0 +1,81 @@
+import hashlib
+import re
+
+import pytest
+
+from content_optimizer import SOURCE_HASH_PREFIX, ContentOptimizer, hoist_fragments, minify_html
+from search_index import html_text
+from story_generator import StoryGenerator
+
+
+@pytest.fixture
+def generator(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    for index in range(3):
+        generator.add_page('issue1', 0, f'Page {index}', f'''
+            <div class="space-y-4 text-lg leading-relaxed">
+                <!-- narration -->
+                <p class="text-gray-800   font-serif">Page   {index} <b>bold</b> text</p>
+            </div>''')
+    generator.file_manager.flush()
+    return generator
+
+
+def test_minify_html():
+    source = '<div class="a   b">\n  <!-- note -->\n  <p>Hello   <b>there</b> friend</p>\n  <br />\n</div>'
+    assert minify_html(source) == '<div class="a b"><p>Hello <b>there</b> friend</p><br/></div>'
+    # Whitespace next to inline elements renders, so a single space stays
+    assert minify_html('<span>a</span>\n  <span>b</span>') == '<span>a</span> <span>b</span>'
+    assert minify_html('<p class="inline">a</p>\n<p class="inline">b</p>') == \
+        '<p class="inline">a</p> <p class="inline">b</p>'
+    # Content where whitespace may matter is left alone
+    for source in ('<pre>  a\n  b</pre>', '<p style="white-space: pre">a  b</p>', '<p>${name}  here</p>'):
+        assert minify_html(source) == source
+
+
+def test_hoist_fragments():
+    tag = '<p class="text-lg leading-relaxed mb-4">'
+    texts, fragments = hoist_fragments([f'{tag}One</p>', f'{tag}Two</p>', f'{tag}Three</p>', '<p>Four</p>'])
+    assert fragments == [('f1', tag, 3)]
+    assert texts == ['${f1}One</p>', '${f1}Two</p>', '${f1}Three</p>', '<p>Four</p>']
+    # Names already used by the config are skipped; a fragment seen once is not worth a constant
+    assert hoist_fragments([f'{tag}a', f'{tag}b', f'{tag}c'], reserved='const f1 = 1')[1][0][0] == 'f2'
+    assert hoist_fragments([f'{tag}a'])[1] == []
+
+
+def test_optimize_writes_a_copy_marked_with_its_source(generator):
+    optimizer = ContentOptimizer(generator.file_manager)
+    config_path = generator.file_manager.get_config_path('issue1')
+    [report] = optimizer.optimize()
+    path = optimizer.optimized_path('issue1')
+    assert report['changed'] and path.name == 'storyConfig.optimized.ts' and path.parent == config_path.parent
+    assert report['optimizedBytes'] < report['minifiedBytes'] < report['bytes']
+    assert report['fragments'] and report['values'] == 4
+
+    text = path.read_text(encoding='utf-8')
+    source_hash = hashlib.sha256(config_path.read_bytes()).hexdigest()
+    # The header line vite.config.ts compares with the config
+    assert re.search(rf'^// {SOURCE_HASH_PREFIX}([0-9a-f]{{64}})$', text, re.M).group(1) == source_hash
+    assert 'narration' not in text and '${f1}' in text
+
+    # Rendering the copy back gives the same visible text as the config
+    copy = generator.file_manager.read_document('issue1').__class__(text, 'issue1')
+    for chapter, original in zip(copy.issue['chapters'], generator.file_manager.read_issue('issue1')['chapters']):
+        for page, expected in zip(chapter['pages'], original['pages']):
+            constants = dict(re.findall(r'^const (f\d+) = "(.*)";$', text, re.M))
+            html = re.sub(r'\$\{(f\d+)\}', lambda match: constants[match.group(1)].replace('\\"', '"'),
+                          page['htmlContent'])
+            assert html_text(html) == html_text(expected['htmlContent'])
+
+    assert not optimizer.optimize()[0]['changed']
+    generator.update_page('issue1', 0, 1, '<p>Changed</p>').result()
+    generator.file_manager.flush()
+    assert optimizer.optimize()[0]['changed']
+    assert hashlib.sha256(config_path.read_bytes()).hexdigest() in path.read_text(encoding='utf-8')
+
+
+def test_dry_run_writes_nothing(generator):
+    optimizer = ContentOptimizer(generator.file_manager)
+    [report] = optimizer.optimize(write=False)
+    assert report['optimizedBytes'] < report['bytes'] and not optimizer.optimized_path('issue1').exists()
@@ -0,0 +1,77 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+import content_styles
+from content_styles import ContentStyles, build_css, extract_classes, tailwind_input
+from story_generator import StoryGenerator
+
+SITE_ROOT = Path(__file__).parent.parent.parent
+
+
+@pytest.fixture
+def generator(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.add_page('issue1', 0, 'Second', '<p class="text-pink-600 font-bold">Two</p>').result()
+    generator.file_manager.flush()
+    return generator
+
+
+def test_extract_classes():
+    html = '<div class="a  b"><span className=\'c\'>x</span><i class="{{icon}} d"></i></div>'
+    assert extract_classes(html) == {'a', 'b', 'c', 'd'}
+
+
+def test_tailwind_input():
+    css = tailwind_input('@import "tailwindcss";\n.banner { color: red; }', ['b', 'a', 'w-[10px]', 'a'])
+    assert css == '@import "tailwindcss" source(none);\n.banner { color: red; }\n@source inline("a b w-[10px]");\n'
+    # A stylesheet without the Tailwind import still gets one
+    assert tailwind_input('', ['a"b']).startswith('@import "tailwindcss" source(none);\n')
+    assert '@source inline("a\\"b");' in tailwind_input('', ['a"b'])
+
+
+def test_build_css_with_the_site_tailwind():
+    if shutil.which('node') is None:
+        pytest.skip("Node.js is not installed")
+    if not (SITE_ROOT / 'node_modules' / '@tailwindcss' / 'postcss').is_dir():
+        pytest.skip("the site's npm packages are not installed (run npm install)")
+
+    css = build_css(['text-pink-600'], SITE_ROOT / 'src' / 'index.css')
+    assert '.text-pink-600' in css
+    # Only the listed classes are generated
+    assert '.text-pink-700' not in css and '.bg-red-500' not in css
+
+
+def test_build_keeps_the_previous_stylesheet_when_tailwind_fails(generator, monkeypatch):
+    compiled = []
+
+    def fake_build_css(classes, site_stylesheet):
+        compiled.append(list(classes))
+        return f"/* {' '.join(classes)} */"
+
+    monkeypatch.setattr(content_styles, 'build_css', fake_build_css)
+    styles = ContentStyles(generator.file_manager)
+    report = styles.build()
+    assert report['changed'] and report['error'] is None
+    assert 'text-pink-600' in compiled[0] and 'font-bold' in compiled[0]
+    first = report['file']
+    assert report['url'] == f'/issues/{first}' and styles.stylesheet(first).is_file()
+    # Nothing changed, nothing compiled
+    assert not styles.build()['changed'] and len(compiled) == 1
+
+    def failing_build_css(classes, site_stylesheet):
+        raise RuntimeError("Tailwind failed (run npm install): Cannot find package 'postcss'")
+
+    monkeypatch.setattr(content_styles, 'build_css', failing_build_css)
+    generator.update_page('issue1', 0, 1, '<p class="text-sky-500">Two</p>').result()
+    report = styles.build()
+    assert report['error'].startswith('Tailwind failed') and report['file'] == first and styles.url() == report['url']
+
+    # A failed class set isn't compiled again until it changes, or the build is forced
+    assert styles.build()['error'] and len(compiled) == 1
+    monkeypatch.setattr(content_styles, 'build_css', fake_build_css)
+    report = styles.build(force=True, prune=True)
+    assert report['file'] != first and report['error'] is None
+    assert report['pruned'] == [str(styles.output_path / first)] and styles.stylesheet(first) is None
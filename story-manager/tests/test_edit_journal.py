@@ -0,0 +1,87 @@
+import os
+import time
+
+import pytest
+
+from edit_journal import edit_journal
+from story_generator import StoryGenerator
+
+
+def page_text(generator):
+    return generator.file_manager.read_page('issue1', 0, 0)['htmlContent']
+
+
+def test_undo_after_external_edit(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.update_page('issue1', 0, 0, '<p>A</p>').result()
+    generator.update_page('issue1', 0, 0, '<p>B</p>').result()
+    generator.file_manager.flush()
+
+    config_path = generator.file_manager.get_config_path('issue1')
+    config_path.write_text(config_path.read_text().replace('<p>B</p>', '<p>Edited by hand</p>'))
+
+    # The hand edit is the last change, so undo goes back to B
+    generator.undo('issue1').result()
+    assert page_text(generator) == '<p>B</p>'
+    history = generator.history('issue1')
+    assert [record['op'] for record in history['records']] == \
+        ['undo', 'external', 'update-page', 'update-page', 'create-issue']
+    assert (history['head'], history['undo'], history['redo']) == (3, 2, 4)
+
+    generator.undo('issue1').result()
+    assert page_text(generator) == '<p>A</p>'
+    generator.redo('issue1').result()
+    assert page_text(generator) == '<p>B</p>'
+    generator.redo('issue1').result()
+    assert page_text(generator) == '<p>Edited by hand</p>'
+    assert generator.history('issue1')['redo'] is None
+
+
+def test_failed_write_is_compensated(project, monkeypatch):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.update_page('issue1', 0, 0, '<p>A</p>').result()
+
+    def fail(source, target):
+        raise OSError('disk full')
+    with monkeypatch.context() as patch:
+        patch.setattr(os, 'replace', fail)
+        with pytest.raises(OSError):
+            generator.update_page('issue1', 0, 0, '<p>Lost</p>').result()
+    # The journal is settled once the write's callbacks have run
+    deadline = time.monotonic() + 5
+    while generator.history('issue1')['records'][0]['op'] != 'write-failed' and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    history = generator.history('issue1')
+    assert [record['op'] for record in history['records']] == ['write-failed', 'update-page', 'update-page',
+                                                              'create-issue']
+    assert (history['head'], history['undo'], history['redo']) == (4, 1, None)
+    assert page_text(generator) == '<p>A</p>'
+    # Undo skips the version that never landed
+    generator.undo('issue1').result()
+    assert '<p>A</p>' not in generator.file_manager.get_config_path('issue1').read_text()
+
+
+def test_undo_after_compaction(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    for text in ('<p>A</p>', '<p>B</p>', '<p>C</p>'):
+        generator.update_page('issue1', 0, 0, text).result()
+    generator.undo('issue1').result()
+    generator.undo('issue1').result()
+    config_path = generator.file_manager.get_config_path('issue1')
+    # The kept undo records went back to versions compaction drops
+    assert edit_journal.compact(config_path, 2) > 0
+
+    history = generator.history('issue1')
+    seqs = [record['seq'] for record in history['records']]
+    assert seqs == [6, 5] and (history['head'], history['undo'], history['redo']) == (6, 5, None)
+    assert page_text(generator) == '<p>A</p>'
+    generator.undo('issue1').result()
+    assert page_text(generator) == '<p>B</p>'
+    generator.redo('issue1').result()
+    assert page_text(generator) == '<p>A</p>'
+    with pytest.raises(ValueError, match='Nothing to redo'):
+        generator.redo('issue1')
@@ -0,0 +1,73 @@
+import gzip
+
+import pytest
+
+import http_compression
+from http_compression import CompressionCache, encoded_etag, is_compressible, negotiate_encoding, strip_encoding
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    """Negotiate as if brotli and zstd were not installed"""
+    monkeypatch.setattr(http_compression, 'ENCODERS', {'gzip': http_compression.ENCODERS['gzip']})
+
+
+def test_negotiate_encoding(gzip_only):
+    assert negotiate_encoding('gzip, deflate, br') == 'gzip'
+    assert negotiate_encoding('GZIP;q=0.5') == 'gzip'
+    assert negotiate_encoding('*') == 'gzip'
+    assert negotiate_encoding('gzip;q=0') is None
+    assert negotiate_encoding('*;q=1, gzip;q=0') is None
+    assert negotiate_encoding('gzip;q=bogus') is None
+    assert negotiate_encoding('identity') is None
+    assert negotiate_encoding('') is None
+    assert negotiate_encoding(None) is None
+
+
+def test_negotiate_prefers_the_highest_weight(monkeypatch):
+    monkeypatch.setattr(http_compression, 'ENCODERS', {'gzip': bytes, 'br': bytes})
+    assert negotiate_encoding('gzip, br') == 'br'
+    assert negotiate_encoding('gzip;q=1, br;q=0.5') == 'gzip'
+
+
+def test_encoded_etags(gzip_only):
+    assert encoded_etag('"issue-1"', 'gzip') == '"issue-1-gzip"'
+    assert strip_encoding('"issue-1-gzip"') == '"issue-1"'
+    assert strip_encoding('"issue-1"') == '"issue-1"'
+
+
+def test_is_compressible():
+    assert is_compressible('application/json', 4096)
+    assert is_compressible('text/html; charset=utf-8', 4096)
+    assert not is_compressible('application/json', 10)
+    assert not is_compressible('image/png', 4096)
+
+
+def test_cache_reuses_compressed_bodies():
+    cache = CompressionCache(max_bytes=1024 * 1024)
+    body = b'{"pages": []}' * 200
+    first = cache.compress(body, 'gzip', '"a"')
+    assert cache.compress(b'ignored: the ETag names the body', 'gzip', '"a"') is first
+    assert gzip.decompress(first) == body
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_gzip_response(server, gzip_only):
+    generator = server.gui.story_generator
+    generator.create_issue('issue1')
+    generator.add_page('issue1', 0, 'Long', '<p>Once upon a time.</p>' * 100).result()
+    generator.file_manager.flush()
+
+    _, headers, identity = server('GET', '/api/issue/issue1')
+    assert len(identity) >= http_compression.MIN_COMPRESS_SIZE and 'Content-Encoding' not in headers
+    etag = headers['ETag']
+
+    status, headers, body = server('GET', '/api/issue/issue1', headers={'Accept-Encoding': 'gzip'})
+    assert status == 200 and headers['Content-Encoding'] == 'gzip' and headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(body) == identity
+    assert headers['ETag'] == encoded_etag(etag, 'gzip')
+
+    # Either variant's ETag revalidates, and the 304 names the one the client holds
+    status, headers, _ = server('GET', '/api/issue/issue1',
+                                headers={'Accept-Encoding': 'gzip', 'If-None-Match': encoded_etag(etag, 'gzip')})
+    assert (status, headers['ETag']) == (304, encoded_etag(etag, 'gzip'))
@@ -0,0 +1,40 @@
+import os
+import re
+
+import pytest
+
+from image_pipeline import ImagePipeline
+from story_generator import StoryGenerator
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def write_image(path):
+    """A noisy PNG, which WebP variants always beat"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.frombytes('RGB', (1200, 300), os.urandom(1200 * 300 * 3)).save(path)
+
+
+def test_rewrite_srcset_twice(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.add_page('issue1', 0, 'Map', '<img src="/issues/issue1/map.png" alt="Map" class="w-full">').result()
+    image = project / 'public' / 'issues' / 'issue1' / 'map.png'
+    write_image(image)
+
+    pipeline = ImagePipeline(generator.file_manager)
+    pipeline.optimize()
+    assert pipeline.rewrite(srcset=True) == {'issue1': 1}
+    assert pipeline.rewrite(srcset=True) == {'issue1': 0}
+    # A changed image gets new variants, so the second run rewrites the tag again
+    write_image(image)
+    os.utime(image, ns=(1, 1))
+    pipeline.optimize()
+    # The src and the srcset it already has
+    assert pipeline.rewrite(srcset=True) == {'issue1': 2}
+
+    page = generator.file_manager.read_page('issue1', 0, 1)['htmlContent']
+    assert len(re.findall(r'\bsrcset=', page)) == 1
+    latest = pipeline._load_cache()['/issues/issue1/map.png']['variants']
+    assert f'src="{latest[-1]["url"]}"' in page
+    assert all(variant['url'] in page for variant in latest)
@@ -0,0 +1,74 @@
+from issue_cache import IssueCache
+
+
+def loader(calls):
+    def load(text):
+        calls.append(text)
+        return {'text': text}
+    return load
+
+
+def test_hit_until_file_changes(tmp_path):
+    path = tmp_path / 'storyConfig.ts'
+    path.write_text('one')
+    cache = IssueCache()
+    calls = []
+
+    first = cache.get(path, loader(calls))
+    assert cache.get(path, loader(calls)) is first
+    path.write_text('three')
+    assert cache.get(path, loader(calls)) == {'text': 'three'}
+    assert calls == ['one', 'three']
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = IssueCache(max_bytes=10)
+    paths = []
+    for name in 'abc':
+        path = tmp_path / name
+        path.write_text('x' * 4)
+        paths.append(path)
+    calls = []
+    cache.get(paths[0], loader(calls))
+    cache.get(paths[1], loader(calls))
+    cache.get(paths[0], loader(calls))
+    cache.get(paths[2], loader(calls))
+
+    # b was least recently used, so it made room for c
+    assert cache.cached_stamp(paths[1]) is None
+    assert cache.cached_stamp(paths[0]) is not None and cache.cached_stamp(paths[2]) is not None
+    assert cache.evictions == 1
+
+
+def test_dirty_values_are_pinned(tmp_path):
+    path = tmp_path / 'storyConfig.ts'
+    path.write_text('on disk')
+    cache = IssueCache(max_bytes=10)
+    edited = {'text': 'edited'}
+
+    stamp = cache.put_dirty(path, edited, 6)
+    assert cache.is_dirty(path)
+    # Served without looking at the file, and a value read from disk doesn't replace it
+    assert cache.get(path, loader([])) is edited
+    cache.put(path, {'text': 'on disk'})
+    assert cache.get(path, loader([])) is edited
+    other = tmp_path / 'other'
+    other.write_text('x' * 8)
+    cache.get(other, loader([]))
+    assert cache.is_dirty(path)
+
+    path.write_text('edited')
+    cache.settle_dirty(path, stamp, written=True)
+    assert not cache.is_dirty(path)
+    assert cache.get(path, loader([])) is edited
+
+
+def test_failed_write_drops_dirty_value(tmp_path):
+    path = tmp_path / 'storyConfig.ts'
+    path.write_text('on disk')
+    cache = IssueCache()
+    stamp = cache.put_dirty(path, {'text': 'edited'}, 6)
+
+    cache.settle_dirty(path, stamp, written=False)
+    assert cache.get(path, loader([])) == {'text': 'on disk'}
@@ -0,0 +1,66 @@
+import os
+
+from issue_index import IssueIndex
+
+
+def make_issues(components, names):
+    for name in names:
+        (components / name).mkdir(parents=True, exist_ok=True)
+        (components / name / 'storyConfig.ts').write_text(f'// {name}')
+
+
+def summarizer(components, calls):
+    """A summarize callback that records which issues it loaded, like FileManager.load_issue"""
+    def summarize(name):
+        calls.append(name)
+        if name == 'broken':
+            raise ValueError('Unexpected token')
+        return {'id': name, 'path': str(components / name / 'storyConfig.ts')}
+    return summarize
+
+
+def test_refresh_summarizes_only_changed_issues(tmp_path):
+    components = tmp_path / 'components'
+    make_issues(components, ['issue1', 'issue2', 'broken'])
+    index_path = tmp_path / 'storyIndex.meta.json'
+    calls = []
+    index = IssueIndex(components, index_path, summarizer(components, calls))
+
+    assert [entry['id'] for entry in index.refresh()] == ['issue1', 'issue2']
+    assert sorted(calls) == ['broken', 'issue1', 'issue2']
+
+    calls.clear()
+    config = components / 'issue2' / 'storyConfig.ts'
+    config.write_text('// issue2, edited')
+    os.utime(config, ns=(1, 1))
+    index.refresh()
+    assert calls == ['issue2']
+
+    # A fresh index reads the stored entries instead of re-summarizing
+    calls.clear()
+    reopened = IssueIndex(components, index_path, summarizer(components, calls))
+    assert [entry['id'] for entry in reopened.refresh()] == ['issue1', 'issue2']
+    assert calls == []
+
+
+def test_removed_issues_leave_the_index(tmp_path):
+    components = tmp_path / 'components'
+    make_issues(components, ['issue1', 'issue2'])
+    index = IssueIndex(components, tmp_path / 'storyIndex.meta.json', summarizer(components, []))
+    index.refresh()
+
+    (components / 'issue1' / 'storyConfig.ts').unlink()
+    assert [entry['id'] for entry in index.refresh()] == ['issue2']
+
+
+def test_page(tmp_path):
+    components = tmp_path / 'components'
+    make_issues(components, [f'issue{n}' for n in range(1, 6)] + ['broken'])
+    index = IssueIndex(components, tmp_path / 'storyIndex.meta.json', summarizer(components, []))
+
+    entries, total = index.page(1, 2)
+    assert [entry['id'] for entry in entries] == ['issue2', 'issue3']
+    assert total == 5
+    entries, total = index.page(4)
+    assert [entry['id'] for entry in entries] == ['issue5']
+    assert index.page(10, 2) == ([], 5)
@@ -0,0 +1,66 @@
+import json
+import threading
+
+import pytest
+
+from content_styles import STYLES_VERSION, ContentStyles
+from page_preview import FALLBACK_STYLES, PagePreview
+from story_generator import StoryGenerator
+
+
+@pytest.fixture
+def generator(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.add_page('issue1', 0, 'Second', '<p class="text-pink-600">Two</p>').result()
+    generator.file_manager.flush()
+    return generator
+
+
+def wait_for_builds(styles):
+    builder = styles._builder
+    if builder is not None:
+        builder.join(timeout=150)
+
+
+def test_render_uses_the_last_built_stylesheet(generator):
+    styles = ContentStyles(generator.file_manager)
+    styles.state_path.write_text(json.dumps({'version': STYLES_VERSION, 'issues': {}, 'file': 'content.0123456789.css'}))
+    preview = PagePreview(generator.file_manager, styles=styles)
+    assert styles.url() == '/issues/content.0123456789.css'
+
+    # A build in progress (e.g. a Tailwind compile) holds the styles lock; rendering must not wait for it
+    rendered = []
+    with styles._lock:
+        thread = threading.Thread(target=lambda: rendered.append(preview.render('issue1', 0, 1)))
+        thread.start()
+        thread.join(timeout=5)
+    assert rendered, "render waited for the stylesheet build"
+    body, etag = rendered[0]
+    assert b'/issues/content.0123456789.css' in body and b'<p class="text-pink-600">Two</p>' in body
+    wait_for_builds(styles)
+
+    assert preview.render('issue1', 0, 1) == (body, etag)
+    generator.update_page('issue1', 0, 1, '<p>Changed</p>').result()
+    assert preview.render('issue1', 0, 1)[1] != etag
+    wait_for_builds(styles)
+
+
+def test_render_falls_back_before_the_first_build(generator):
+    preview = PagePreview(generator.file_manager)
+    body, _ = preview.render('issue1', 0, 0)
+    assert FALLBACK_STYLES.encode('utf-8') in body and b'content-styles' not in body.split(b'</head>')[0]
+    wait_for_builds(preview.styles)
+
+
+def test_preview_revalidates(server, generator):
+    status, headers, body = server('GET', '/preview/issue1/0/1')
+    assert status == 200 and b'Two' in body and b'href="/preview/issue1/0/0"' in body
+    etag = headers['ETag']
+    assert server('GET', '/preview/issue1/0/1', headers={'If-None-Match': etag})[0] == 304
+
+    generator.update_page('issue1', 0, 1, '<p>Changed</p>').result()
+    status, headers, body = server('GET', '/preview/issue1/0/1', headers={'If-None-Match': etag})
+    assert status == 200 and b'Changed' in body and headers['ETag'] != etag
+    assert server('GET', '/preview/issue1/4/0')[0] == 404
+    wait_for_builds(server.gui.content_styles)
@@ -0,0 +1,66 @@
+import time
+
+from request_metrics import LATENCY_BUCKETS, MetricsRegistry
+
+
+def test_render_histograms_and_counters():
+    registry = MetricsRegistry()
+    registry.observe('story_manager_request_seconds', 0.003, method='GET', route='/api/issues', status='200')
+    registry.observe('story_manager_request_seconds', 0.2, method='GET', route='/api/issues', status='200')
+    registry.observe('story_manager_request_seconds', 60, method='GET', route='/api/issues', status='200')
+    registry.inc('story_manager_write_bytes_total', 512)
+    registry.inc('story_manager_write_bytes_total', 0.5)
+
+    lines = registry.render().splitlines()
+    labels = 'method="GET",route="/api/issues",status="200"'
+    assert '# TYPE story_manager_request_seconds histogram' in lines
+    buckets = [line for line in lines if line.startswith('story_manager_request_seconds_bucket')]
+    # One cumulative line per bound plus +Inf
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    assert f'story_manager_request_seconds_bucket{{{labels},le="0.0025"}} 0' in lines
+    assert f'story_manager_request_seconds_bucket{{{labels},le="0.005"}} 1' in lines
+    assert f'story_manager_request_seconds_bucket{{{labels},le="5.0"}} 2' in lines
+    assert f'story_manager_request_seconds_bucket{{{labels},le="+Inf"}} 3' in lines
+    assert f'story_manager_request_seconds_count{{{labels}}} 3' in lines
+    assert f'story_manager_request_seconds_sum{{{labels}}} 60.203' in lines
+    assert 'story_manager_write_bytes_total 512.5' in lines
+    # Metrics that were never recorded are left out
+    assert not any(line.startswith('story_manager_parse_seconds') for line in lines)
+
+
+def test_collectors():
+    registry = MetricsRegistry()
+
+    def cache_samples():
+        yield ('story_manager_cache_entries', 'gauge', "Cached issues", {'cache': 'issue'}, 3)
+        yield ('story_manager_cache_entries', 'gauge', "Cached issues", {'cache': 'a "quoted"\nname'}, 1)
+
+    def broken():
+        raise RuntimeError('not ready')
+
+    registry.add_collector(broken)
+    registry.add_collector(cache_samples)
+    lines = registry.render().splitlines()
+    assert lines == [
+        '# HELP story_manager_cache_entries Cached issues',
+        '# TYPE story_manager_cache_entries gauge',
+        'story_manager_cache_entries{cache="issue"} 3',
+        'story_manager_cache_entries{cache="a \\"quoted\\"\\nname"} 1',
+    ]
+
+
+def test_metrics_endpoint(server):
+    server('GET', '/api/issues')
+    sample = 'story_manager_request_seconds_count{method="GET",route="/api/issues",status="200"}'
+    # A request is timed once its response has gone out, so the scrape may briefly run ahead of it
+    deadline = time.monotonic() + 5
+    while True:
+        status, headers, body = server('GET', '/api/metrics')
+        if sample in body.decode('utf-8') or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    assert status == 200 and headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    assert sample in body.decode('utf-8')
+
+    status, _, body = server('GET', '/api/issues?profile=1')
+    assert status == 200 and body.startswith(b'GET /api/issues -> 200') and b'function calls' in body
@@ -0,0 +1,71 @@
+import shutil
+
+import pytest
+
+from search_index import SearchIndex, html_text, snippet
+from story_generator import StoryGenerator
+
+
+@pytest.fixture
+def generator(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.add_page('issue1', 0, 'Long', '<p>' + 'The sky was grey that morning. ' * 20 + 'A dragon flew by.</p>')
+    generator.add_page('issue1', 0, 'Short', '<p>The dragon, the Dragon!</p>')
+    generator.add_page('issue1', 0, 'Hidden', '<p class="zebra">Nothing here <script>zebra()</script></p>')
+    generator.add_chapter('issue1', 'The Kowaï Forest').result()
+    generator.file_manager.flush()
+    return generator
+
+
+def hits(index, query):
+    return [(hit['chapter'], hit['page']) for hit in index.search(query)['hits']]
+
+
+def test_bm25_ranking(generator):
+    index = SearchIndex(generator.file_manager)
+    # Two mentions in a short page beat one in a long page
+    assert hits(index, 'dragon ') == [(0, 2), (0, 1)]
+    # Matching every word beats matching one of them
+    assert hits(index, 'grey dragon ')[0] == (0, 1)
+    assert index.search('dragon ')['total'] == 2
+
+
+def test_prefix_folding_and_hidden_text(generator):
+    index = SearchIndex(generator.file_manager)
+    assert hits(index, 'drag') == [(0, 2), (0, 1)]
+    assert hits(index, 'drag ') == []
+    # Chapter titles count for every page of the chapter, with case and accents folded
+    assert hits(index, 'KOWAI ') == [(1, 0)]
+    assert hits(index, 'zebra') == []
+
+
+def test_snippet_marks_matches(generator):
+    hit = SearchIndex(generator.file_manager).search('dragon ')['hits'][1]
+    text = hit['snippet']
+    assert text.endswith('A dragon flew by.') and not text.startswith('The sky')
+    assert [text[start:end] for start, end in hit['matches']] == ['dragon']
+
+    text, matches = snippet('Dragons and a dragon', ['dragon'])
+    assert [text[start:end] for start, end in matches] == ['dragon']
+
+
+def test_refresh_reindexes_changed_issues(generator):
+    index = SearchIndex(generator.file_manager)
+    assert index.refresh()['reindexed'] == 1
+    assert index.refresh()['reindexed'] == 0
+
+    generator.update_page('issue1', 0, 1, '<p>A unicorn.</p>').result()
+    assert index.refresh()['reindexed'] == 1
+    assert hits(index, 'dragon ') == [(0, 2)] and hits(index, 'unicorn') == [(0, 1)]
+
+    # Shards persist, so a new index answers without reparsing
+    assert SearchIndex(generator.file_manager).stats()['pages'] == 5
+
+    shutil.rmtree(generator.file_manager.components_path / 'issue1')
+    assert index.refresh()['removed'] == 1
+    assert index.search('unicorn')['hits'] == []
+
+
+def test_html_text():
+    assert html_text('<div>Hello <b>there</b>\n  <style>p {}</style>friend</div>') == 'Hello there friend'
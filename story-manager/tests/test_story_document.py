@@ -0,0 +1,117 @@
+from story_document import StoryDocument
+from structured_document import StructuredStoryDocument
+
+SOURCE = """import type { StoryIssue } from '../../types/storyTypes';
+
+export const storyIssue1: StoryIssue = {
+  id: "issue1",
+  chapters: [
+    {
+      id: "chapter-1",
+      title: "The Egg",
+      pages: [
+        {
+          id: "page-1",
+          htmlContent: `
+            <p>It was a dark night.</p>
+          `
+        },
+        {
+          id: "page-2",
+          htmlContent: `<p>${`nested`}</p>`
+        },
+      ]
+    },
+    {
+      id: "chapter-2",
+      title: "The Hatching",
+      pages: [
+        { id: "page-3", htmlContent: `<p>Crack!</p>` },
+      ]
+    },
+    {
+      id: "chapter-3",
+      title: "Empty",
+      pages: []
+    },
+  ]
+};
+"""
+
+
+def tree(document):
+    """Every node's absolute spans, for comparing a spliced document with a fresh parse"""
+    def walk(path):
+        node, start = document._locate(path)
+        spans = {key: document._span(path, key) for key in node.spans}
+        children = [walk(path + (index,)) for index in range(len(node.children))]
+        return (start, start + node.end - node.start, spans, children)
+    return walk(())
+
+
+def assert_spliced(document):
+    """The spliced text parses back to the edited model and the same spans"""
+    fresh = type(document)(document.text, 'issue1')
+    assert fresh.issue == document.issue
+    assert tree(fresh) == tree(document)
+    assert fresh.render() == document.render()
+
+
+def test_edits_match_a_fresh_parse():
+    document = StoryDocument(SOURCE, 'issue1')
+    edits = [
+        lambda d: d.set_page_field(0, 1, 'htmlContent', '<p>Longer text than before</p>'),
+        lambda d: d.set_chapter_field(1, 'title', 'Hatched'),
+        lambda d: d.insert_page(1, {'id': 'page-4', 'htmlContent': '<p>New</p>'}),
+        lambda d: d.insert_page(2, {'id': 'page-5', 'htmlContent': '<p>First</p>'}),
+        lambda d: d.move_page(0, 0, 1),
+        lambda d: d.remove_page(1, 0),
+        lambda d: d.insert_chapter({'id': 'chapter-4', 'title': 'Last', 'pages': [{'id': 'page-6'}]}),
+        lambda d: d.move_chapter(3, 0),
+        lambda d: d.move_chapter(0, 3),
+        lambda d: d.remove_chapter(1),
+        lambda d: d.set_page_field(0, 0, 'htmlContent', ''),
+    ]
+    for edit in edits:
+        edit(document)
+        assert_spliced(document)
+
+    assert [chapter['id'] for chapter in document.issue['chapters']] == [
+        'chapter-1', 'chapter-3', 'chapter-4']
+    assert [page['id'] for page in document.issue['chapters'][0]['pages']] == ['page-2', 'page-1']
+
+
+def test_missing_key_regenerates():
+    document = StoryDocument(SOURCE, 'issue1')
+    document.set_page_field(1, 0, 'background', 'night')
+    assert_spliced(document)
+    assert document.text == document.render()
+
+
+def test_copy_leaves_the_original_untouched():
+    original = StoryDocument(SOURCE, 'issue1')
+    before = tree(original)
+    edited = original.copy()
+    edited.set_page_field(0, 0, 'htmlContent', '<p>Changed</p>')
+    edited.remove_chapter(2)
+    edited.insert_page(0, {'id': 'page-9'})
+
+    assert original.text == SOURCE
+    assert tree(original) == before
+    assert original.issue == StoryDocument(SOURCE, 'issue1').issue
+    # Chapters after the edited one are moved, not copied, so their pages stay shared
+    assert edited._root.children[1].children is original._root.children[1].children
+
+
+def test_block_edits_match_a_fresh_parse():
+    source = SOURCE.replace('htmlContent: `<p>Crack!</p>`', 'content: [\n          { type: "text", data: { content: "<p>Crack!</p>" } },\n        ]')
+    document = StructuredStoryDocument(source, 'issue1')
+    document.insert_block(1, 0, 0, {'type': 'image', 'data': {'src': 'egg.png'}})
+    assert_spliced(document)
+    document.move_block(1, 0, 0, 1)
+    assert_spliced(document)
+    document.update_block(1, 0, 0, {'type': 'text', 'data': {'content': '<p>Crunch</p>'}})
+    assert_spliced(document)
+    document.remove_block(1, 0, 1)
+    assert_spliced(document)
+    assert document.blocks(1, 0) == [{'type': 'text', 'data': {'content': '<p>Crunch</p>'}}]
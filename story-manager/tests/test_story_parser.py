@@ -0,0 +1,66 @@
+import pytest
+
+from story_parser import StoryConfigParser, StoryParseError, cook_template, parse_story_config
+
+CONFIG = '''import type { StoryIssue } from '../../types/storyTypes';
+
+export const storyIssue1: StoryIssue = {
+  id: "issue1",
+  backgroundTheme: 'antarctica', // trailing comment
+  chapters: [
+    {
+      id: "chapter-1",
+      title: "It's \\"cold\\"",
+      pages: [
+        {
+          id: "page-1-1",
+          htmlContent: `<p class="a">Hello ${`<b>nested \\` tick</b>`}</p>`
+        },
+        /* a page without content */
+        { id: "page-1-2", count: 3, done: true, hidden: null },
+      ]
+    }
+  ]
+};
+'''
+
+
+def test_parse_model():
+    issue = parse_story_config(CONFIG, 'issue1')
+
+    assert issue['id'] == 'issue1'
+    assert issue['backgroundTheme'] == 'antarctica'
+    chapter = issue['chapters'][0]
+    assert chapter['title'] == 'It\'s "cold"'
+    first, second = chapter['pages']
+    # Template literals stay as written, expressions included
+    assert first['htmlContent'] == '<p class="a">Hello ${`<b>nested \\` tick</b>`}</p>'
+    assert second == {'id': 'page-1-2', 'count': 3, 'done': True, 'hidden': None}
+
+
+def test_events_and_spans():
+    parser = StoryConfigParser(CONFIG)
+    events = list(parser.events())
+
+    assert [event.kind for event in events] == ['page', 'page', 'chapter', 'issue']
+    assert parser.export_name == 'storyIssue1' and parser.type_name == 'StoryIssue'
+    page = events[0]
+    start, end = page.spans['htmlContent']
+    assert CONFIG[start:end].startswith('`<p class="a">') and CONFIG[start:end].endswith('</p>`')
+    # A page can be re-parsed on its own from its start offset
+    assert parser.page_event(page.start, 0, 0).data == page.data
+
+
+def test_cook_template():
+    assert cook_template('a\\nb') == 'a\nb'
+    assert cook_template('<p>${`<b>x</b>`}${"!"}</p>') == '<p><b>x</b>!</p>'
+    with pytest.raises(ValueError):
+        cook_template('${name}')
+
+
+def test_error_location():
+    broken = CONFIG.replace('done: true,', 'done: true;')
+    with pytest.raises(StoryParseError) as error:
+        parse_story_config(broken)
+    line = broken[:broken.index('done: true;')].count('\n') + 1
+    assert error.value.line == line
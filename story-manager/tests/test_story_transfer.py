@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from story_events import story_events
+from story_generator import StoryGenerator
+from story_transfer import StoryTransfer
+
+
+@pytest.fixture
+def transfer(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    generator.add_page('issue1', 0, 'Second', '<p>Two</p>').result()
+    generator.file_manager.flush()
+    return StoryTransfer(generator)
+
+
+def renamed(lines, issue_name):
+    """An export with its records moved to another issue name"""
+    records = [json.loads(line) for line in lines]
+    return [json.dumps(dict(record, issue=issue_name)) for record in records]
+
+
+def test_round_trip(transfer):
+    lines = list(transfer.export_lines())
+    original = transfer.file_manager.read_issue('issue1')
+
+    [report] = transfer.import_lines(lines)
+    assert (report['issue'], report['created'], report['pages']) == ('issue1', False, 2)
+    assert transfer.file_manager.read_issue('issue1') == original
+
+
+def test_import_under_a_new_name(transfer):
+    [report] = transfer.import_lines(renamed(transfer.export_lines(), 'issue2'))
+
+    assert report['created']
+    issue = transfer.file_manager.read_issue('issue2')
+    assert issue['id'] == 'issue2'
+    assert issue['chapters'] == transfer.file_manager.read_issue('issue1')['chapters']
+
+
+def test_new_issues_are_written_like_edits(transfer):
+    subscription = story_events.subscribe()
+    try:
+        [report] = transfer.import_lines(renamed(transfer.export_lines(format='structured'), 'issue3'))
+    finally:
+        subscription.close()
+    events = [event for _, event in subscription.queue.queue]
+
+    config_path = transfer.file_manager.get_config_path('issue3')
+    assert report['format'] == 'structured' and config_path.name == 'simpleStoryConfig.ts' and config_path.exists()
+    assert transfer.file_manager.read_document('issue3').format == 'structured'
+    assert [record['op'] for record in transfer.story_generator.history('issue3')['records']] == ['import']
+    assert {'type': 'issue', 'issue': 'issue3', 'origin': 'edit'} in events
+    assert 'issue3' in transfer.file_manager.story_index_path.read_text()
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from story_generator import StoryGenerator
+from write_pipeline import WritePipeline, atomic_write_text, write_if_changed, write_pipeline
+
+
+def test_atomic_write_keeps_mode_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / 'storyConfig.ts'
+    path.write_text('old')
+    os.chmod(path, 0o640)
+
+    assert atomic_write_text(path, 'new ✨') == len('new ✨'.encode('utf-8'))
+    assert path.read_text(encoding='utf-8') == 'new ✨'
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ['storyConfig.ts']
+
+
+def test_failed_write_keeps_the_old_file(tmp_path, monkeypatch):
+    path = tmp_path / 'storyConfig.ts'
+    path.write_text('old')
+
+    def fail(source, target):
+        raise OSError('disk full')
+    monkeypatch.setattr(os, 'replace', fail)
+
+    with pytest.raises(OSError):
+        atomic_write_text(path, 'new')
+    assert path.read_text() == 'old'
+    assert os.listdir(tmp_path) == ['storyConfig.ts']
+
+
+def test_write_if_changed(tmp_path):
+    path = tmp_path / 'data' / 'storyIndex.ts'
+    assert write_if_changed(path, 'export {}')
+    stamp = os.stat(path).st_mtime_ns
+    assert not write_if_changed(path, 'export {}')
+    assert os.stat(path).st_mtime_ns == stamp
+
+
+def test_group_commit_coalesces_writes(tmp_path):
+    pipeline = WritePipeline(group_commit_window=0.05, fsync=False)
+    first, second = tmp_path / 'issue1.ts', tmp_path / 'issue2.ts'
+    futures = [pipeline.write(first, f'version {n}') for n in range(3)]
+    futures.append(pipeline.write(second, 'other'))
+
+    results = [future.result(timeout=5) for future in futures]
+    assert first.read_text() == 'version 2' and second.read_text() == 'other'
+    # Every caller learns its content (or a newer one) landed, in one write per file
+    assert [result['coalesced'] for result in results] == [3, 3, 3, 1]
+    assert (pipeline.writes, pipeline.coalesced) == (2, 2)
+    pipeline.close()
+
+
+def test_immediate_write_failure_is_reported(tmp_path):
+    pipeline = WritePipeline(fsync=False)
+    future = pipeline.write(tmp_path / 'missing' / 'storyConfig.ts', 'text')
+    with pytest.raises(OSError):
+        future.result(timeout=5)
+
+
+def test_write_behind_waits_until_flushed(tmp_path):
+    pipeline = WritePipeline(fsync=False, debounce=60)
+    path = tmp_path / 'storyConfig.ts'
+    futures = [pipeline.write(path, 'first'), pipeline.write(path, 'second')]
+
+    assert not path.exists()
+    assert pipeline.pending_paths() == [str(path)]
+    assert pipeline.status()['pendingSaves'] == 2
+    assert pipeline.flush([tmp_path / 'other.ts']) == 0
+    assert pipeline.flush([path]) == 1
+    assert path.read_text() == 'second'
+    assert all(future.done() for future in futures) and pipeline.pending_count() == 0
+    pipeline.close()
+
+
+def test_max_delay_caps_the_debounce(tmp_path):
+    pipeline = WritePipeline(fsync=False, debounce=60, max_delay=0.05)
+    path = tmp_path / 'storyConfig.ts'
+    assert pipeline.write(path, 'text').result(timeout=5)['bytes'] == 4
+    assert path.read_text() == 'text'
+    pipeline.close()
+
+
+def test_unsaved_edits_are_read_back_before_they_are_written(project):
+    generator = StoryGenerator()
+    generator.create_issue('issue1')
+    config_path = generator.file_manager.get_config_path('issue1')
+    write_pipeline.configure(debounce=60)
+    try:
+        generator.add_page('issue1', 0, 'Queued', '<p>Not on disk yet</p>')
+        assert 'Not on disk yet' not in config_path.read_text()
+        assert generator.file_manager.read_issue('issue1')['chapters'][0]['pages'][-1]['htmlContent'] == \
+            '<p>Not on disk yet</p>'
+        assert generator.file_manager.unsaved_issues() == ['issue1']
+
+        assert generator.file_manager.flush('issue1') == 1
+        assert 'Not on disk yet' in config_path.read_text()
+        assert generator.file_manager.unsaved_issues() == []
+    finally:
+        write_pipeline.configure(debounce=0)
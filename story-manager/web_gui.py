@@ -4,38 +4,173 @@ Lexicon Quest Story Manager - Web GUI
 A web-based GUI that runs in your browser.
 """
 
+import argparse
+import email.utils
+import hashlib
 import http.server
+import io
 import socketserver
 import json
 import os
+import queue
+import re
 import sys
 import threading
+import time
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, parse_qs, parse_qsl, urlencode
 import urllib.parse
 
 # Add current directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from content_styles import ContentStyles
 from file_manager import FileManager
+from file_watcher import DEFAULT_POLL_INTERVAL, StoryWatcher
+from http_compression import compression_cache, encoded_etag, is_compressible, negotiate_encoding, strip_encoding
+from issue_cache import file_stamp, issue_cache
+from page_preview import PagePreview
+from request_metrics import RequestProfile, metrics
+from search_index import DEFAULT_LIMIT, SearchIndex
+from story_events import format_sse, story_events
 from story_generator import StoryGenerator
+from story_transfer import StoryTransfer
+from write_pipeline import write_pipeline
+
+DEFAULT_WORKERS = 8
+KEEP_ALIVE_TIMEOUT = 15
+WRITE_TIMEOUT = 30
+# Server-Sent Events: keep-alive comment interval and client reconnect delay
+EVENT_HEARTBEAT = 15
+EVENT_RETRY_MS = 3000
+
+
+_NUMBER_SEGMENT = re.compile(r'/\d+(?=/|$)')
+PROFILE_SORTS = ('cumulative', 'tottime', 'calls')
+# Replies of the undo, redo and restore endpoints
+RESTORE_MESSAGES = {'undo': "Last edit undone", 'redo': "Edit redone", 'restore': "Version restored"}
+
+
+def route_label(path: str) -> str:
+    """Route pattern of a request path, so metrics get one series per route rather than per issue"""
+    path = urlparse(path).path
+    if path != '/' and not path.startswith(('/api/', '/preview/')):
+        return 'static'
+    if path.startswith(('/api/issue/', '/preview/')):
+        parts = path.split('/')
+        parts[2 if parts[1] == 'preview' else 3] = '{issue}'
+        path = '/'.join(parts)
+    return _NUMBER_SEGMENT.sub('/{n}', path)
+
+
+def _status_samples():
+    """Cache, queue and stream figures the components already track, read at scrape time"""
+    for name, stats in (('issue_cache', issue_cache.stats()), ('compression_cache', compression_cache.stats())):
+        lookups = stats['hits'] + stats['misses']
+        yield (f'story_manager_{name}_hits_total', 'counter', f"{name} lookups served from memory", {}, stats['hits'])
+        yield (f'story_manager_{name}_misses_total', 'counter', f"{name} lookups that had to load", {}, stats['misses'])
+        yield (f'story_manager_{name}_hit_ratio', 'gauge', f"{name} hits / lookups since start", {},
+               stats['hits'] / lookups if lookups else 0)
+        yield (f'story_manager_{name}_bytes', 'gauge', f"Memory held by the {name}", {}, stats['bytes'])
+    queue_status = write_pipeline.status()
+    yield ('story_manager_write_queue_pending', 'gauge', "Files waiting to be written", {}, queue_status['pending'])
+    yield ('story_manager_writes_total', 'counter', "Files written by the write pipeline", {}, queue_status['writes'])
+    yield ('story_manager_event_streams', 'gauge', "Open /api/events streams", {}, story_events.subscriber_count())
+
+
+metrics.add_collector(_status_samples)
+
+
+def make_etag(*parts) -> str:
+    """Build a strong ETag from strings and integers (e.g. a file stamp)"""
+    return '"' + '-'.join(f'{part:x}' if isinstance(part, int) else str(part) for part in parts) + '"'
+
+
+def http_date(mtime_ns: int) -> str:
+    """Format a file mtime as an HTTP date"""
+    return email.utils.formatdate(mtime_ns / 1e9, usegmt=True)
+
+
+class CachedFile:
+    """Keeps a file's bytes in memory until its stamp changes"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._stamp = None
+        self._body = None
+        self._lock = threading.Lock()
+    
+    def read(self):
+        """Return (body, stamp), re-reading the file only if it changed"""
+        stamp = file_stamp(self.path)
+        with self._lock:
+            if stamp != self._stamp:
+                self._body = Path(self.path).read_bytes()
+                self._stamp = stamp
+            return self._body, self._stamp
+
+
+class BoundedThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """HTTP server that handles connections on a fixed-size worker pool"""
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='story-manager')
+        super().__init__(server_address, handler_class)
+    
+    def process_request(self, request, client_address):
+        """Queue the connection for the next free worker"""
+        self.executor.submit(self.process_request_thread, request, client_address)
+    
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
 
 class WebGUI:
-    def __init__(self, port=8080):
+    def __init__(self, port=8080, workers=DEFAULT_WORKERS, keep_alive=True, group_commit_ms=0,
+                 debounce_ms=0, max_delay_ms=0, watch=True, poll=False, poll_interval=DEFAULT_POLL_INTERVAL):
         self.port = port
+        self.workers = workers
+        self.keep_alive = keep_alive
+        self.group_commit_ms = group_commit_ms
+        self.debounce_ms = debounce_ms
+        self.max_delay_ms = max_delay_ms
+        write_pipeline.configure(group_commit_window=group_commit_ms / 1000,
+                                 debounce=debounce_ms / 1000, max_delay=max_delay_ms / 1000)
         self.file_manager = FileManager()
         self.story_generator = StoryGenerator()
-        self.current_issue = None
-        self.current_chapter = None
-        self.current_page = None
+        self.search_index = SearchIndex(self.file_manager)
+        self.content_styles = ContentStyles(self.file_manager)
+        self.page_preview = PagePreview(self.file_manager, styles=self.content_styles)
+        # Event streams each hold a worker thread; leave the rest for requests
+        self.max_event_streams = max(1, workers // 2)
+        self.watcher = StoryWatcher(self.file_manager, poll_interval=poll_interval, use_inotify=not poll) \
+            if watch else None
+        self.index_page = CachedFile(Path(__file__).parent / 'index.html')
     
     def start_server(self):
         """Start the web server"""
         handler = self.create_handler()
         
-        with socketserver.TCPServer(("", self.port), handler) as httpd:
+        with BoundedThreadingHTTPServer(("", self.port), handler, self.workers) as httpd:
             print(f"🌐 Story Manager Web GUI running at http://localhost:{self.port}")
+            print(f"🧵 Serving with {self.workers} worker threads (keep-alive {'on' if self.keep_alive else 'off'})")
+            if self.debounce_ms:
+                limit = f", at most every {self.max_delay_ms} ms" if self.max_delay_ms else ""
+                print(f"💾 Writing edits {self.debounce_ms} ms after the last change{limit}")
+            elif self.group_commit_ms:
+                print(f"💾 Coalescing edits to the same issue within {self.group_commit_ms} ms")
+            # Bring the search index and content stylesheet up to date before the first request needs them
+            threading.Thread(target=self.search_index.refresh, name='search-index', daemon=True).start()
+            self.content_styles.schedule_build()
+            if self.watcher:
+                mode = self.watcher.start()
+                print(f"👀 Watching src/components for hand edits ({mode})")
             print("📚 Open your browser and navigate to the URL above")
             print("🛑 Press Ctrl+C to stop the server")
             
@@ -45,24 +180,132 @@ class WebGUI:
             except:
                 pass
             
-            httpd.serve_forever()
+            try:
+                httpd.serve_forever()
+            finally:
+                story_events.close()
+                if self.watcher:
+                    self.watcher.stop()
+                # Make sure queued edits reach the disk before exiting
+                pending = write_pipeline.pending_count()
+                if pending:
+                    print(f"💾 Writing {pending} unsaved issue(s)...")
+                write_pipeline.close()
     
     def create_handler(self):
         """Create HTTP request handler"""
         class StoryManagerHandler(http.server.SimpleHTTPRequestHandler):
+            # HTTP/1.1 keeps connections open between requests; idle ones
+            # are closed after the timeout so they don't pin a worker
+            protocol_version = 'HTTP/1.1' if self.keep_alive else 'HTTP/1.0'
+            timeout = KEEP_ALIVE_TIMEOUT
+            
             def __init__(self, *args, **kwargs):
                 self.gui = self
+                self.static_etag = None
+                self.request_started = None
+                self.response_status = None
+                self.profile = None
                 super().__init__(*args, **kwargs)
             
+            def handle_one_request(self):
+                """Handle a request and record its latency (or answer with its profile)"""
+                self.request_started = None
+                self.response_status = None
+                try:
+                    super().handle_one_request()
+                finally:
+                    profile, self.profile = self.profile, None
+                    if profile:
+                        self.send_profile(profile)
+                    elif self.request_started is not None and self.response_status is not None:
+                        route = 'unmatched' if self.response_status == 404 else route_label(self.path)
+                        metrics.observe('story_manager_request_seconds', time.perf_counter() - self.request_started,
+                                        method=self.command, route=route, status=str(self.response_status))
+            
+            def parse_request(self):
+                """Start the clock once a request arrives (not while a keep-alive connection idles)"""
+                self.request_started = time.perf_counter()
+                if not super().parse_request():
+                    return False
+                
+                parsed_path = urlparse(self.path)
+                query = parse_qs(parsed_path.query)
+                if query.get('profile', ['0'])[0] not in ('0', '', 'false') and parsed_path.path != '/api/events':
+                    # Dispatch without the profiling parameters and keep the real response aside
+                    rest = [(key, value) for key, value in parse_qsl(parsed_path.query, keep_blank_values=True)
+                            if key not in ('profile', 'sort')]
+                    self.path = parsed_path._replace(query=urlencode(rest)).geturl()
+                    self.profile_sort = query.get('sort', ['cumulative'])[0]
+                    if self.profile_sort not in PROFILE_SORTS:
+                        self.profile_sort = 'cumulative'
+                    self.profile = RequestProfile()
+                    self.unprofiled_wfile, self.wfile = self.wfile, io.BytesIO()
+                    self.profile.start()
+                return True
+            
+            def send_response(self, code, message=None):
+                self.response_status = code
+                super().send_response(code, message)
+            
+            def send_profile(self, profile):
+                """Replace a profiled request's response with its cProfile summary"""
+                profile.stop()
+                response = self.wfile.getvalue()
+                self.wfile = self.unprofiled_wfile
+                status = self.response_status
+                head = (f"{self.command} {self.path} -> {status}, {profile.seconds * 1000:.1f} ms,"
+                        f" {len(response)} response bytes (headers included)\n\n")
+                try:
+                    self.send_body((head + profile.report(self.profile_sort)).encode('utf-8'),
+                                   'text/plain; charset=utf-8', headers={'Cache-Control': 'no-store'})
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+            
             def do_GET(self):
                 """Handle GET requests"""
+                parsed_path = urlparse(self.path)
                 if self.path == '/':
                     self.serve_index()
-                elif self.path == '/api/issues':
-                    self.api_get_issues()
-                elif self.path.startswith('/api/issue/'):
-                    issue_name = self.path.split('/')[-1]
-                    self.api_get_issue(issue_name)
+                elif parsed_path.path == '/api/issues':
+                    self.api_get_issues(parse_qs(parsed_path.query))
+                elif parsed_path.path == '/api/status':
+                    self.api_get_status()
+                elif parsed_path.path == '/api/metrics':
+                    self.api_metrics()
+                elif parsed_path.path == '/api/events':
+                    self.api_events(parse_qs(parsed_path.query))
+                elif parsed_path.path == '/api/search':
+                    self.api_search(parse_qs(parsed_path.query))
+                elif parsed_path.path == '/api/export':
+                    self.api_export(parse_qs(parsed_path.query))
+                elif parsed_path.path.startswith('/api/issue/'):
+                    path_parts = parsed_path.path.split('/')
+                    issue_name = path_parts[3]
+                    if len(path_parts) == 4:
+                        self.api_get_issue(issue_name)
+                    elif len(path_parts) == 5 and path_parts[4] == 'outline':
+                        # Outline: /api/issue/issue1/outline
+                        self.api_get_issue_outline(issue_name)
+                    elif len(path_parts) == 5 and path_parts[4] == 'history':
+                        # Edit journal: /api/issue/issue1/history?limit=50
+                        self.api_history(issue_name, parse_qs(parsed_path.query))
+                    elif len(path_parts) == 8 and path_parts[4] == 'chapter' and path_parts[6] == 'page':
+                        # Single page: /api/issue/issue1/chapter/0/page/1
+                        self.api_get_page(issue_name, path_parts[5], path_parts[7])
+                    else:
+                        self.send_error(404)
+                elif parsed_path.path.startswith('/preview/'):
+                    # Page preview: /preview/issue1/0/1
+                    path_parts = parsed_path.path.split('/')
+                    if len(path_parts) == 5:
+                        self.serve_preview(path_parts[2], path_parts[3], path_parts[4])
+                    else:
+                        self.send_error(404)
+                elif parsed_path.path.startswith('/issues/') and parsed_path.path.count('/') == 2:
+                    # Content stylesheet: /issues/content.<hash>.css
+                    self.serve_stylesheet(parsed_path.path.split('/')[2])
                 else:
                     super().do_GET()
             
@@ -72,6 +315,8 @@ class WebGUI:
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
                 self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+                self.send_header('Access-Control-Expose-Headers', 'X-Total-Count')
+                self.send_header('Content-Length', '0')
                 self.end_headers()
             
             def do_DELETE(self):
@@ -108,6 +353,26 @@ class WebGUI:
                     self.api_add_page()
                 elif self.path == '/api/update-page':
                     self.api_update_page()
+                elif self.path == '/api/flush':
+                    self.api_flush()
+                elif urlparse(self.path).path == '/api/import':
+                    self.api_import(parse_qs(urlparse(self.path).query))
+                elif self.path in ('/api/insert-block', '/api/update-block', '/api/move-block', '/api/delete-block'):
+                    self.api_edit_block(self.path[len('/api/'):-len('-block')])
+                elif self.path.startswith('/api/issue/') and self.path.endswith('/batch'):
+                    # Batch edit: /api/issue/issue1/batch
+                    path_parts = self.path.split('/')
+                    if len(path_parts) == 5:
+                        self.api_batch(path_parts[3])
+                    else:
+                        self.send_error(400)
+                elif self.path.startswith('/api/issue/') and self.path.endswith(('/undo', '/redo', '/restore')):
+                    # History: /api/issue/issue1/undo, /redo, /restore {seq}
+                    path_parts = self.path.split('/')
+                    if len(path_parts) == 5:
+                        self.api_restore(path_parts[3], path_parts[4])
+                    else:
+                        self.send_error(400)
                 else:
                     self.send_error(404)
             
@@ -127,35 +392,164 @@ class WebGUI:
             
             def serve_index(self):
                 """Serve the main HTML page"""
-                html_content = self.get_html_content()
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(html_content.encode())
-            
-            def get_html_content(self):
-                """Get the HTML content for the web interface"""
-                # Read from the separate HTML file
-                html_file_path = os.path.join(os.path.dirname(__file__), 'index.html')
                 try:
-                    with open(html_file_path, 'r', encoding='utf-8') as f:
-                        return f.read()
+                    body, stamp = self.index_page.read()
                 except FileNotFoundError:
-                    return "<h1>Error: index.html not found</h1><p>Please ensure index.html exists in the story-manager directory.</p>"
+                    body = b"<h1>Error: index.html not found</h1><p>Please ensure index.html exists in the story-manager directory.</p>"
+                    self.send_body(body, 'text/html')
+                    return
+                
+                etag = make_etag('index', *stamp)
+                if self.not_modified(etag, stamp[0]):
+                    return
+                self.send_body(body, 'text/html', etag=etag, last_modified=stamp[0])
+            
+            def serve_preview(self, issue_name, chapter_index, page_index):
+                """Serve one page rendered into the preview template"""
+                try:
+                    body, etag = self.page_preview.render(issue_name, int(chapter_index), int(page_index))
+                except (FileNotFoundError, IndexError, ValueError) as e:
+                    self.send_error(404, str(e))
+                    return
+                
+                etag = make_etag('preview', etag)
+                if self.not_modified(etag):
+                    return
+                self.send_body(body, 'text/html; charset=utf-8', etag=etag)
+            
+            def serve_stylesheet(self, file_name):
+                """Serve a generated content stylesheet; its name changes with its content"""
+                path = self.content_styles.stylesheet(file_name)
+                if path is None:
+                    self.send_error(404)
+                    return
+                etag = make_etag('styles', file_name)
+                cache_control = 'public, max-age=31536000, immutable'
+                if self.not_modified(etag, cache_control=cache_control):
+                    return
+                self.send_body(path.read_bytes(), 'text/css; charset=utf-8', {'Cache-Control': cache_control},
+                               etag=etag)
+            
+            def send_head(self):
+                """Serve static files with an ETag, answering 304 when it matches"""
+                path = self.translate_path(self.path)
+                if os.path.isfile(path):
+                    stamp = file_stamp(path)
+                    etag = make_etag('static', *stamp)
+                    if self.not_modified(etag, stamp[0]):
+                        return None
+                    self.static_etag = etag
+                return super().send_head()
+            
+            def end_headers(self):
+                if self.static_etag:
+                    self.send_header('ETag', self.static_etag)
+                    self.static_etag = None
+                super().end_headers()
+            
+            def not_modified(self, etag, mtime_ns=None, cache_control='no-cache'):
+                """Send 304 and return True if the client's cached copy is current"""
+                if_none_match = self.headers.get('If-None-Match')
+                if if_none_match is not None:
+                    # Compressed variants carry an encoding suffix on the same ETag
+                    fresh = False
+                    for tag in if_none_match.split(','):
+                        tag = tag.strip()
+                        if tag.startswith('W/'):
+                            tag = tag[2:]
+                        if tag == '*' or strip_encoding(tag) == etag:
+                            fresh = True
+                            if tag != '*':
+                                etag = tag
+                            break
+                else:
+                    fresh = False
+                    if_modified_since = self.headers.get('If-Modified-Since')
+                    if if_modified_since and mtime_ns is not None:
+                        try:
+                            since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+                            fresh = int(mtime_ns / 1e9) <= since
+                        except (TypeError, ValueError, IndexError, OverflowError):
+                            fresh = False
+                
+                if not fresh:
+                    return False
+                
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                if mtime_ns is not None:
+                    self.send_header('Last-Modified', http_date(mtime_ns))
+                self.send_header('Cache-Control', cache_control)
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                return True
             
-            def api_get_issues(self):
-                """API: Get all issues"""
+            def api_get_issues(self, query):
+                """API: Get issues, optionally paginated with ?offset=&limit="""
                 try:
-                    issues = self.file_manager.list_issues()
-                    self.send_json_response(issues)
+                    offset = int(query.get('offset', ['0'])[0])
+                    limit = int(query['limit'][0]) if 'limit' in query else None
+                    if offset < 0 or (limit is not None and limit < 0):
+                        raise ValueError("offset and limit must not be negative")
+                    
+                    issues, total = self.file_manager.list_issues_page(offset, limit)
+                    body = json.dumps(issues).encode()
+                    # X-Total-Count is part of the response, so a new issue changes every page's ETag
+                    etag = make_etag('issues', total, hashlib.sha1(body).hexdigest())
+                    if self.not_modified(etag):
+                        return
+                    self.send_body(body, 'application/json', {'X-Total-Count': str(total)}, etag=etag)
                 except Exception as e:
                     self.send_json_error(str(e))
             
             def api_get_issue(self, issue_name):
                 """API: Get specific issue"""
                 try:
-                    issue_data = self.story_generator._load_issue_data(issue_name)
-                    self.send_json_response(issue_data)
+                    stamp = self.file_manager.issue_stamp(issue_name)
+                    etag = make_etag('issue', *stamp)
+                    if self.not_modified(etag, stamp[0]):
+                        return
+                    issue_data = self.file_manager.read_issue(issue_name)
+                    self.send_json_response(issue_data, etag=etag, last_modified=stamp[0])
+                except Exception as e:
+                    self.send_json_error(str(e))
+            
+            def api_get_issue_outline(self, issue_name):
+                """API: Get chapter titles and page ids/sizes of an issue"""
+                try:
+                    stamp = self.file_manager.issue_stamp(issue_name)
+                    etag = make_etag('outline', *stamp)
+                    if self.not_modified(etag, stamp[0]):
+                        return
+                    outline = self.file_manager.read_outline(issue_name)
+                    self.send_json_response(outline, etag=etag, last_modified=stamp[0])
+                except Exception as e:
+                    self.send_json_error(str(e))
+            
+            def api_get_page(self, issue_name, chapter_index, page_index):
+                """API: Get a single page"""
+                try:
+                    chapter_index, page_index = int(chapter_index), int(page_index)
+                    stamp = self.file_manager.issue_stamp(issue_name)
+                    etag = make_etag('page', chapter_index, page_index, *stamp)
+                    if self.not_modified(etag, stamp[0]):
+                        return
+                    page = self.file_manager.read_page(issue_name, chapter_index, page_index)
+                    self.send_json_response(page, etag=etag, last_modified=stamp[0])
+                except Exception as e:
+                    self.send_json_error(str(e))
+            
+            def api_search(self, query):
+                """API: Ranked pages matching ?q= across all issues, with snippets"""
+                try:
+                    text = query.get('q', [''])[0]
+                    limit = int(query.get('limit', [str(DEFAULT_LIMIT)])[0])
+                    if limit < 0:
+                        raise ValueError("limit must not be negative")
+                    start = time.perf_counter()
+                    result = self.search_index.search(text, limit)
+                    result['ms'] = round((time.perf_counter() - start) * 1000, 2)
+                    self.send_json_response(result, headers={'Cache-Control': 'no-store'})
                 except Exception as e:
                     self.send_json_error(str(e))
             
@@ -171,8 +565,8 @@ class WebGUI:
                         self.send_json_error("Issue name is required")
                         return
                     
-                    self.story_generator.create_issue(issue_name)
-                    self.send_json_response({"success": True, "message": f"Issue '{issue_name}' created successfully!"})
+                    write = self.story_generator.create_issue(issue_name)
+                    self.send_json_response({"success": True, "message": f"Issue '{issue_name}' created successfully!", **self.durability(write)})
                 except Exception as e:
                     self.send_json_error(str(e))
             
@@ -191,8 +585,8 @@ class WebGUI:
                         self.send_json_error("Issue name and title are required")
                         return
                     
-                    self.story_generator.add_chapter(issue_name, title, description)
-                    self.send_json_response({"success": True, "message": f"Chapter '{title}' added successfully!"})
+                    write = self.story_generator.add_chapter(issue_name, title, description)
+                    self.send_json_response({"success": True, "message": f"Chapter '{title}' added successfully!", **self.durability(write)})
                 except Exception as e:
                     self.send_json_error(str(e))
             
@@ -212,8 +606,8 @@ class WebGUI:
                         self.send_json_error("Issue name and title are required")
                         return
                     
-                    self.story_generator.add_page(issue_name, chapter_index, title, content)
-                    self.send_json_response({"success": True, "message": f"Page '{title}' added successfully!"})
+                    write = self.story_generator.add_page(issue_name, chapter_index, title, content)
+                    self.send_json_response({"success": True, "message": f"Page '{title}' added successfully!", **self.durability(write)})
                 except Exception as e:
                     self.send_json_error(str(e))
             
@@ -233,8 +627,80 @@ class WebGUI:
                         self.send_json_error("Issue name is required")
                         return
                     
-                    self.story_generator.update_page(issue_name, chapter_index, page_index, content)
-                    self.send_json_response({"success": True, "message": "Page updated successfully!"})
+                    write = self.story_generator.update_page(issue_name, chapter_index, page_index, content)
+                    self.send_json_response({"success": True, "message": "Page updated successfully!", **self.durability(write)})
+                except Exception as e:
+                    self.send_json_error(str(e))
+            
+            def api_edit_block(self, action):
+                """API: Insert, update, move or delete one content block of a structured page"""
+                try:
+                    content_length = int(self.headers['Content-Length'])
+                    post_data = self.rfile.read(content_length)
+                    data = json.loads(post_data.decode('utf-8'))
+                    
+                    issue_name = data.get('issue_name', '').strip()
+                    chapter_index = int(data.get('chapter_index', 0))
+                    page_index = int(data.get('page_index', 0))
+                    block_index = int(data.get('block_index', 0))
+                    
+                    if not issue_name:
+                        self.send_json_error("Issue name is required")
+                        return
+                    
+                    if action == 'insert':
+                        write = self.story_generator.insert_block(issue_name, chapter_index, page_index,
+                                                                  block_index, data.get('block'))
+                    elif action == 'update':
+                        write = self.story_generator.update_block(issue_name, chapter_index, page_index,
+                                                                  block_index, data.get('block'))
+                    elif action == 'move':
+                        write = self.story_generator.move_block(issue_name, chapter_index, page_index,
+                                                                block_index, int(data.get('to_index', 0)))
+                    else:
+                        write = self.story_generator.delete_block(issue_name, chapter_index, page_index, block_index)
+                    self.send_json_response({"success": True, "message": f"Block {action.rstrip('e')}ed successfully!", **self.durability(write)})
+                except Exception as e:
+                    self.send_json_error(str(e))
+            
+            def api_batch(self, issue_name):
+                """API: Apply a list of edits to one issue with a single parse and write"""
+                try:
+                    content_length = int(self.headers['Content-Length'])
+                    post_data = self.rfile.read(content_length)
+                    data = json.loads(post_data.decode('utf-8'))
+                    
+                    operations = data.get('operations') if isinstance(data, dict) else data
+                    write = self.story_generator.apply_batch(issue_name, operations)
+                    self.send_json_response({"success": True, "message": f"Applied {len(operations)} operation(s)",
+                                             "operations": len(operations), **self.durability(write)})
+                except Exception as e:
+                    self.send_json_error(str(e))
+            
+            def api_history(self, issue_name, query):
+                """API: Journaled edits of an issue, newest first"""
+                try:
+                    limit = int(query['limit'][0]) if 'limit' in query else None
+                    history = self.story_generator.history(issue_name, limit)
+                    self.send_json_response(history, headers={'Cache-Control': 'no-store'})
+                except Exception as e:
+                    self.send_json_error(str(e))
+            
+            def api_restore(self, issue_name, action):
+                """API: Undo, redo, or restore the version after journal record {seq}"""
+                try:
+                    if action == 'restore':
+                        content_length = int(self.headers['Content-Length'])
+                        data = json.loads(self.rfile.read(content_length).decode('utf-8'))
+                        write = self.story_generator.restore(issue_name, int(data.get('seq', 0)))
+                    elif action == 'undo':
+                        write = self.story_generator.undo(issue_name)
+                    else:
+                        write = self.story_generator.redo(issue_name)
+                    history = self.story_generator.history(issue_name, 1)
+                    self.send_json_response({"success": True, "message": RESTORE_MESSAGES[action],
+                                             "head": history['head'], "undo": history['undo'],
+                                             "redo": history['redo'], **self.durability(write)})
                 except Exception as e:
                     self.send_json_error(str(e))
             
@@ -252,56 +718,238 @@ class WebGUI:
                         return
                     
                     # Update the chapter in the story config
-                    self.story_generator.update_chapter(issue_name, chapter_index, title)
-                    self.send_json_response({"success": True, "message": "Chapter updated successfully!"})
+                    write = self.story_generator.update_chapter(issue_name, chapter_index, title)
+                    self.send_json_response({"success": True, "message": "Chapter updated successfully!", **self.durability(write)})
                 except Exception as e:
                     self.send_json_error(str(e))
             
             def api_delete_chapter(self, issue_name, chapter_index):
                 """API: Delete chapter"""
                 try:
-                    self.story_generator.delete_chapter(issue_name, chapter_index)
-                    self.send_json_response({"success": True, "message": "Chapter deleted successfully!"})
+                    write = self.story_generator.delete_chapter(issue_name, chapter_index)
+                    self.send_json_response({"success": True, "message": "Chapter deleted successfully!", **self.durability(write)})
                 except Exception as e:
                     self.send_json_error(str(e))
             
             def api_delete_page(self, issue_name, chapter_index, page_index):
                 """API: Delete page"""
                 try:
-                    self.story_generator.delete_page(issue_name, chapter_index, page_index)
-                    self.send_json_response({"success": True, "message": "Page deleted successfully!"})
+                    write = self.story_generator.delete_page(issue_name, chapter_index, page_index)
+                    self.send_json_response({"success": True, "message": "Page deleted successfully!", **self.durability(write)})
+                except Exception as e:
+                    self.send_json_error(str(e))
+            
+            def api_get_status(self):
+                """API: Write queue depth and cache statistics"""
+                try:
+                    self.send_json_response({
+                        "writeQueue": write_pipeline.status(),
+                        "unsavedIssues": self.file_manager.unsaved_issues(),
+                        "issueCache": issue_cache.stats(),
+                        "compressionCache": compression_cache.stats(),
+                        "searchIndex": self.search_index.stats(),
+                        "eventStreams": story_events.subscriber_count(),
+                        "watcher": self.watcher.watcher.mode if self.watcher else None,
+                    }, headers={'Cache-Control': 'no-store'})
+                except Exception as e:
+                    self.send_json_error(str(e))
+            
+            def api_metrics(self):
+                """API: Latency histograms, timings and cache counters in Prometheus text format"""
+                self.send_body(metrics.render().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8',
+                               headers={'Cache-Control': 'no-store'})
+            
+            def api_events(self, query):
+                """API: Stream issue change events as Server-Sent Events (?issue= to follow one issue)"""
+                if story_events.subscriber_count() >= self.max_event_streams:
+                    self.send_error(503, "Too many event streams")
+                    return
+                try:
+                    last_event_id = int(self.headers.get('Last-Event-ID'))
+                except (TypeError, ValueError):
+                    last_event_id = None
+                issue_name = query.get('issue', [None])[0]
+                
+                subscription = story_events.subscribe(last_event_id)
+                # The stream has no length, so it ends with the connection
+                self.close_connection = True
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-store')
+                self.send_header('Connection', 'close')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                try:
+                    self.wfile.write(f"retry: {EVENT_RETRY_MS}\n\n".encode())
+                    while True:
+                        try:
+                            item = subscription.get(timeout=EVENT_HEARTBEAT)
+                        except queue.Empty:
+                            # Comment line: keeps proxies from timing out and detects closed tabs
+                            self.wfile.write(b": ping\n\n")
+                            continue
+                        if item is None:
+                            break
+                        if issue_name and item[1].get('issue', issue_name) != issue_name:
+                            continue
+                        self.wfile.write(format_sse(*item))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    subscription.close()
+            
+            def api_export(self, query):
+                """API: Stream issues as NDJSON (?issue=...&format=html|structured)"""
+                try:
+                    transfer = StoryTransfer(self.story_generator)
+                    issue_names = transfer.check_export(query.get('issue'), query.get('format', [None])[0])
+                except Exception as e:
+                    self.send_json_error(str(e))
+                    return
+                
+                # Records are written as they are read, so the length is unknown
+                self.close_connection = True
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+                self.send_header('Content-Disposition', 'attachment; filename="stories.ndjson"')
+                self.send_header('Cache-Control', 'no-store')
+                self.send_header('Connection', 'close')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                try:
+                    for line in transfer.export_lines(issue_names, query.get('format', [None])[0]):
+                        self.wfile.write(line.encode('utf-8'))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+            
+            def api_import(self, query):
+                """API: Create or replace issues from an NDJSON body (?format=...&dry_run=1)"""
+                remaining = 0
+                try:
+                    remaining = int(self.headers.get('Content-Length') or 0)
+                    
+                    def lines():
+                        # Read the body a line at a time instead of all at once
+                        nonlocal remaining
+                        while remaining > 0:
+                            line = self.rfile.readline(remaining)
+                            if not line:
+                                break
+                            remaining -= len(line)
+                            yield line
+                    
+                    dry_run = query.get('dry_run', ['0'])[0] not in ('0', '', 'false')
+                    reports = StoryTransfer(self.story_generator).import_lines(
+                        lines(), query.get('format', [None])[0], dry_run)
+                    self.send_json_response({"success": True, "dryRun": dry_run, "issues": reports,
+                                             "message": f"{'Checked' if dry_run else 'Imported'} {len(reports)} issue(s)"})
                 except Exception as e:
+                    # Drain the rest of the body so the connection stays usable
+                    while remaining > 0:
+                        chunk = self.rfile.read(min(remaining, 64 * 1024))
+                        if not chunk:
+                            break
+                        remaining -= len(chunk)
                     self.send_json_error(str(e))
             
-            def send_json_response(self, data):
+            def api_flush(self):
+                """API: Write all queued edits to disk now"""
+                try:
+                    content_length = int(self.headers.get('Content-Length') or 0)
+                    data = json.loads(self.rfile.read(content_length).decode() or '{}') if content_length else {}
+                    written = self.file_manager.flush(data.get('issue_name'))
+                    self.send_json_response({"success": True, "written": written, "message": f"Flushed {written} file(s)"})
+                except Exception as e:
+                    self.send_json_error(str(e))
+            
+            def durability(self, write):
+                """Wait until a write is durable on disk and describe it for the response"""
+                if write_pipeline.write_behind and not write.done():
+                    # The edit is served from memory until the queue flushes it
+                    return {"durable": False, "queuedWrites": write_pipeline.pending_count()}
+                result = write.result(timeout=WRITE_TIMEOUT)
+                return {"durable": True, "coalescedWrites": result['coalesced']}
+            
+            def send_json_response(self, data, headers=None, etag=None, last_modified=None):
                 """Send JSON response"""
+                with metrics.timer('story_manager_json_encode_seconds', route=route_label(self.path)):
+                    body = json.dumps(data).encode()
+                self.send_body(body, 'application/json', headers, etag, last_modified)
+            
+            def send_body(self, body, content_type, headers=None, etag=None, last_modified=None):
+                """Send a 200 response with optional validators for conditional GETs"""
+                compressible = is_compressible(content_type, len(body))
+                encoding = negotiate_encoding(self.headers.get('Accept-Encoding')) if compressible else None
+                if encoding:
+                    body = compression_cache.compress(body, encoding, etag)
+                    if etag:
+                        etag = encoded_etag(etag, encoding)
+                
                 self.send_response(200)
-                self.send_header('Content-type', 'application/json')
+                self.send_header('Content-type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if compressible:
+                    self.send_header('Vary', 'Accept-Encoding')
+                if encoding:
+                    self.send_header('Content-Encoding', encoding)
+                if etag:
+                    self.send_header('ETag', etag)
+                    if 'Cache-Control' not in (headers or {}):
+                        self.send_header('Cache-Control', 'no-cache')
+                if last_modified is not None:
+                    self.send_header('Last-Modified', http_date(last_modified))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
                 self.send_header('Access-Control-Allow-Headers', 'Content-Type')
                 self.end_headers()
-                self.wfile.write(json.dumps(data).encode())
+                self.wfile.write(body)
+                metrics.observe('story_manager_response_bytes', len(body), route=route_label(self.path))
             
             def send_json_error(self, message):
                 """Send JSON error response"""
+                body = json.dumps({"error": message}).encode()
                 self.send_response(400)
                 self.send_header('Content-type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
                 self.send_header('Access-Control-Allow-Headers', 'Content-Type')
                 self.end_headers()
-                self.wfile.write(json.dumps({"error": message}).encode())
+                self.wfile.write(body)
         
         # Add the file_manager and story_generator to the handler
         StoryManagerHandler.file_manager = self.file_manager
         StoryManagerHandler.story_generator = self.story_generator
+        StoryManagerHandler.index_page = self.index_page
+        StoryManagerHandler.watcher = self.watcher
+        StoryManagerHandler.search_index = self.search_index
+        StoryManagerHandler.page_preview = self.page_preview
+        StoryManagerHandler.content_styles = self.content_styles
+        StoryManagerHandler.max_event_streams = self.max_event_streams
         
         return StoryManagerHandler
     
 
 def main():
     """Main function to run the web GUI"""
+    parser = argparse.ArgumentParser(description="Lexicon Quest Story Manager - Web GUI")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Number of request worker threads")
+    parser.add_argument('--no-keep-alive', action='store_true', help="Close the connection after every request")
+    parser.add_argument('--group-commit-ms', type=int, default=0,
+                        help="Coalesce writes to the same issue within this window (0 writes immediately)")
+    parser.add_argument('--debounce-ms', type=int, default=0,
+                        help="Keep edits in memory and write an issue once it has been idle this long")
+    parser.add_argument('--max-delay-ms', type=int, default=0,
+                        help="With --debounce-ms, write a continuously edited issue at least this often")
+    parser.add_argument('--no-watch', action='store_true', help="Don't watch story files for hand edits")
+    parser.add_argument('--poll', action='store_true', help="Watch by polling file stats instead of inotify")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Seconds between polls when polling")
+    args = parser.parse_args()
+    
     print("🌐 Starting Lexicon Quest Story Manager - Web GUI")
     print("=" * 60)
     
@@ -322,7 +970,10 @@ def main():
     print("✅ Starting web server...")
     
     try:
-        gui = WebGUI(port=8080)
+        gui = WebGUI(port=args.port, workers=args.workers, keep_alive=not args.no_keep_alive,
+                     group_commit_ms=args.group_commit_ms, debounce_ms=args.debounce_ms,
+                     max_delay_ms=args.max_delay_ms, watch=not args.no_watch, poll=args.poll,
+                     poll_interval=args.poll_interval)
         gui.start_server()
     except KeyboardInterrupt:
         print("\n🛑 Server stopped by user")
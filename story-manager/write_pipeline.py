@@ -0,0 +1,282 @@
+"""
+Write Pipeline for Lexicon Quest Story Manager
+Atomic (temp file + rename) writes, with optional group commit or a debounced
+write-behind queue that coalesces bursts of edits to the same file into a
+single durable write.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from request_metrics import metrics
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Persist a rename by syncing its directory (no-op where unsupported)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path: Path, content: str, fsync: bool = True, sync_directory: bool = True) -> int:
+    """Replace path with content so readers see either the old or the new file.
+
+    Returns the number of bytes written.
+    """
+    path = Path(path)
+    data = content.encode('utf-8')
+    fd, temp_name = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(temp_name, mode)
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
+
+    if fsync and sync_directory:
+        _fsync_directory(path.parent)
+    return len(data)
+
+
+def write_if_changed(path: Path, content: str, fsync: bool = False) -> bool:
+    """Write a text file unless it already holds exactly these bytes"""
+    path = Path(path)
+    try:
+        if path.read_bytes() == content.encode('utf-8'):
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(path, content, fsync=fsync)
+    return True
+
+
+class _PendingWrite:
+    __slots__ = ('content', 'futures', 'queued', 'deadline')
+
+    def __init__(self, content: str, queued: float, deadline: float):
+        self.content = content
+        self.futures: List[Future] = []
+        self.queued = queued
+        self.deadline = deadline
+
+
+class WritePipeline:
+    """Atomic file writer with optional group commit.
+
+    With ``group_commit_window`` of 0 every write happens immediately in the
+    caller's thread. With a positive window, writes are queued; all writes to
+    the same path submitted within the window are coalesced into one write
+    of the latest content, fsynced together with the other files in the
+    batch. Every caller gets a Future that resolves once its content (or a
+    newer version of it) is durable on disk.
+
+    With a positive ``debounce`` the pipeline becomes a write-behind queue:
+    each write to a pending file pushes its deadline back, so a burst of
+    autosaves produces one write once the editor goes quiet. ``max_delay``
+    caps how long a continuously edited file may stay unwritten.
+    """
+
+    def __init__(self, group_commit_window: float = 0.0, fsync: bool = True,
+                 debounce: float = 0.0, max_delay: float = 0.0):
+        self.group_commit_window = group_commit_window
+        self.fsync = fsync
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.writes = 0
+        self.coalesced = 0
+        self._pending: Dict[Path, _PendingWrite] = {}
+        self._condition = threading.Condition()
+        # Held while popping and writing a batch so versions of a file land in order
+        self._commit_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def write_behind(self) -> bool:
+        """True when writes are debounced rather than committed promptly"""
+        return self.debounce > 0
+
+    def configure(self, group_commit_window: Optional[float] = None, fsync: Optional[bool] = None,
+                  debounce: Optional[float] = None, max_delay: Optional[float] = None) -> None:
+        """Change settings; pending writes are flushed first"""
+        self.flush()
+        if group_commit_window is not None:
+            self.group_commit_window = group_commit_window
+        if fsync is not None:
+            self.fsync = fsync
+        if debounce is not None:
+            self.debounce = debounce
+        if max_delay is not None:
+            self.max_delay = max_delay
+
+    def write(self, path: Path, content: str) -> 'Future[Dict[str, Any]]':
+        """Queue content for path and return a Future of the durable write"""
+        path = Path(path)
+        future: Future = Future()
+
+        if self.group_commit_window <= 0 and self.debounce <= 0:
+            start = time.perf_counter()
+            try:
+                size = atomic_write_text(path, content, self.fsync)
+                metrics.observe('story_manager_write_seconds', time.perf_counter() - start)
+                metrics.inc('story_manager_write_bytes_total', size)
+                with self._condition:
+                    self.writes += 1
+                future.set_result({'path': str(path), 'bytes': size, 'coalesced': 1})
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Write pipeline is closed")
+            now = time.monotonic()
+            pending = self._pending.get(path)
+            if pending is None:
+                delay = self.debounce if self.debounce > 0 else self.group_commit_window
+                pending = self._pending[path] = _PendingWrite(content, now, now + delay)
+            else:
+                pending.content = content
+                self.coalesced += 1
+            if self.debounce > 0:
+                pending.deadline = now + self.debounce
+                if self.max_delay > 0:
+                    pending.deadline = min(pending.deadline, pending.queued + self.max_delay)
+            pending.futures.append(future)
+            self._ensure_thread()
+            self._condition.notify()
+        return future
+
+    def pending_count(self) -> int:
+        """Number of files waiting to be written"""
+        with self._condition:
+            return len(self._pending)
+
+    def pending_paths(self) -> List[str]:
+        """Paths of the files waiting to be written"""
+        with self._condition:
+            return [str(path) for path in self._pending]
+
+    def status(self) -> Dict[str, Any]:
+        """Queue depth, counters and settings"""
+        with self._condition:
+            now = time.monotonic()
+            oldest = min((p.queued for p in self._pending.values()), default=None)
+            return {
+                'pending': len(self._pending),
+                'pendingSaves': sum(len(p.futures) for p in self._pending.values()),
+                'oldestPendingMs': None if oldest is None else round((now - oldest) * 1000),
+                'writes': self.writes,
+                'coalesced': self.coalesced,
+                'groupCommitMs': round(self.group_commit_window * 1000),
+                'debounceMs': round(self.debounce * 1000),
+                'maxDelayMs': round(self.max_delay * 1000),
+            }
+
+    def flush(self, paths: Optional[Iterable[Path]] = None) -> int:
+        """Write pending content now (all files, or only the given paths)
+
+        Returns the number of files written.
+        """
+        with self._commit_lock:
+            with self._condition:
+                if paths is None:
+                    batch = list(self._pending.items())
+                    self._pending.clear()
+                else:
+                    wanted = {Path(p) for p in paths}
+                    batch = [(path, self._pending.pop(path)) for path in list(self._pending) if path in wanted]
+            self._commit(batch)
+        return len(batch)
+
+    def close(self) -> None:
+        """Flush everything and stop the background writer"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self.flush()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='story-write-pipeline', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed and not self._due():
+                    now = time.monotonic()
+                    timeout = min((p.deadline for p in self._pending.values()), default=now + 1.0) - now
+                    self._condition.wait(max(timeout, 0))
+                if self._closed:
+                    return
+
+            with self._commit_lock:
+                with self._condition:
+                    batch = [(path, self._pending.pop(path)) for path in self._due()]
+                self._commit(batch)
+
+    def _due(self) -> List[Path]:
+        now = time.monotonic()
+        return [path for path, pending in self._pending.items() if pending.deadline <= now]
+
+    def _commit(self, batch: List) -> None:
+        """Write a batch of files, syncing each touched directory once"""
+        directories = set()
+        written = []
+        for path, pending in batch:
+            start = time.perf_counter()
+            try:
+                size = atomic_write_text(path, pending.content, self.fsync, sync_directory=False)
+            except Exception as e:
+                for future in pending.futures:
+                    future.set_exception(e)
+                continue
+            metrics.observe('story_manager_write_seconds', time.perf_counter() - start)
+            metrics.inc('story_manager_write_bytes_total', size)
+            directories.add(path.parent)
+            written.append((pending, {'path': str(path), 'bytes': size, 'coalesced': len(pending.futures)}))
+            with self._condition:
+                self.writes += 1
+
+        if self.fsync:
+            for directory in directories:
+                _fsync_directory(directory)
+
+        # Only report completion once the renames themselves are durable
+        for pending, result in written:
+            for future in pending.futures:
+                future.set_result(result)
+
+
+# Shared by every FileManager in the process
+write_pipeline = WritePipeline()
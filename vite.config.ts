@@ -1,7 +1,56 @@
-import { defineConfig } from 'vite'
+import { createHash } from 'node:crypto'
+import { existsSync, readFileSync } from 'node:fs'
+import path from 'node:path'
+import { defineConfig, type Plugin } from 'vite'
 import react from '@vitejs/plugin-react'
 
+const STORY_CONFIG = /[\\/]src[\\/]components[\\/][^\\/]+[\\/](storyConfig|simpleStoryConfig)\.ts$/
+// Written by content_optimizer.py into the header of each optimized copy
+const SOURCE_HASH = /^\/\/ Source sha256: ([0-9a-f]{64})$/m
+
+// Production builds import the minified copy that `story_cli.py optimize` (run by `npm run build`)
+// writes next to each story config, but only while the source hash in its header matches the
+// config: a copy made before the config was last edited is reported and skipped.
+function optimizedStoryConfigs(): Plugin {
+  // Config path -> the module to import, decided (and logged) once per build
+  const choices = new Map<string, string>()
+  const log = (message: string) => console.info(`[optimized-story-configs] ${message}`)
+
+  function choose(config: string): string {
+    const optimized = config.replace(/\.ts$/, '.optimized.ts')
+    const name = path.relative(process.cwd(), config)
+    if (!existsSync(optimized)) {
+      log(`no optimized copy of ${name}, using the source (run python3 story-manager/story_cli.py optimize)`)
+      return config
+    }
+    const recorded = SOURCE_HASH.exec(readFileSync(optimized, 'utf8'))?.[1]
+    const actual = createHash('sha256').update(readFileSync(config)).digest('hex')
+    if (recorded !== actual) {
+      log(`${path.relative(process.cwd(), optimized)} was made from another version of ${name}, using the source`)
+      return config
+    }
+    log(`using ${path.relative(process.cwd(), optimized)} for ${name}`)
+    return path.normalize(optimized)
+  }
+
+  return {
+    name: 'optimized-story-configs',
+    apply: 'build',
+    enforce: 'pre',
+    buildStart() {
+      choices.clear()
+    },
+    async resolveId(source, importer, options) {
+      const resolved = await this.resolve(source, importer, { ...options, skipSelf: true })
+      if (!resolved || !STORY_CONFIG.test(resolved.id)) return null
+      if (!choices.has(resolved.id)) choices.set(resolved.id, choose(resolved.id))
+      const chosen = choices.get(resolved.id)
+      return chosen === resolved.id ? null : chosen
+    },
+  }
+}
+
 // https://vite.dev/config/
 export default defineConfig({
-  plugins: [react()],
+  plugins: [optimizedStoryConfigs(), react()],
 })